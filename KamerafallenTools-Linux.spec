@@ -32,6 +32,24 @@ a = Analysis(a = Analysis(
 
         ('github_models_api.py', '.'),        ('github_models_api.py', '.'),
 
+        ('github_models_store.py', '.'),        ('github_models_store.py', '.'),
+
+        ('github_models_prompt_bench.py', '.'),        ('github_models_prompt_bench.py', '.'),
+
+        ('github_models_prepare.py', '.'),        ('github_models_prepare.py', '.'),
+
+        ('github_models_usage.py', '.'),        ('github_models_usage.py', '.'),
+
+        ('github_models_mock_server.py', '.'),        ('github_models_mock_server.py', '.'),
+
+        ('github_models_journal.py', '.'),        ('github_models_journal.py', '.'),
+
+        ('github_models_ocr.py', '.'),        ('github_models_ocr.py', '.'),
+
+        ('github_models_async.py', '.'),        ('github_models_async.py', '.'),
+
+        ('github_models_cache.py', '.'),        ('github_models_cache.py', '.'),
+
         ('extract_img_email.py', '.'),        ('extract_img_email.py', '.'),
 
         ('rename_images_from_excel.py', '.'),        ('rename_images_from_excel.py', '.'),
@@ -152,6 +170,24 @@ a = Analysis(a = Analysis(
 
         'github_models_api',        'github_models_api',
 
+        'github_models_store',        'github_models_store',
+
+        'github_models_prompt_bench',        'github_models_prompt_bench',
+
+        'github_models_prepare',        'github_models_prepare',
+
+        'github_models_usage',        'github_models_usage',
+
+        'github_models_mock_server',        'github_models_mock_server',
+
+        'github_models_journal',        'github_models_journal',
+
+        'github_models_ocr',        'github_models_ocr',
+
+        'github_models_async',        'github_models_async',
+
+        'github_models_cache',        'github_models_cache',
+
         'extract_img_email',        'extract_img_email',
 
         'rename_images_from_excel',        'rename_images_from_excel',
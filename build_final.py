@@ -74,6 +74,15 @@ datas = [
     ('github_models_analyzer.py', '.'),
     ('github_models_api.py', '.'),
     ('github_models_io.py', '.'),
+    ('github_models_store.py', '.'),
+    ('github_models_prompt_bench.py', '.'),
+    ('github_models_prepare.py', '.'),
+    ('github_models_usage.py', '.'),
+    ('github_models_mock_server.py', '.'),
+    ('github_models_journal.py', '.'),
+    ('github_models_ocr.py', '.'),
+    ('github_models_async.py', '.'),
+    ('github_models_cache.py', '.'),
     ('rename_images_from_excel.py', '.'),
     ('extract_img_email.py', '.'),
     ('.env.example', '.'),
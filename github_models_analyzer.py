@@ -16,18 +16,26 @@ Datum: 2025
 import os
 import sys
 import argparse
+import asyncio
+import multiprocessing
 import subprocess
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from PIL import Image, ImageTk, ImageDraw
+from collections import OrderedDict, deque
 from concurrent.futures import ThreadPoolExecutor
 import time
 import builtins
+import math
 from datetime import datetime, timedelta
 from pathlib import Path
 from tkcalendar import DateEntry
 import github_models_api as gm_api
+import github_models_async as gm_async
 import github_models_io as gm_io
+import github_models_prepare as gm_prepare
+import github_models_store as gm_store
+import github_models_usage as gm_usage
 
 
 # ---------------------------------------------------------------------------
@@ -143,12 +151,17 @@ except ImportError:
 
 
 def get_github_token():
-    """Return the GitHub Models token from environment variables."""
+    """Return the GitHub Models token from environment variables.
+
+    Falls back to the first entry of the token pool (GITHUB_MODELS_TOKENS or
+    the token file); the API spreads requests over all pool tokens.
+    """
     for key in ("GITHUB_MODELS_TOKEN", "GITHUB_TOKEN"):
         value = os.environ.get(key)
         if value:
             return value.strip()
-    return ""
+    pool_tokens = gm_api.load_tokens()
+    return pool_tokens[0] if pool_tokens else ""
 
 
 def refresh_token_cache():
@@ -163,6 +176,8 @@ IMAGES_FOLDER = os.environ.get("ANALYZER_IMAGES_FOLDER", "")
 OUTPUT_EXCEL = os.environ.get("ANALYZER_OUTPUT_EXCEL", "")
 GITHUB_TOKEN = get_github_token()
 START_FROM_IMAGE = 1
+# Milliseconds of navigation quiet before the shown position is written to the store
+POSITION_SAVE_DELAY_MS = 2000
 
 # Debug token loading
 print(f"DEBUG: GitHub token detected: {'Yes' if GITHUB_TOKEN else 'No'} (length={len(GITHUB_TOKEN) if GITHUB_TOKEN else 0})")
@@ -177,16 +192,232 @@ ANIMAL_SPECIES = [
 ]
 
 
+class AdaptivePacer:
+    """AIMD controller for AnalysisBuffer concurrency, call spacing and lookahead.
+
+    Healthy responses raise concurrency additively and shorten the spacing
+    between calls; 429s and timeouts halve concurrency and double the spacing.
+    A per-model latency estimate (EWMA) is learned from successful calls.
+
+    Concurrency starts at half of max_concurrency and recovers up to it, never
+    beyond: max_concurrency is the concurrency gate's limit (the service's
+    concurrent-request limit per token), so more in-flight requests would only
+    queue at the gate. Generous minute/day budgets are used by shortening the
+    spacing down to min_delay.
+    """
+
+    def __init__(self, max_concurrency=2, initial_delay=0.8, min_delay=0.2, max_delay=15.0,
+                 base_buffer_size=5):
+        self.min_concurrency = 1.0
+        self.max_concurrency = float(max(1, max_concurrency))
+        self.concurrency = max(self.min_concurrency, self.max_concurrency / 2)
+        self.initial_delay = initial_delay
+        self.delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.base_buffer_size = base_buffer_size
+        self.latency_estimates = {}  # {model_name: seconds (EWMA)}
+        self.completions = []  # timestamps of successful analyses (last 5 minutes)
+        self.successes_since_change = 0
+
+    @property
+    def concurrency_limit(self):
+        return max(1, int(self.concurrency))
+
+    @property
+    def buffer_size(self):
+        """Lookahead grows with achievable parallelism, within sensible bounds."""
+        scaled = self.base_buffer_size * self.concurrency / self.max_concurrency
+        return int(min(15, max(3, round(scaled))))
+
+    def on_success(self, model_name=None, latency=None):
+        now = time.time()
+        self.completions.append(now)
+        self.completions = [t for t in self.completions if now - t <= 300]
+        if model_name and latency is not None:
+            previous = self.latency_estimates.get(model_name)
+            self.latency_estimates[model_name] = latency if previous is None else 0.8 * previous + 0.2 * latency
+
+        # Additive increase: one step per "window" of successful calls
+        self.successes_since_change += 1
+        if self.successes_since_change < self.concurrency_limit:
+            return
+        self.successes_since_change = 0
+        old_concurrency, old_delay = self.concurrency, self.delay
+        self.concurrency = min(self.max_concurrency, self.concurrency + 1.0 / self.concurrency_limit)
+        self.delay = max(self.min_delay, self.delay - 0.1)
+        if (old_concurrency, old_delay) != (self.concurrency, self.delay):
+            self._log_decision("↑ healthy", model_name)
+
+    def on_backoff(self, reason):
+        # Multiplicative decrease
+        self.successes_since_change = 0
+        self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+        self.delay = min(self.max_delay, max(self.delay, self.initial_delay) * 2)
+        self._log_decision(f"↓ {reason}")
+
+    def expected_latency(self):
+        """Slowest learned model latency in seconds (None before the first answer)."""
+        return max(self.latency_estimates.values()) if self.latency_estimates else None
+
+    def achieved_rpm(self):
+        now = time.time()
+        recent = [t for t in self.completions if now - t <= 60]
+        return float(len(recent))
+
+    def _log_decision(self, reason, model_name=None):
+        latency = ""
+        if model_name in self.latency_estimates:
+            latency = f", latency[{model_name}]={self.latency_estimates[model_name]:.1f}s"
+        print(
+            f"DEBUG: Pacer {reason}: concurrency={self.concurrency:.2f} (limit {self.concurrency_limit}), "
+            f"delay={self.delay:.2f}s, lookahead={self.buffer_size}, achieved={self.achieved_rpm():.0f} req/min{latency}"
+        )
+
+
+class NavigationTracker:
+    """Learns where the user is heading and plans which neighbours to prefetch.
+
+    Every shown image is recorded. The last steps give the direction (forward
+    or back), the stride (how many images a step moves) and the dwell time per
+    image. The plan puts nearly the whole lookahead on the heading, at the
+    observed stride, and keeps one image behind when the user recently moved
+    against the heading. Long dwell times need less lookahead: only as many images as can
+    be analyzed while the user looks at the current one, plus one. Jumping
+    around (direction changes or large jumps) caps the plan to the immediate
+    neighbours, so the quota is not spent on images nobody will look at.
+    """
+
+    def __init__(self, history=6, jump_size=5):
+        self.steps = deque(maxlen=history + 1)  # (image_index, monotonic time shown)
+        self.jump_size = jump_size
+
+    def reset(self):
+        """Forget the history (the file list was re-read or re-sorted)."""
+        self.steps.clear()
+
+    def record(self, image_index):
+        if self.steps and self.steps[-1][0] == image_index:
+            return
+        self.steps.append((image_index, time.monotonic()))
+
+    def _deltas(self):
+        indices = [index for index, _ in self.steps]
+        return [after - before for before, after in zip(indices, indices[1:])]
+
+    @property
+    def direction(self):
+        """+1 forward, -1 back; the latest steps weigh most, forward until known."""
+        weighted = sum(weight * (1 if delta > 0 else -1) for weight, delta in enumerate(self._deltas(), 1))
+        return -1 if weighted < 0 else 1
+
+    @property
+    def stride(self):
+        """Typical number of images per step on the heading (1 for plain next/previous)."""
+        moves = sorted(abs(delta) for delta in self._deltas() if abs(delta) < self.jump_size)
+        return moves[len(moves) // 2] if moves else 1
+
+    @property
+    def dwell(self):
+        """Median seconds between two shown images (None with fewer than two steps)."""
+        times = [shown for _, shown in self.steps]
+        gaps = sorted(after - before for before, after in zip(times, times[1:]))
+        return gaps[len(gaps) // 2] if gaps else None
+
+    @property
+    def erratic(self):
+        """True when the user changes direction repeatedly or jumps far."""
+        deltas = self._deltas()[-4:]
+        turns = sum(1 for before, after in zip(deltas, deltas[1:]) if (before > 0) != (after > 0))
+        return turns >= 2 or any(abs(delta) >= self.jump_size for delta in deltas[-2:])
+
+    @property
+    def turned(self):
+        """True if any recent step went against the current heading."""
+        return any((delta > 0) != (self.direction > 0) for delta in self._deltas())
+
+    def plan(self, current_index, total, budget, latency=None):
+        """Indices to have analyzed next, most important first."""
+        if self.erratic:
+            budget = min(budget, 2)
+        elif latency is not None and self.dwell:
+            budget = min(budget, max(2, math.ceil(latency / self.dwell) + 1))
+        heading, stride = self.direction, self.stride
+        behind = 1 if (self.erratic or self.turned) and budget > 1 else 0
+        indices = []
+        step = 1
+        while len(indices) < budget - behind:
+            index = current_index + heading * stride * step
+            if not 0 <= index < total:
+                break
+            indices.append(index)
+            step += 1
+        for distance in range(1, budget - len(indices) + 1):
+            index = current_index - heading * distance
+            if 0 <= index < total:
+                indices.append(index)
+        return indices
+
+    def describe(self):
+        """Short German summary for the status line."""
+        text = "vorwärts" if self.direction > 0 else "rückwärts"
+        if self.stride > 1:
+            text += f" in {self.stride}er-Schritten"
+        if self.erratic:
+            text += ", springt (Vorlauf begrenzt)"
+        if self.dwell:
+            text += f", Ø {self.dwell:.0f}s pro Bild"
+        return text
+
+
+def _result_size(result):
+    """Rough memory footprint of a result dict in bytes (dict plus keys and values)."""
+    return sys.getsizeof(result) + sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in result.items())
+
+
 class AnalysisBuffer:
     """Manages asynchronous analysis with rolling buffer for smooth user experience."""
     
     def __init__(self, analyzer_instance):
         self.analyzer = analyzer_instance
-        self.buffer = {}  # {image_index: analysis_result}
+        # All state is keyed by file identity (gm_io.file_identity), not by list position, so
+        # reordering, refreshing or renaming keeps finished and in-flight work attached to its image
+        self.buffer = {}  # {image_key: analysis_result}
+        # Results that were already shown move here instead of being dropped, so going back
+        # to an image is instant and never costs another request (LRU, bounded by count and bytes)
+        self.consumed = OrderedDict()  # {image_key: (analysis_result, size in bytes)}
+        self.consumed_bytes = 0
+        self.consumed_max_entries = gm_api._env_int("ANALYZER_CONSUMED_MAX", 1000)
+        self.consumed_max_bytes = gm_api._env_int("ANALYZER_CONSUMED_MAX_BYTES", 4 * 1024 * 1024)
+        self.reuse_stats = {'fresh': 0, 'reused': 0, 'evicted': 0, 'restored': 0}
         self.analyzing = set()  # Currently being analyzed
         self.failed = set()  # Failed analyses
-        self.executor = ThreadPoolExecutor(max_workers=2)  # GitHub Models allows only 2 concurrent requests!
-        self.buffer_size = 5  # Keep 5 images ahead analyzed (changed from 3)
+        self._identities = {}  # {image_path: image_key} for the current file list
+        self._paths = {}  # {image_key: last known image_path}
+        # Results of earlier sessions stay in the SQLite store and are read back on demand,
+        # so reopening a folder never repeats a request for an analyzed image
+        self.store = gm_store.get_result_store()
+        self.stored = set()  # Image keys with a result in the store
+        self._store_checked = set()  # Image keys already looked up in the store
+        self._pending_shown = {}  # Image keys shown since the last flush_reviews() -> path
+        # Every pooled token brings its own concurrency slots, so build the pool first
+        token_pool = gm_api.get_token_pool(get_github_token())
+        if len(token_pool) > 1:
+            print(f"DEBUG: Token pool with {len(token_pool)} tokens")
+        # Upper bound for parallel requests (GitHub Models allows only 2 by default);
+        # the pacer decides how many of these slots are actually used
+        self.max_workers = gm_api.CONCURRENCY_GATE.max_concurrent
+        self.pacer = AdaptivePacer(max_concurrency=self.max_workers)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        # One keep-alive connection per worker so handshakes are amortised across images
+        gm_api.get_http_client(pool_size=self.max_workers)
+        self.queued_starts = []  # Image keys waiting for a free pacer slot
+        # Prefetch follows the user's navigation (direction, stride, dwell time) instead of a fixed window
+        self.navigation = NavigationTracker()
+        self.prefetch_stats = {'ready': 0, 'in_flight': 0, 'missing': 0}
+        self.requests_in_flight = 0  # Submitted API requests (a batched request counts once)
+        # Images packed into one chat completion for prefetching (1 = no batching)
+        self.images_per_request = max(1, min(gm_api.MAX_BATCH_IMAGES, gm_api._env_int("ANALYZER_BATCH_IMAGES", 1)))
         self.batch_size = 5   # Initial batch size when explicitly triggered
         self.retry_attempts = {}
         self.max_retries = 3
@@ -202,7 +433,98 @@ class AnalysisBuffer:
         self.rate_limit_wait_until = None  # Timestamp when we can retry
         self.rate_limit_wait_seconds = 0  # How many seconds to wait
         self.last_api_call_time = 0  # Track last API call for staggering
-        self.min_delay_between_calls = 0.8  # Minimum seconds between API calls
+        self._sync_with_store()
+
+    @property
+    def buffer_size(self):
+        """Images to keep analyzed ahead (adapted by the pacer)."""
+        return self.pacer.buffer_size
+
+    @property
+    def min_delay_between_calls(self):
+        """Minimum seconds between API calls (adapted by the pacer)."""
+        return self.pacer.delay
+
+    def key_for(self, image_index):
+        """File identity of the image at a list position (None if out of range or unreadable)."""
+        if not 0 <= image_index < len(self.analyzer.image_files):
+            return None
+        images_folder = self.analyzer.images_folder or IMAGES_FOLDER
+        image_path = os.path.join(images_folder, self.analyzer.image_files[image_index])
+        key = self._identities.get(image_path)
+        if key is None:
+            key = gm_io.file_identity(image_path)
+            if key is not None:
+                self._identities[image_path] = key
+                self._paths[key] = image_path
+        return key
+
+    def on_files_changed(self):
+        """Forget path lookups after the file list was re-read, re-sorted or an image renamed."""
+        self._identities.clear()
+        self._sync_with_store()
+
+    def _sync_with_store(self):
+        """Restore results, failures and retry counts of images not looked up in the store yet."""
+        if self.store is None:
+            return
+        entries = []
+        for index in range(len(self.analyzer.image_files)):
+            key = self.key_for(index)
+            if key is not None and key not in self._store_checked:
+                self._store_checked.add(key)
+                entries.append((key, self._paths[key]))
+        if not entries:
+            return
+        restored = failed = 0
+        for key, state in self.store.lookup(entries).items():
+            if state['result'] is not None:
+                self.stored.add(key)
+                restored += 1
+            elif state['error']:
+                self.failed.add(key)
+                self.failed_timestamps[key] = state['failed_at'] or time.time()
+                self.failure_reasons[key] = {'raw': state['error'], 'friendly': state['friendly_error'] or state['error']}
+                failed += 1
+            elif state['retry_count']:
+                self.retry_attempts[key] = state['retry_count']
+        if restored or failed:
+            print(f"DEBUG: Restored {restored} results and {failed} failures from {self.store.path}")
+
+    def on_image_shown(self, image_index):
+        """Record a navigation step and whether prefetching had the image ready in time."""
+        self.navigation.record(image_index)
+        key = self.key_for(image_index)
+        if key is None or self.analyzer.dummy_mode_var.get():
+            return
+        if self._is_done(key):
+            self.prefetch_stats['ready'] += 1
+        elif key in self.analyzing or key in self.queued_starts:
+            self.prefetch_stats['in_flight'] += 1
+        else:
+            self.prefetch_stats['missing'] += 1
+
+    def prefetch_hit_rate(self):
+        shown = sum(self.prefetch_stats.values())
+        return self.prefetch_stats['ready'] / shown if shown else None
+
+    def flush_reviews(self):
+        """Write the 'shown' status of the images shown since the last flush in one commit."""
+        pending, self._pending_shown = self._pending_shown, {}
+        if self.store is not None and pending:
+            self.store.set_reviews(pending.items(), 'shown')
+
+    def set_review(self, image_index, review):
+        """Record the review status ('shown', 'saved', 'renamed') of the image at image_index."""
+        key = self.key_for(image_index)
+        if self.store is not None and key is not None:
+            self.store.set_review(key, self._paths[key], review)
+
+    def _is_current(self, key):
+        return key is not None and key == self.key_for(self.analyzer.current_image_index)
+
+    def _label(self, key):
+        return os.path.basename(self._paths.get(key, '?'))
         
     def get_analysis(self, image_index, force_analysis=False):
         """Get analysis result for image, trigger batch if not available.
@@ -213,29 +535,47 @@ class AnalysisBuffer:
         """
         print(f"DEBUG: Getting analysis for image {image_index}, force_analysis={force_analysis}")
         print(f"DEBUG: Buffer state - buffered: {len(self.buffer)}, analyzing: {len(self.analyzing)}, failed: {len(self.failed)}")
-        
-        if image_index in self.buffer:
-            result = self.buffer.pop(image_index)
+        key = self.key_for(image_index)
+        if key is None:
+            print(f"DEBUG: Image {image_index} is not readable")
+            return "not_analyzed"
+
+        if key in self.buffer:
+            result = self.buffer.pop(key)
+            self.reuse_stats['fresh'] += 1
+            self._retain(key, result)
             print(f"DEBUG: Found result in buffer for image {image_index}: {result.get('animals', 'N/A')}")
             # Keep rolling buffer ahead regardless of trigger source
             self._ensure_buffer_ahead(image_index + 1)
             return result
-        elif image_index in self.analyzing:
+        elif key in self.consumed:
+            self.consumed.move_to_end(key)
+            self.reuse_stats['reused'] += 1
+            result = self.consumed[key][0]
+            print(f"DEBUG: Reusing shown result for image {image_index}: {result.get('animals', 'N/A')}")
+            self._ensure_buffer_ahead(image_index + 1)
+            return result
+        elif key in self.stored and self._restore_result(key):
+            result = self.consumed[key][0]
+            print(f"DEBUG: Restored stored result for image {image_index}: {result.get('animals', 'N/A')}")
+            self._ensure_buffer_ahead(image_index + 1)
+            return result
+        elif key in self.analyzing:
             print(f"DEBUG: Image {image_index} is currently being analyzed")
             return "analyzing"
-        elif image_index in self.failed:
+        elif key in self.failed:
             print(f"DEBUG: Image {image_index} analysis failed previously")
             if force_analysis:
                 print(f"DEBUG: Forcing re-analysis for failed image {image_index}")
-                self.failed.discard(image_index)
-                self.retry_attempts[image_index] = 0
-                self._start_single_analysis(image_index)
+                self.failed.discard(key)
+                self.retry_attempts[key] = 0
+                self._start_single_analysis(key)
                 return "analyzing"
-            elif self._should_auto_retry(image_index):
+            elif self._should_auto_retry(key):
                 print(f"DEBUG: Auto retry triggered for image {image_index} after cooldown")
-                self.failed.discard(image_index)
-                self.retry_attempts[image_index] = 0
-                self._start_single_analysis(image_index)
+                self.failed.discard(key)
+                self.retry_attempts[key] = 0
+                self._start_single_analysis(key)
                 return "analyzing"
             return "failed"
         else:
@@ -250,8 +590,45 @@ class AnalysisBuffer:
                 self._ensure_buffer_ahead(image_index)
                 return "not_analyzed"
     
+    def _restore_result(self, key):
+        """Read a stored result back into the consumed tier (False if the store lost it)."""
+        state = self.store.lookup([(key, self._paths[key])]).get(key)
+        if not state or state['result'] is None:
+            self.stored.discard(key)
+            return False
+        self.reuse_stats['restored'] += 1
+        self._retain(key, state['result'])
+        return True
+
+    def _retain(self, key, result):
+        """Keep a shown result in the consumed tier, evicting the least recently used ones."""
+        if self.store is not None:
+            # Written together with the position (flush_reviews), not with a commit per image
+            self._pending_shown[key] = self._paths[key]
+        self._drop_consumed(key)
+        size = _result_size(result)
+        self.consumed[key] = (result, size)
+        self.consumed_bytes += size
+        while self.consumed and (len(self.consumed) > self.consumed_max_entries
+                                 or self.consumed_bytes > self.consumed_max_bytes):
+            _, (_, evicted_size) = self.consumed.popitem(last=False)
+            self.consumed_bytes -= evicted_size
+            self.reuse_stats['evicted'] += 1
+
+    def _drop_consumed(self, key):
+        entry = self.consumed.pop(key, None)
+        if entry is not None:
+            self.consumed_bytes -= entry[1]
+
+    def _is_done(self, key):
+        """True if the image has a result waiting, already shown or in the store."""
+        return key in self.buffer or key in self.consumed or key in self.stored
+
     def _ensure_buffer_ahead(self, current_index):
-        """Ensure we have buffer_size images analyzed ahead."""
+        """Keep the images the user will most likely see next analyzed (see NavigationTracker.plan).
+
+        ``current_index`` is kept for the callers; the plan starts from the visible image.
+        """
         # Don't queue new analyses if rate limited
         if self.rate_limited:
             return
@@ -260,26 +637,55 @@ class AnalysisBuffer:
             return
 
         current_visible = max(self.analyzer.current_image_index, 0)
-        limit_index = min(current_visible + 1 + self.buffer_size, len(self.analyzer.image_files))
+        planned = self.navigation.plan(
+            current_visible, len(self.analyzer.image_files), self.buffer_size, self.pacer.expected_latency()
+        )
+        keys = [key for key in (self.key_for(i) for i in planned) if key is not None]
+
+        # Speculative starts that are no longer planned (the user turned or jumped) are dropped
+        # before they cost a request; the visible image always stays queued
+        visible_key = self.key_for(current_visible)
+        self.queued_starts = [key for key in self.queued_starts if key in keys or key == visible_key]
 
-        start_index = max(current_index, current_visible + 1)
-        
         # Count how many we're already analyzing or have buffered
-        queued_count = len([i for i in range(start_index, limit_index) 
-                           if i in self.analyzing or i in self.buffer])
+        queued_count = len([key for key in keys if key in self.analyzing or key in self.buffer])
         
         # Limit total queue to buffer_size (5)
-        for i in range(start_index, limit_index):
+        to_start = []
+        for key in keys:
             if queued_count >= self.buffer_size:
                 break
-            if (i not in self.buffer and 
-                i not in self.analyzing and 
-                i not in self.failed):
-                self._start_single_analysis(i)
+            if (not self._is_done(key) and 
+                key not in self.analyzing and 
+                key not in self.failed and
+                key not in self.queued_starts):
+                to_start.append(key)
                 queued_count += 1
+
+        if self.images_per_request > 1 and len(to_start) >= 2:
+            # Prefetch in batched requests to save prompt tokens and rate-limit budget
+            for offset in range(0, len(to_start), self.images_per_request):
+                group = to_start[offset:offset + self.images_per_request]
+                if len(group) >= 2:
+                    self._start_group_analysis(group)
+                else:
+                    self._start_single_analysis(group[0])
+        else:
+            # Read/resize/encode in worker processes while the network slots are busy
+            for key in to_start:
+                self._prepare_ahead(key)
+            for key in to_start:
+                self._start_single_analysis(key)
+
+    def _prepare_ahead(self, key):
+        """Hand an upcoming image to the preparation stage."""
+        try:
+            gm_prepare.submit(self._paths[key])
+        except Exception as exc:
+            print(f"DEBUG: Could not queue image {self._label(key)} for preparation: {exc}")
     
     def _start_batch_analysis(self, start_index):
-        """Start analyzing a batch of up to 5 images."""
+        """Start analyzing the requested image plus planned neighbours, up to 5 images."""
         # Don't start batch if rate limited
         if self.rate_limited:
             print("DEBUG: Batch analysis blocked due to rate limit")
@@ -289,27 +695,27 @@ class AnalysisBuffer:
             return
 
         current_visible = max(self.analyzer.current_image_index, 0)
-        limit_index = min(current_visible + 1 + self.buffer_size, len(self.analyzer.image_files))
-        batch_limit = min(self.batch_size, len(self.analyzer.image_files) - start_index, max(0, limit_index - start_index))
-        if batch_limit <= 0:
-            return
+        planned = self.navigation.plan(
+            current_visible, len(self.analyzer.image_files), self.buffer_size, self.pacer.expected_latency()
+        )
+        indices = [start_index] + [index for index in planned if index != start_index]
 
-        batch_size = batch_limit
         started = 0
-        for i in range(start_index, start_index + batch_size):
+        for i in indices[:self.batch_size]:
             if started >= self.buffer_size:  # Enforce max 5 concurrent
                 break
-            if i not in self.buffer and i not in self.analyzing:
-                self._start_single_analysis(i)
+            key = self.key_for(i)
+            if key is not None and not self._is_done(key) and key not in self.analyzing:
+                self._start_single_analysis(key)
                 started += 1
     
-    def _start_single_analysis(self, image_index):
+    def _start_single_analysis(self, key):
         """Start analyzing a single image asynchronously with staggered delays."""
         # Don't start if rate limited
         if self.rate_limited:
             return
         
-        if image_index >= len(self.analyzer.image_files):
+        if key is None or key not in self._paths:
             return
         
         # Calculate delay to stagger API calls (avoid concurrent limit)
@@ -319,61 +725,146 @@ class AnalysisBuffer:
         if delay_needed > 0:
             # Schedule this analysis after a delay
             delay_ms = int(delay_needed * 1000)
-            print(f"DEBUG: Staggering API call for image {image_index} by {delay_needed:.2f}s to avoid concurrent limit")
+            print(f"DEBUG: Staggering API call for image {self._label(key)} by {delay_needed:.2f}s to avoid concurrent limit")
             try:
-                self.analyzer.root.after(delay_ms, lambda: self._do_start_analysis(image_index))
+                self.analyzer.root.after(delay_ms, lambda: self._do_start_analysis(key))
             except Exception as exc:
-                print(f"DEBUG: Failed to schedule staggered analysis for {image_index}: {exc}, starting immediately")
-                self._do_start_analysis(image_index)
+                print(f"DEBUG: Failed to schedule staggered analysis for {self._label(key)}: {exc}, starting immediately")
+                self._do_start_analysis(key)
         else:
-            self._do_start_analysis(image_index)
+            self._do_start_analysis(key)
     
-    def _do_start_analysis(self, image_index):
+    def _do_start_analysis(self, key):
         """Actually start the analysis (called after optional delay)."""
         # Re-check conditions in case they changed during delay
-        if self.rate_limited or image_index >= len(self.analyzer.image_files):
+        if self.rate_limited or key not in self._paths:
             return
         
-        if image_index in self.analyzing or image_index in self.buffer:
+        if key in self.analyzing or self._is_done(key):
             return  # Already being analyzed or completed
+
+        visible = self._is_current(key)
+        if self.requests_in_flight >= self.pacer.concurrency_limit:
+            # No free slot - queue it; the visible image goes to the front
+            if key not in self.queued_starts:
+                if visible:
+                    self.queued_starts.insert(0, key)
+                else:
+                    self.queued_starts.append(key)
+            return
+        if key in self.queued_starts:
+            self.queued_starts.remove(key)
             
-        self.failed.discard(image_index)
-        self.failed_timestamps.pop(image_index, None)
-        self.failure_reasons.pop(image_index, None)
-        self.pending_long_retry.discard(image_index)
-        self.retry_attempts.setdefault(image_index, 0)
-        self.analyzing.add(image_index)
+        self.failed.discard(key)
+        self.failed_timestamps.pop(key, None)
+        self.failure_reasons.pop(key, None)
+        self.pending_long_retry.discard(key)
+        self.retry_attempts.setdefault(key, 0)
+        self.analyzing.add(key)
+        self.requests_in_flight += 1
         
         # Update last call time for staggering
         self.last_api_call_time = time.time()
         
-        future = self.executor.submit(self._analyze_image, image_index)
+        future = self.executor.submit(self._analyze_image, key, self._paths[key], visible)
 
         def _schedule_result(fut):
             try:
-                self.analyzer.root.after(0, lambda: self._analysis_complete(image_index, fut))
+                self.analyzer.root.after(0, lambda: self._analysis_complete(key, fut))
             except Exception as exc:
-                print(f"DEBUG: Failed to schedule UI callback for image {image_index}: {exc}")
+                print(f"DEBUG: Failed to schedule UI callback for image {self._label(key)}: {exc}")
                 # Fallback: process immediately (may happen during shutdown)
-                self._analysis_complete(image_index, fut)
+                self._analysis_complete(key, fut)
 
         future.add_done_callback(_schedule_result)
     
-    def _should_auto_retry(self, image_index):
-        last_failed = self.failed_timestamps.get(image_index)
+    def _start_group_analysis(self, keys):
+        """Start one batched request for several prefetch images (staggered like singles)."""
+        if self.rate_limited:
+            return
+        time_since_last_call = time.time() - self.last_api_call_time
+        delay_needed = max(0, self.min_delay_between_calls - time_since_last_call)
+        if delay_needed > 0:
+            print(f"DEBUG: Staggering batched API call for {len(keys)} images by {delay_needed:.2f}s")
+            try:
+                self.analyzer.root.after(int(delay_needed * 1000), lambda: self._do_start_group(keys))
+                return
+            except Exception as exc:
+                print(f"DEBUG: Failed to schedule staggered batch: {exc}, starting immediately")
+        self._do_start_group(keys)
+
+    def _do_start_group(self, keys):
+        if self.rate_limited:
+            return
+        keys = [
+            key for key in keys
+            if key in self._paths and key not in self.analyzing and not self._is_done(key)
+        ]
+        if len(keys) < 2 or self.requests_in_flight >= self.pacer.concurrency_limit:
+            # Not worth batching anymore (or no free slot) - fall back to the single-image path
+            for key in keys:
+                self._do_start_analysis(key)
+            return
+
+        for key in keys:
+            if key in self.queued_starts:
+                self.queued_starts.remove(key)
+            self.failed.discard(key)
+            self.failed_timestamps.pop(key, None)
+            self.failure_reasons.pop(key, None)
+            self.pending_long_retry.discard(key)
+            self.retry_attempts.setdefault(key, 0)
+            self.analyzing.add(key)
+        self.requests_in_flight += 1
+        self.last_api_call_time = time.time()
+        print(f"DEBUG: Starting batched analysis for images {[self._label(key) for key in keys]}")
+
+        future = self.executor.submit(self._analyze_group, [self._paths[key] for key in keys])
+
+        def _schedule_result(fut):
+            try:
+                self.analyzer.root.after(0, lambda: self._group_complete(keys, fut))
+            except Exception as exc:
+                print(f"DEBUG: Failed to schedule UI callback for batch: {exc}")
+                self._group_complete(keys, fut)
+
+        future.add_done_callback(_schedule_result)
+
+    def _group_complete(self, keys, future):
+        """Handle completion of a batched request (runs on Tk main thread)."""
+        self.requests_in_flight = max(0, self.requests_in_flight - 1)
+        try:
+            try:
+                results = future.result()
+            except Exception as exc:
+                results = [self._error_result(exc) for _ in keys]
+            for key, result in zip(keys, results):
+                self.analyzing.discard(key)
+                self._process_result(key, result)
+        finally:
+            self._start_queued()
+
+    def _start_queued(self):
+        """Start queued analyses while the pacer has free slots."""
+        while self.queued_starts and self.requests_in_flight < self.pacer.concurrency_limit and not self.rate_limited:
+            key = self.queued_starts.pop(0)
+            if key in self.analyzing or self._is_done(key):
+                continue
+            self._start_single_analysis(key)
+            # Staggered starts add to `analyzing` later; start at most one per call
+            break
+
+    def _should_auto_retry(self, key):
+        last_failed = self.failed_timestamps.get(key)
         if last_failed is None:
             return False
         return (time.time() - last_failed) >= self.long_retry_cooldown
 
-    def _analyze_image(self, image_index):
-        """Perform the actual image analysis."""
+    def _analyze_image(self, key, image_path, visible):
+        """Perform the actual image analysis (``visible``: on screen when it was started)."""
+        image_name = os.path.basename(image_path)
         try:
-            # Get the image file path
-            image_file = self.analyzer.image_files[image_index]
-            images_folder = self.analyzer.images_folder or IMAGES_FOLDER
-            image_path = os.path.join(images_folder, image_file)
-            
-            print(f"DEBUG: Analyzing image {image_index}: {image_path}")
+            print(f"DEBUG: Analyzing image {image_name}: {image_path}")
             
             # Check if token is available (env-aware)
             token = get_github_token()
@@ -389,118 +880,233 @@ class AnalysisBuffer:
             
             print(f"DEBUG: Using token for analysis (length={len(token)})")
             
-            # Use existing AI analysis function
-            animals, location, time_str, date_str = gm_api.analyze_with_github_models(
-                image_path, token, ANIMAL_SPECIES
-            )
+            # The image on screen is hedged against a slow request; prefetching is not (quota)
+            details = {}
+            started = time.time()
+            if visible:
+                # Fields of the visible image are filled in while the answer streams
+                animals, location, time_str, date_str = gm_async.analyze_hedged_sync(
+                    image_path, token, ANIMAL_SPECIES, details=details,
+                    on_fields=self._make_field_callback(key)
+                )
+            else:
+                animals, location, time_str, date_str = gm_api.analyze_with_github_models(
+                    image_path, token, ANIMAL_SPECIES, details=details
+                )
+            latency = time.time() - started
             
             print(f"DEBUG: AI analysis result - animals: {animals}, location: {location}")
+            if details.get('hedged'):
+                print(f"DEBUG: Image {image_name} was hedged, answer from {details.get('hedge_winner')}")
+            if details.get('cached'):
+                print(f"DEBUG: Result for image {image_name} served from analysis cache ({details.get('model')})")
 
-            animals_value = animals or 'Keine Tiere erkannt'
-            location_value = location or 'Unbekannt'
-            date_value = date_str or ''
-            time_value = time_str or ''
-            error_value = None
-
-            animals_lower = animals_value.strip().lower()
-            location_lower = location_value.strip().lower()
-            if (
-                'error in analysis' in animals_lower
-                or 'analysis error' in animals_lower
-                or 'fehler bei analyse' in animals_lower
-                or 'placeholder' in animals_lower
-            ):
-                error_value = 'AI returned placeholder result'
-            if error_value and location_lower in ('', 'unbekannt', 'unknown'):
-                error_value = 'AI returned placeholder result'
-
-            return {
-                'animals': animals_value,
-                'location': location_value,
-                'date': date_value,
-                'time': time_value,
-                'error': error_value
-            }
+            return self._build_result(animals, location, time_str, date_str, details, latency)
                 
         except Exception as e:
-            print(f"Analysis error for image {image_index}: {e}")
-            import traceback
-            traceback.print_exc()
-            return {
-                'animals': 'Fehler bei Analyse',
-                'location': 'Unbekannt',
-                'date': '',
-                'time': '',
-                'error': str(e)
-            }
-    
-    def _analysis_complete(self, image_index, future):
-        """Handle completion of image analysis (runs on Tk main thread)."""
-        self.analyzing.discard(image_index)
+            print(f"Analysis error for image {image_name}: {e}")
+            if not isinstance(e, gm_api.RateLimitError):
+                import traceback
+                traceback.print_exc()
+            return self._error_result(e)
+
+    def _make_field_callback(self, key):
+        """Return an on_fields callback that hands partial results to the Tk thread."""
+        def _on_fields(fields):
+            try:
+                self.analyzer.root.after(0, lambda: self._apply_partial_fields(key, fields))
+            except Exception as exc:
+                print(f"DEBUG: Could not schedule partial fields for image {self._label(key)}: {exc}")
+        return _on_fields
 
+    def _apply_partial_fields(self, key, fields):
+        """Show streamed fields if the image is still on screen and not finished yet."""
+        if not self._is_current(key) or self._is_done(key):
+            return
+        print(f"DEBUG: Early fields for image {self._label(key)}: {fields}")
         try:
-            result = future.result()
+            self.analyzer._apply_analysis_result(fields)
+            if hasattr(self.analyzer, 'analysis_status_label'):
+                self.analyzer.analysis_status_label.config(
+                    text="🔄 Analyse läuft – erste Felder übernommen", foreground="blue"
+                )
+        except Exception as e:
+            print(f"Error applying early fields: {e}")
+
+    @staticmethod
+    def _analyze_group(image_paths):
+        """Analyze several images with one batched request (runs in worker thread)."""
+        token = get_github_token()
+        if not token:
+            return [AnalysisBuffer._error_result(RuntimeError('GITHUB_MODELS_TOKEN nicht gesetzt')) for _ in image_paths]
+
+        details_list = [{} for _ in image_paths]
+        started = time.time()
+        try:
+            outcomes = gm_api.analyze_batch_with_github_models(image_paths, token, ANIMAL_SPECIES, details_list)
         except Exception as exc:
-            print(f"Exception in analysis for image {image_index}: {exc}")
-            self._record_failure(image_index, str(exc))
-            return
+            print(f"Batched analysis error for {len(image_paths)} images: {exc}")
+            return [AnalysisBuffer._error_result(exc) for _ in image_paths]
+        latency = (time.time() - started) / max(1, len(image_paths))
+
+        results = []
+        for image_path, outcome, details in zip(image_paths, outcomes, details_list):
+            if isinstance(outcome, Exception):
+                print(f"Analysis error for image {os.path.basename(image_path)}: {outcome}")
+                results.append(AnalysisBuffer._error_result(outcome))
+            else:
+                animals, location, time_str, date_str = outcome
+                results.append(AnalysisBuffer._build_result(animals, location, time_str, date_str, details, latency))
+        return results
+
+    @staticmethod
+    def _build_result(animals, location, time_str, date_str, details, latency):
+        """Convert a parsed API tuple into the buffer's result dict."""
+        animals_value = animals or 'Keine Tiere erkannt'
+        location_value = location or 'Unbekannt'
+        date_value = date_str or ''
+        time_value = time_str or ''
+        error_value = None
+
+        animals_lower = animals_value.strip().lower()
+        location_lower = location_value.strip().lower()
+        if (
+            'error in analysis' in animals_lower
+            or 'analysis error' in animals_lower
+            or 'fehler bei analyse' in animals_lower
+            or 'placeholder' in animals_lower
+        ):
+            error_value = 'AI returned placeholder result'
+        if error_value and location_lower in ('', 'unbekannt', 'unknown'):
+            error_value = 'AI returned placeholder result'
 
+        return {
+            'animals': animals_value,
+            'location': location_value,
+            'date': date_value,
+            'time': time_value,
+            'error': error_value,
+            'model': details.get('model'),
+            'cached': bool(details.get('cached')),
+            'latency': latency,
+            'escalation_reasons': details.get('escalation_reasons') or [],
+            'escalation_failed': details.get('escalation_failed'),
+        }
+
+    @staticmethod
+    def _error_result(exc):
+        result = {
+            'animals': 'Fehler bei Analyse',
+            'location': 'Unbekannt',
+            'date': '',
+            'time': '',
+            'error': str(exc)
+        }
+        if isinstance(exc, gm_api.RateLimitError):
+            result['rate_limit'] = {'wait_seconds': exc.wait_seconds, 'limit_type': exc.limit_type}
+        return result
+    
+    def _analysis_complete(self, key, future):
+        """Handle completion of image analysis (runs on Tk main thread)."""
+        self.analyzing.discard(key)
+        self.requests_in_flight = max(0, self.requests_in_flight - 1)
+        try:
+            try:
+                result = future.result()
+            except Exception as exc:
+                print(f"Exception in analysis for image {self._label(key)}: {exc}")
+                self._record_failure(key, str(exc))
+                return
+            self._process_result(key, result)
+        finally:
+            self._start_queued()
+
+    def _process_result(self, key, result):
         error_message = result.get('error')
+        if result.get('rate_limit'):
+            # The limiter already knows how long to wait - retrying now would only waste quota
+            self._record_failure(key, error_message, rate_limit_info=result['rate_limit'])
+            return
         if error_message:
-            attempts = self.retry_attempts.get(image_index, 0) + 1
+            lower_error = error_message.lower()
+            if 'timeout' in lower_error or 'timed out' in lower_error:
+                self.pacer.on_backoff("timeout")
+            attempts = self.retry_attempts.get(key, 0) + 1
             if attempts <= self.max_retries:
-                self.retry_attempts[image_index] = attempts
+                self.retry_attempts[key] = attempts
+                if self.store is not None:
+                    self.store.put_retry(key, self._paths[key], attempts)
                 delay_ms = self._compute_retry_delay_ms(attempts)
                 print(
                     "Retrying analysis for image "
-                    f"{image_index} (attempt {attempts}/{self.max_retries}) due to: {error_message}. "
+                    f"{self._label(key)} (attempt {attempts}/{self.max_retries}) due to: {error_message}. "
                     f"Next try in {delay_ms / 1000:.1f}s"
                 )
-                if image_index == self.analyzer.current_image_index and hasattr(self.analyzer, 'analysis_status_label'):
+                if self._is_current(key) and hasattr(self.analyzer, 'analysis_status_label'):
                     friendly = self._format_error_message(error_message)
                     self.analyzer.analysis_status_label.config(text=friendly + " – wiederhole...", foreground="orange")
-                self._schedule_retry(image_index, delay_ms)
+                self._schedule_retry(key, delay_ms)
             else:
-                self._record_failure(image_index, error_message)
+                self._record_failure(key, error_message)
             return
 
-        self.buffer[image_index] = result
-        self.retry_attempts.pop(image_index, None)
-        self.failed.discard(image_index)
-        self.failed_timestamps.pop(image_index, None)
-        self.failure_reasons.pop(image_index, None)
-        print(f"✓ Analysis complete for image {image_index}: {result['animals']}")
+        self._drop_consumed(key)
+        self.buffer[key] = result
+        if self.store is not None and self.store.put_result(key, self._paths[key], result):
+            self.stored.add(key)
+        if not result.get('cached'):
+            self.pacer.on_success(result.get('model'), result.get('latency'))
+        self.retry_attempts.pop(key, None)
+        self.failed.discard(key)
+        self.failed_timestamps.pop(key, None)
+        self.failure_reasons.pop(key, None)
+        print(f"✓ Analysis complete for image {self._label(key)}: {result['animals']}")
+        if result.get('escalation_reasons'):
+            print(f"DEBUG: Image {self._label(key)} escalated to {result.get('model')}: {', '.join(result['escalation_reasons'])}")
+        conn_stats = gm_api.get_connection_stats()
+        print(
+            f"DEBUG: HTTP connections - requests: {conn_stats['requests']}, "
+            f"opened: {conn_stats['connections_opened']}, reused: {conn_stats['connections_reused']}"
+        )
+        parser_stats = gm_api.get_parser_stats()
+        if parser_stats['fallback']:
+            print(
+                f"DEBUG: Structured output - json: {parser_stats['structured']}, "
+                f"text fallback: {parser_stats['fallback']} ({parser_stats['fallback_rate']:.0%})"
+            )
 
-        if image_index == self.analyzer.current_image_index:
+        if self._is_current(key):
             self._update_current_image_ui(result)
 
         self._update_buffer_status()
-        self._ensure_buffer_ahead(image_index + 1)
+        self._ensure_buffer_ahead(self.analyzer.current_image_index + 1)
     
-    def _schedule_retry(self, image_index, delay_ms):
+    def _schedule_retry(self, key, delay_ms):
         """Schedule a retry with a short cooldown to prevent rapid requeue."""
         def _retry():
-            if image_index in self.failed:
+            if key in self.failed:
                 return
-            self._start_single_analysis(image_index)
+            self._start_single_analysis(key)
             self._update_buffer_status()
 
         try:
             self.analyzer.root.after(delay_ms, _retry)
         except Exception as exc:
-            print(f"DEBUG: Retry scheduling failed for image {image_index}: {exc}; retrying immediately")
+            print(f"DEBUG: Retry scheduling failed for image {self._label(key)}: {exc}; retrying immediately")
             _retry()
 
     def _compute_retry_delay_ms(self, attempt_number):
         delay = self.retry_backoff_base_ms * (2 ** max(0, attempt_number - 1))
         return int(min(delay, self.max_retry_delay_ms))
 
-    def _record_failure(self, image_index, error_message):
+    def _record_failure(self, key, error_message, rate_limit_info=None):
         # Check if this is a rate limit error before recording as failure
-        rate_limit_info = self._parse_rate_limit_error(error_message)
+        # (structured limiter info first, message parsing only as a fallback)
+        rate_limit_info = rate_limit_info or self._parse_rate_limit_error(error_message)
         if rate_limit_info:
             wait_seconds = rate_limit_info['wait_seconds']
             limit_type = rate_limit_info['limit_type']
+            self.pacer.on_backoff(f"rate limit ({limit_type})")
             
             # Set rate limit state
             self.rate_limited = True
@@ -511,6 +1117,8 @@ class AnalysisBuffer:
             # Format German message
             if limit_type == 'concurrent':
                 friendly = "⚠️ Zu viele gleichzeitige Anfragen – warte kurz und versuche erneut"
+            elif limit_type == 'tokens':
+                friendly = f"⏱️ Token-Limit: Bitte {wait_seconds}s warten"
             elif limit_type == 'minute':
                 friendly = f"⏱️ API-Limit: Bitte {wait_seconds}s warten (1 Anfrage pro Minute)"
             elif limit_type == 'day':
@@ -520,20 +1128,20 @@ class AnalysisBuffer:
                 friendly = f"⏱️ API-Limit: Bitte {wait_seconds}s warten"
             
             # Don't add to failed set - we'll retry automatically
-            self.retry_attempts.pop(image_index, None)
+            self.retry_attempts.pop(key, None)
             
-            print(f"Rate limit detected for image {image_index}: {friendly}")
+            print(f"Rate limit detected for image {self._label(key)}: {friendly}")
             
             # Update UI
-            if image_index == self.analyzer.current_image_index and hasattr(self.analyzer, 'analysis_status_label'):
+            if self._is_current(key) and hasattr(self.analyzer, 'analysis_status_label'):
                 self.analyzer.analysis_status_label.config(text=friendly, foreground="orange")
             
             # Stop all buffer analysis
             self._stop_buffer_analysis()
             
             # Schedule auto-resume - concurrent limits should retry quickly
-            if limit_type == 'concurrent' or (limit_type == 'minute' and wait_seconds < 300):
-                self._schedule_rate_limit_resume(image_index, wait_seconds)
+            if limit_type in ('concurrent', 'minute', 'tokens') and wait_seconds < 300:
+                self._schedule_rate_limit_resume(key, wait_seconds)
             else:
                 # For daily limits, inform user
                 if hasattr(self.analyzer, 'analysis_status_label'):
@@ -546,23 +1154,26 @@ class AnalysisBuffer:
             return
         
         # Regular failure handling (not a rate limit)
-        self.failed.add(image_index)
-        self.retry_attempts.pop(image_index, None)
-        self.failed_timestamps[image_index] = time.time()
+        self.failed.add(key)
+        attempts = self.retry_attempts.pop(key, 0)
+        self.failed_timestamps[key] = time.time()
         friendly = self._format_error_message(error_message)
-        self.failure_reasons[image_index] = {
+        self.failure_reasons[key] = {
             'raw': error_message or '',
             'friendly': friendly,
         }
-        print(f"Analysis failed for image {image_index}: {error_message}")
-        if image_index == self.analyzer.current_image_index and hasattr(self.analyzer, 'analysis_status_label'):
+        if self.store is not None:
+            self.store.put_failure(key, self._paths[key], error_message or '', friendly, attempts,
+                                   self.failed_timestamps[key])
+        print(f"Analysis failed for image {self._label(key)}: {error_message}")
+        if self._is_current(key) and hasattr(self.analyzer, 'analysis_status_label'):
             self.analyzer.analysis_status_label.config(text=friendly, foreground="red")
         self._update_buffer_status()
 
         lower = (error_message or '').lower()
         # Only schedule long retry if NOT a rate limit (we handle those differently now)
         if not self.rate_limited and any(keyword in lower for keyword in ("placeholder", "temporarily")):
-            self._schedule_long_retry(image_index)
+            self._schedule_long_retry(key)
     
     def _parse_rate_limit_error(self, error_message):
         """Parse rate limit error and extract wait time.
@@ -612,21 +1223,21 @@ class AnalysisBuffer:
         # Don't cancel already running threads, but stop queuing new ones
         # The rate_limited flag will prevent new analyses from starting
     
-    def _schedule_rate_limit_resume(self, image_index, wait_seconds):
+    def _schedule_rate_limit_resume(self, key, wait_seconds):
         """Schedule automatic resume after rate limit expires."""
         delay_ms = int((wait_seconds + 2) * 1000)  # Add 2 seconds buffer
         
         def _resume():
-            print(f"DEBUG: Rate limit expired, resuming analysis from image {image_index}")
+            print(f"DEBUG: Rate limit expired, resuming analysis from image {self._label(key)}")
             self.rate_limited = False
             self.rate_limit_type = None
             self.rate_limit_wait_until = None
             self.rate_limit_wait_seconds = 0
             
-            # Restart analysis for the current image
-            if image_index < len(self.analyzer.image_files):
-                self.retry_attempts[image_index] = 0
-                self._start_single_analysis(image_index)
+            # Restart analysis for the image that hit the limit
+            if key in self._paths:
+                self.retry_attempts[key] = 0
+                self._start_single_analysis(key)
             
             # Update UI
             if hasattr(self.analyzer, 'analysis_status_label'):
@@ -643,7 +1254,8 @@ class AnalysisBuffer:
         except Exception as exc:
             print(f"DEBUG: Failed to schedule auto-resume: {exc}")
 
-    def _format_error_message(self, error_message):
+    @staticmethod
+    def _format_error_message(error_message):
         if not error_message:
             return "❌ KI-Analyse fehlgeschlagen"
         lower = error_message.lower()
@@ -656,38 +1268,38 @@ class AnalysisBuffer:
         return f"❌ KI-Analyse fehlgeschlagen: {error_message}"
 
     def get_failure_reason(self, image_index, *, human_friendly=False):
-        data = self.failure_reasons.get(image_index)
+        data = self.failure_reasons.get(self.key_for(image_index))
         if not data:
             return ""
         if human_friendly:
             return data.get('friendly', '')
         return data.get('raw', '')
 
-    def _schedule_long_retry(self, image_index):
+    def _schedule_long_retry(self, key):
         if self.analyzer.dummy_mode_var.get():
             return
-        if image_index in self.pending_long_retry:
+        if key in self.pending_long_retry:
             return
 
         delay_ms = int(self.long_retry_cooldown * 1000)
 
         def _trigger():
-            self.pending_long_retry.discard(image_index)
-            if image_index >= len(self.analyzer.image_files):
+            self.pending_long_retry.discard(key)
+            if key not in self._paths:
                 return
-            if image_index in self.analyzing:
+            if key in self.analyzing:
                 return
-            self.failed.discard(image_index)
-            self.retry_attempts[image_index] = 0
-            self._start_single_analysis(image_index)
+            self.failed.discard(key)
+            self.retry_attempts[key] = 0
+            self._start_single_analysis(key)
             self._update_buffer_status()
 
         try:
             self.analyzer.root.after(delay_ms, _trigger)
-            self.pending_long_retry.add(image_index)
-            print(f"DEBUG: Scheduled long retry for image {image_index} in {delay_ms / 1000:.0f}s")
+            self.pending_long_retry.add(key)
+            print(f"DEBUG: Scheduled long retry for image {self._label(key)} in {delay_ms / 1000:.0f}s")
         except Exception as exc:
-            print(f"DEBUG: Failed to schedule long retry for image {image_index}: {exc}; manual retry required")
+            print(f"DEBUG: Failed to schedule long retry for image {self._label(key)}: {exc}; manual retry required")
 
     def _update_current_image_ui(self, result):
         """Update UI with analysis result if it's for current image."""
@@ -722,12 +1334,81 @@ class AnalysisBuffer:
             else:
                 status = self.get_buffer_status()
                 buffer_text = f"Buffer: {status['buffered']} bereit, {status['analyzing']} analysieren, {status['failed']} fehlgeschlagen"
+                buffer_text += (
+                    f"\nGezeigt: {status['consumed']} behalten ({status['consumed_kb']:.0f} KB), "
+                    f"{status['fresh']} neu, {status['reused']} wiederverwendet, {status['evicted']} verdrängt"
+                )
+                if self.store is not None:
+                    buffer_text += f"\nGespeichert: {status['stored']} Ergebnisse, {status['restored']} aus früheren Sitzungen"
+                hit_rate = self.prefetch_hit_rate()
+                if hit_rate is not None:
+                    buffer_text += (
+                        f"\nVorlauf: {hit_rate:.0%} sofort bereit ({self.prefetch_stats['ready']}/"
+                        f"{sum(self.prefetch_stats.values())}, {self.prefetch_stats['in_flight']} noch unterwegs), "
+                        f"Navigation {self.navigation.describe()}"
+                    )
+                buffer_text += (
+                    f"\nTempo: {self.pacer.concurrency_limit} parallel, {self.pacer.delay:.1f}s Abstand, "
+                    f"{self.pacer.achieved_rpm():.0f} Anfragen/Min."
+                )
+                limit_text = self._format_rate_limit_state()
+                if limit_text:
+                    buffer_text += "\n" + limit_text
+                circuit_text = self._format_circuit_state()
+                if circuit_text:
+                    buffer_text += "\n" + circuit_text
+                try:
+                    buffer_text += "\n" + gm_usage.format_status()
+                except Exception as exc:
+                    print(f"DEBUG: Usage forecast unavailable: {exc}")
                 self.analyzer.buffer_status_label.config(text=buffer_text)
+
+    def _format_rate_limit_state(self):
+        """Short summary of the proactive rate limiter budgets for the status line."""
+        try:
+            state = gm_api.get_rate_limit_state()
+        except Exception:
+            return ""
+        parts = []
+        for model_name, model_state in state['models'].items():
+            text = (
+                f"{model_name}: {int(model_state['minute_remaining'])}/{int(model_state['minute_limit'])} pro Min., "
+                f"{int(model_state['day_remaining'])}/{int(model_state['day_limit'])} heute"
+            )
+            if model_state['wait_seconds'] > 0:
+                text += f" (nächste in {model_state['wait_seconds']:.0f}s)"
+            parts.append(text)
+        for token_state in state.get('tokens', []):
+            text = f"Token {token_state['token']}: {token_state['requests_today']} heute"
+            if token_state['parked_models']:
+                text += f" (pausiert: {', '.join(token_state['parked_models'])})"
+            parts.append(text)
+        return " | ".join(parts)
     
+    def _format_circuit_state(self):
+        """Models currently skipped by the circuit breaker (empty when all are healthy)."""
+        try:
+            breakers = gm_api.get_circuit_state()
+        except Exception:
+            return ""
+        parts = []
+        for breaker in breakers:
+            if breaker['state'] == 'open':
+                parts.append(f"{breaker['model']}: gesperrt (Test in {breaker['retry_in']:.0f}s)")
+            elif breaker['state'] == 'half_open':
+                parts.append(f"{breaker['model']}: Testanfrage läuft")
+        return ("Modelle: " + " | ".join(parts)) if parts else ""
+
     def get_buffer_status(self):
         """Get current buffer status for display."""
         return {
             'buffered': len(self.buffer),
+            'consumed': len(self.consumed),
+            'consumed_kb': self.consumed_bytes / 1024,
+            **self.reuse_stats,
+            'stored': len(self.stored),
+            **self.prefetch_stats,
+            'prefetch_hit_rate': self.prefetch_hit_rate(),
             'analyzing': len(self.analyzing),
             'failed': len(self.failed)
         }
@@ -735,6 +1416,9 @@ class AnalysisBuffer:
     def cleanup(self):
         """Clean up resources."""
         self.executor.shutdown(wait=False)
+        gm_prepare.shutdown()
+        gm_async.shutdown_hedging()
+        gm_api.close_http_client()
 
 
 class ImageAnalyzer:
@@ -750,6 +1434,7 @@ class ImageAnalyzer:
         # Simple guards to avoid double-opening dialogs
         self._dialog_open = False
         self._manager_opening = False
+        self._position_save_job = None
         
         # Initialize the analysis buffer
         self.analysis_buffer = None  # Will be initialized after GUI setup
@@ -763,8 +1448,11 @@ class ImageAnalyzer:
         # Initialize buffer after image files are loaded
         self.analysis_buffer = AnalysisBuffer(self)
         
-        # Clear fields for the first image (since no analysis exists yet)
-        self.clear_fields()
+        if self.image_files:
+            # Show the resumed image with its stored analysis, if any
+            self._show_image_at(self.current_image_index)
+        else:
+            self.clear_fields()
 
     def setup_gui(self):
         self.root = tk.Tk()
@@ -1101,6 +1789,7 @@ class ImageAnalyzer:
         row2.pack()
         self.rename_button = ttk.Button(row2, text="Bild umbenennen", command=self.rename_current_image, state='disabled')
         self.rename_button.pack(side=tk.LEFT, padx=5)
+        ttk.Button(row2, text="Vorheriges Bild", command=self.previous_image).pack(side=tk.LEFT, padx=5)
         ttk.Button(row2, text="Nächstes Bild", command=self.next_image).pack(side=tk.LEFT, padx=5)
 
         # Analysis and buffer status
@@ -1187,6 +1876,7 @@ class ImageAnalyzer:
             self._dialog_open = False
 
         if folder:
+            self._flush_position()
             self.images_folder = folder
             self.images_folder_var.set(folder)
             self.refresh_image_files()
@@ -1272,15 +1962,61 @@ class ImageAnalyzer:
             # Some platforms/window managers may not support these attributes.
             pass
 
-    def refresh_image_files(self):
+    def refresh_image_files(self, resume=True):
         self.image_files = gm_io.get_image_files(self.images_folder, reverse=self.reverse_order)
-        self.current_image_index = 0
-        if self.image_files:
+        if self.analysis_buffer:
+            # Buffered results follow their files, only the positions change
+            self.analysis_buffer.on_files_changed()
+            self.analysis_buffer.navigation.reset()
+        self.current_image_index = self._resume_index() if resume else 0
+        if self.image_files and self.analysis_buffer:
+            self._show_image_at(self.current_image_index)
+        elif self.image_files:
             self.load_current_image()
         else:
             self.image_label.config(image='')
             self.progress_var.set("Keine Bilder im ausgewählten Ordner")
 
+    def _resume_index(self):
+        """Position of the image last shown in this folder (by file name, so re-sorting is fine), else 0."""
+        store = gm_store.get_result_store()
+        if store is None or not self.image_files:
+            return 0
+        name, index = store.get_position(self.images_folder or IMAGES_FOLDER)
+        if name in self.image_files:
+            return self.image_files.index(name)
+        if index is not None and 0 <= index < len(self.image_files):
+            return index
+        return 0
+
+    def _save_position(self):
+        """Write the shown position once navigation pauses, so paging through a folder costs one commit."""
+        if self._position_save_job is not None:
+            try:
+                self.root.after_cancel(self._position_save_job)
+            except Exception:
+                pass
+        self._position_save_job = self.root.after(POSITION_SAVE_DELAY_MS, self._flush_position)
+
+    def _flush_position(self):
+        """Write the shown position and review status now (folder change, exit) and drop a pending delayed write."""
+        if self.analysis_buffer:
+            self.analysis_buffer.flush_reviews()
+        job, self._position_save_job = self._position_save_job, None
+        if job is None:
+            return
+        try:
+            self.root.after_cancel(job)
+        except Exception:
+            pass
+        store = gm_store.get_result_store()
+        if store is not None and 0 <= self.current_image_index < len(self.image_files):
+            store.save_position(
+                self.images_folder or IMAGES_FOLDER,
+                os.path.basename(self.image_files[self.current_image_index]),
+                self.current_image_index,
+            )
+
     def load_current_image(self):
         if self.current_image_index >= len(self.image_files):
             messagebox.showinfo("Fertig", "Alle Bilder wurden verarbeitet!", parent=self.root)
@@ -1473,14 +2209,20 @@ class ImageAnalyzer:
         self.analysis_buffer._update_buffer_status()
 
     def _apply_analysis_result(self, result):
-        """Apply analysis result to the GUI fields."""
+        """Apply analysis result to the GUI fields.
+
+        Also accepts partial results while an answer streams in; only the
+        fields present in ``result`` are touched.
+        """
         print(f"DEBUG: Applying analysis result: {result}")
         # Parse animals to species and populate fields
-        self.parse_animals_to_species(result['animals'])
-        self._update_special_checkboxes(result['animals'])
+        if 'animals' in result:
+            self.parse_animals_to_species(result['animals'])
+            self._update_special_checkboxes(result['animals'])
         
         # Update location and other fields
-        self.location_var.set(result['location'])
+        if 'location' in result:
+            self.location_var.set(result['location'])
         if result.get('date'):
             self.date_var.set(result['date'])
         if result.get('time'):
@@ -1499,37 +2241,44 @@ class ImageAnalyzer:
     def _navigate_to_next_image(self):
         """Navigate to the next image with proper buffer handling."""
         if self.current_image_index < len(self.image_files) - 1:
-            self.current_image_index += 1
-            print(f"DEBUG: Navigating to image {self.current_image_index + 1}/{len(self.image_files)}")
-            
-            # Load the image and clear fields
-            self.load_current_image()
-            self.clear_fields()
-            
-            # Only use buffer if NOT in dummy mode
-            if self.analysis_buffer and not self.dummy_mode_var.get():
-                result = self.analysis_buffer.get_analysis(self.current_image_index, force_analysis=False)
-                if result not in ["analyzing", "failed", "not_analyzed"]:
-                    # Auto-fill if already analyzed
-                    print(f"DEBUG: Image {self.current_image_index} already analyzed")
-                    self._apply_analysis_result(result)
-                    self.analysis_status_label.config(text="✓ Bereits analysiert", foreground="green")
-                else:
-                    self.analysis_status_label.config(text="Bereit für Analyse", foreground="black")
-                
-                # Update buffer status
-                self.analysis_buffer._update_buffer_status()
-            else:
-                # In dummy mode or no buffer - just show ready state
-                if self.dummy_mode_var.get():
-                    self.analysis_status_label.config(text="Testmodus - bereit für Dummy-Daten", foreground="blue")
-                else:
-                    self.analysis_status_label.config(text="Bereit für Analyse", foreground="black")
+            self._show_image_at(self.current_image_index + 1)
             return True
         else:
             messagebox.showinfo("Ende", "Sie haben das letzte Bild erreicht.", parent=self.root)
             return False
 
+    def _show_image_at(self, image_index):
+        """Show the image at image_index and fill in its analysis if the buffer has one."""
+        self.current_image_index = image_index
+        print(f"DEBUG: Navigating to image {self.current_image_index + 1}/{len(self.image_files)}")
+        self._save_position()
+        if self.analysis_buffer:
+            self.analysis_buffer.on_image_shown(image_index)
+        
+        # Load the image and clear fields
+        self.load_current_image()
+        self.clear_fields()
+        
+        # Only use buffer if NOT in dummy mode
+        if self.analysis_buffer and not self.dummy_mode_var.get():
+            result = self.analysis_buffer.get_analysis(self.current_image_index, force_analysis=False)
+            if result not in ["analyzing", "failed", "not_analyzed"]:
+                # Auto-fill if already analyzed
+                print(f"DEBUG: Image {self.current_image_index} already analyzed")
+                self._apply_analysis_result(result)
+                self.analysis_status_label.config(text="✓ Bereits analysiert", foreground="green")
+            else:
+                self.analysis_status_label.config(text="Bereit für Analyse", foreground="black")
+            
+            # Update buffer status
+            self.analysis_buffer._update_buffer_status()
+        else:
+            # In dummy mode or no buffer - just show ready state
+            if self.dummy_mode_var.get():
+                self.analysis_status_label.config(text="Testmodus - bereit für Dummy-Daten", foreground="blue")
+            else:
+                self.analysis_status_label.config(text="Bereit für Analyse", foreground="black")
+
     def use_dummy_data(self):
         import random
         locations = ["FP1", "FP2", "FP3", "Nische"]
@@ -1719,6 +2468,10 @@ class ImageAnalyzer:
         # Update the image files list to reflect the rename
         new_path = os.path.join(self.images_folder, new_image_name)
         self.image_files[self.current_image_index] = new_path
+        if self.analysis_buffer:
+            self.analysis_buffer.on_files_changed()
+            self.analysis_buffer.set_review(self.current_image_index, 'renamed')
+        self._save_position()
         
         # Disable rename button since this image is now processed
         self.rename_button.config(state='disabled')
@@ -1976,6 +2729,8 @@ class ImageAnalyzer:
             
             # Store the Excel entry for renaming (GUI logic)
             self.current_excel_entry = data
+            if self.analysis_buffer:
+                self.analysis_buffer.set_review(self.current_image_index, 'saved')
             
             # Enable the rename button (GUI logic)
             self.rename_button.config(state='normal')
@@ -2118,6 +2873,16 @@ class ImageAnalyzer:
             out = self.output_excel or OUTPUT_EXCEL
             messagebox.showinfo("Fertig", f"Analyse abgeschlossen! Ergebnisse gespeichert in {out}", parent=self.root)
 
+    def previous_image(self):
+        """Navigate back to the previous image; its shown analysis is kept, so no new request is needed."""
+        print("DEBUG: Previous image button pressed")
+        if self.current_image_index <= 0:
+            return
+        self.current_excel_entry = None
+        self.rename_button.config(state='disabled')
+        self._show_image_at(self.current_image_index - 1)
+        self.update_filename_preview()
+
     def skip_image(self):
         """Skip to next image."""
         print("DEBUG: Skip button pressed")
@@ -2163,8 +2928,8 @@ class ImageAnalyzer:
         else:
             print("❌ Rückwärts-Modus deaktiviert - Bilder in aufsteigender Reihenfolge")
         
-        # Reload images with new sorting order
-        self.refresh_image_files()
+        # Reload images with new sorting order, starting from the first one
+        self.refresh_image_files(resume=False)
         
         # Get token value to update status
         token_value = refresh_token_cache()
@@ -2339,6 +3104,7 @@ class ImageAnalyzer:
         try:
             self.root.mainloop()
         finally:
+            self._flush_position()
             # Clean up the analysis buffer
             if self.analysis_buffer:
                 self.analysis_buffer.cleanup()
@@ -2370,6 +3136,245 @@ class ImageAnalyzer:
             return None
 
 
+# ---------------------------------------------------------------------------
+# Headless batch analysis
+# ---------------------------------------------------------------------------
+BATCH_CSV_FIELDS = ('filename', 'animals', 'location', 'date', 'time', 'model', 'cached', 'escalation', 'error')
+BATCH_MAX_RETRIES = 3
+BATCH_RETRY_DELAY = 5.0  # Seconds before the first retry of a failed image, doubled per attempt
+BATCH_RETRY_MAX_DELAY = 120.0
+
+
+def _analyze_for_batch(image_paths):
+    """Analyze one request's worth of images without a GUI (runs in a worker thread)."""
+    if len(image_paths) > 1:
+        return AnalysisBuffer._analyze_group(image_paths)
+    details = {}
+    started = time.time()
+    try:
+        animals, location, time_str, date_str = gm_api.analyze_with_github_models(
+            image_paths[0], get_github_token(), ANIMAL_SPECIES, details=details
+        )
+    except Exception as exc:
+        return [AnalysisBuffer._error_result(exc)]
+    return [AnalysisBuffer._build_result(animals, location, time_str, date_str, details, time.time() - started)]
+
+
+def _format_duration(seconds):
+    seconds = int(max(0, seconds))
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def _open_batch_csv(csv_path):
+    """Open the CSV for appending (semicolon-separated for German Excel); header only for a new file."""
+    import csv
+    is_new = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+    csv_file = open(csv_path, "a", newline="", encoding="utf-8-sig" if is_new else "utf-8")
+    writer = csv.DictWriter(csv_file, fieldnames=BATCH_CSV_FIELDS, delimiter=";")
+    if is_new:
+        writer.writeheader()
+    return csv_file, writer
+
+
+def run_batch(images_folder, csv_path=None, reverse=False, limit=None, retry_failed=False):
+    """Analyze a whole folder without the GUI and return the process exit code.
+
+    Results go to the result store (github_models_store) and, with csv_path,
+    into a CSV file. Images the store already has a result for are skipped,
+    so an interrupted run continues where it stopped and the GUI afterwards
+    only confirms pre-analyzed images. Requests go through the same limiter,
+    concurrency gate, cache and cascade as in the GUI. Single-image requests
+    are driven by AsyncModelsClient.analyze_many() without a thread per
+    request; multi-image requests (ANALYZER_BATCH_IMAGES > 1) are synchronous
+    and run in a thread pool.
+    """
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    token = get_github_token()
+    if not token:
+        print("Fehler: GITHUB_MODELS_TOKEN nicht gesetzt – Stapelanalyse nicht möglich.")
+        return 1
+    store = gm_store.get_result_store()
+    if store is None and not csv_path:
+        print("Fehler: Ergebnisspeicher deaktiviert (ANALYZER_STORE=0) – bitte --csv angeben.")
+        return 1
+
+    entries = []
+    for image_file in gm_io.get_image_files(images_folder, reverse=reverse):
+        image_path = os.path.join(images_folder, image_file)
+        identity = gm_io.file_identity(image_path)
+        if identity is not None:
+            entries.append((identity, image_path))
+    known = store.lookup(entries) if store is not None else {}
+    todo = []
+    for identity, image_path in entries:
+        state = known.get(identity) or {}
+        if state.get('result') is None and (retry_failed or not state.get('error')):
+            todo.append((identity, image_path))
+    skipped = len(entries) - len(todo)
+    if limit:
+        todo = todo[:limit]
+    print(f"{len(entries)} Bilder in {images_folder}, {skipped} bereits erledigt, {len(todo)} zu analysieren")
+    if not todo:
+        return 0
+
+    images_per_request = max(1, min(gm_api.MAX_BATCH_IMAGES, gm_api._env_int("ANALYZER_BATCH_IMAGES", 1)))
+    workers = gm_api.CONCURRENCY_GATE.max_concurrent
+    gm_api.get_http_client(pool_size=workers)
+    pending = deque(todo[start:start + images_per_request] for start in range(0, len(todo), images_per_request))
+    csv_file, writer = _open_batch_csv(csv_path) if csv_path else (None, None)
+    executor = ThreadPoolExecutor(max_workers=workers) if images_per_request > 1 else None
+    in_flight = {}
+    attempts = {}
+    retry_at = {}  # identity -> earliest time a failed image is sent again
+    counts = {'analyzed': 0, 'cached': 0, 'failed': 0}
+    paused_until = 0.0
+    stop_reason = None
+    started = time.time()
+
+    def _finish(identity, image_path, result):
+        if result.get('error'):
+            counts['failed'] += 1
+            if store is not None:
+                store.put_failure(identity, image_path, result['error'],
+                                  AnalysisBuffer._format_error_message(result['error']),
+                                  attempts.get(identity, 0), time.time())
+        else:
+            counts['analyzed'] += 1
+            counts['cached'] += int(bool(result.get('cached')))
+            if store is not None:
+                store.put_result(identity, image_path, result)
+        if writer is not None:
+            writer.writerow({
+                'filename': os.path.basename(image_path),
+                'animals': result.get('animals', ''),
+                'location': result.get('location', ''),
+                'date': result.get('date', ''),
+                'time': result.get('time', ''),
+                'model': result.get('model') or '',
+                'cached': 'ja' if result.get('cached') else '',
+                'escalation': ', '.join(result.get('escalation_reasons') or []),
+                'error': result.get('error') or '',
+            })
+            csv_file.flush()
+        done = counts['analyzed'] + counts['failed']
+        elapsed = time.time() - started
+        rate = done / elapsed * 60 if elapsed > 0 else 0.0
+        eta = (len(todo) - done) / rate * 60 if rate > 0 else 0
+        outcome = f"Fehler: {result['error']}" if result.get('error') else result.get('animals', '')
+        print(f"[{done:>{len(str(len(todo)))}}/{len(todo)}] {os.path.basename(image_path)}: {outcome} "
+              f"– {rate:.1f} Bilder/Min., noch ca. {_format_duration(eta)}")
+        if done % 25 == 0:
+            print(f"  {gm_usage.format_status()}")
+
+    def _group_due(group):
+        return max(retry_at.get(identity, 0.0) for identity, _ in group)
+
+    def _next_due_group():
+        """Take the first pending group whose retry time has come, or None."""
+        now = time.time()
+        for position, group in enumerate(pending):
+            if _group_due(group) <= now:
+                del pending[position]
+                return group
+        return None
+
+    def _handle(group, results):
+        nonlocal paused_until, stop_reason
+        for (identity, image_path), result in zip(group, results):
+            rate_limit = result.get('rate_limit')
+            if rate_limit:
+                # The limiter knows when a slot frees up; the image goes back to the front
+                pending.appendleft([(identity, image_path)])
+                if rate_limit['limit_type'] == 'day':
+                    stop_reason = f"Tageslimit erreicht (wieder möglich in ca. {_format_duration(rate_limit['wait_seconds'])})"
+                else:
+                    paused_until = max(paused_until, time.time() + rate_limit['wait_seconds'])
+                    print(f"  API-Limit ({rate_limit['limit_type']}): warte {rate_limit['wait_seconds']}s")
+            elif result.get('error') and attempts.get(identity, 0) < BATCH_MAX_RETRIES:
+                attempts[identity] = attempts.get(identity, 0) + 1
+                if store is not None:
+                    store.put_retry(identity, image_path, attempts[identity])
+                delay = min(BATCH_RETRY_MAX_DELAY, BATCH_RETRY_DELAY * 2 ** (attempts[identity] - 1))
+                retry_at[identity] = time.time() + delay
+                print(f"  {os.path.basename(image_path)}: Versuch {attempts[identity]} fehlgeschlagen, "
+                      f"neuer Versuch in {delay:.0f}s")
+                pending.append([(identity, image_path)])
+            else:
+                _finish(identity, image_path, result)
+
+    async def _run_single_requests():
+        """Send every due image through analyze_many(); rate-limited and failed ones come back to pending."""
+        async with gm_async.AsyncModelsClient(token, ANIMAL_SPECIES, max_concurrency=workers) as client:
+            while pending and stop_reason is None:
+                wake_at = max(paused_until, min(_group_due(group) for group in pending))
+                if wake_at > time.time():
+                    await asyncio.sleep(wake_at - time.time())
+                    continue
+                now = time.time()
+                due = [group for group in pending if _group_due(group) <= now]
+                later = [group for group in pending if _group_due(group) > now]
+                pending.clear()
+                pending.extend(later)
+                groups = {group[0][1]: group for group in due}
+                async for item in client.analyze_many(list(groups)):
+                    if item['cancelled']:
+                        pending.appendleft(groups[item['path']])
+                        continue
+                    if item['exception'] is not None:
+                        result = AnalysisBuffer._error_result(item['exception'])
+                    else:
+                        animals, location, time_str, date_str = item['result']
+                        result = AnalysisBuffer._build_result(animals, location, time_str, date_str,
+                                                              item['details'], None)
+                    _handle(groups[item['path']], [result])
+
+    try:
+        if executor is None:
+            asyncio.run(_run_single_requests())
+        while in_flight or (pending and stop_reason is None and executor is not None):
+            while pending and stop_reason is None and len(in_flight) < workers and time.time() >= paused_until:
+                group = _next_due_group()
+                if group is None:
+                    break
+                future = executor.submit(_analyze_for_batch, [image_path for _, image_path in group])
+                in_flight[future] = group
+            # Nothing can go out before the limiter pause and the earliest retry time are over
+            wake_at = max(paused_until, min((_group_due(group) for group in pending), default=0.0))
+            if not in_flight:
+                time.sleep(max(0.0, wake_at - time.time()))
+                continue
+            pause = wake_at - time.time() if pending and stop_reason is None else 0
+            done_futures, _ = wait(in_flight, timeout=pause if pause > 0 else None, return_when=FIRST_COMPLETED)
+            for future in done_futures:
+                group = in_flight.pop(future)
+                try:
+                    results = future.result()
+                except Exception as exc:
+                    results = [AnalysisBuffer._error_result(exc) for _ in group]
+                _handle(group, results)
+    except KeyboardInterrupt:
+        stop_reason = "abgebrochen"
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if csv_file is not None:
+            csv_file.close()
+        gm_api.close_http_client()
+
+    elapsed = time.time() - started
+    done = counts['analyzed'] + counts['failed']
+    print(
+        f"\n{counts['analyzed']} analysiert ({counts['cached']} aus Cache), {counts['failed']} fehlgeschlagen, "
+        f"{len(todo) - done} offen in {_format_duration(elapsed)}"
+        + (f" – {done / elapsed * 60:.1f} Bilder/Min." if elapsed > 0 else "")
+    )
+    if stop_reason:
+        print(f"Gestoppt: {stop_reason}. Erneuter Aufruf setzt fort.")
+    print(gm_usage.format_status())
+    return 0 if not counts['failed'] and not stop_reason else 2
+
+
 def start_analyzer(images_folder=None, output_excel=None):
     """Start the analyzer with optional folder and output file parameters.
     
@@ -2381,12 +3386,23 @@ def start_analyzer(images_folder=None, output_excel=None):
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Preparation stage workers in the frozen build
     parser = argparse.ArgumentParser()
     parser.add_argument('--no-gui', action='store_true', help='Schneller Test ohne GUI ausführen')
     parser.add_argument('--images-folder', help='Path to images folder')
     parser.add_argument('--output-excel', help='Path to output Excel file')
+    parser.add_argument('--api-base', help='Alternative API-Basis-URL (z.B. lokaler Mock-Server)')
+    parser.add_argument('--batch', action='store_true',
+                        help='Ganzen Bilderordner ohne GUI analysieren (Ergebnisse in den Ergebnisspeicher)')
+    parser.add_argument('--csv', help='Stapelanalyse: Ergebnisse zusätzlich in diese CSV-Datei schreiben')
+    parser.add_argument('--limit', type=int, help='Stapelanalyse: höchstens N Bilder analysieren')
+    parser.add_argument('--retry-failed', action='store_true', help='Stapelanalyse: fehlgeschlagene Bilder erneut versuchen')
+    parser.add_argument('--reverse', action='store_true', help='Stapelanalyse: Bilder rückwärts abarbeiten')
     args = parser.parse_args()
 
+    if args.api_base:
+        gm_api.set_api_base(args.api_base)
+
     refresh_token_cache()
 
     if not get_github_token():
@@ -2396,6 +3412,14 @@ if __name__ == "__main__":
         print("Test ohne GUI: Token vorhanden:", bool(get_github_token()))
         sys.exit(0)
 
+    if args.batch:
+        batch_folder = args.images_folder or IMAGES_FOLDER
+        if not batch_folder or not os.path.isdir(batch_folder):
+            print("Fehler: --batch braucht einen Bilderordner (--images-folder oder ANALYZER_IMAGES_FOLDER).")
+            sys.exit(1)
+        sys.exit(run_batch(batch_folder, csv_path=args.csv, reverse=args.reverse, limit=args.limit,
+                           retry_failed=args.retry_failed))
+
     # Use command line arguments if provided, otherwise fall back to environment
     analyzer = ImageAnalyzer(
         images_folder=args.images_folder if hasattr(args, 'images_folder') else None,
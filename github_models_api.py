@@ -5,12 +5,28 @@ Contains analyze_with_github_models(image_path, token, animal_species) which
 wraps the lower-level request logic and parsing.
 """
 import base64
+from collections import deque
 from datetime import datetime
 from pathlib import Path
+import hashlib
+import io
 import json
+import math
+import os
 import re
+import threading
+import time
 import traceback
 import requests
+from requests.adapters import HTTPAdapter
+import github_models_cache as gm_cache
+import github_models_journal as gm_journal
+import github_models_usage as gm_usage
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow missing -> upload original bytes unchanged
+    Image = None
 
 
 LOG_DIR = Path.home() / ".kamerafallen-tools"
@@ -22,123 +38,2610 @@ except Exception:
 LOG_PATH = LOG_DIR / "analyzer_debug.log"
 
 
-def _log_debug(message: str):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_line = f"[{timestamp}] [API] {message}"
-    try:
-        with LOG_PATH.open("a", encoding="utf-8") as log_file:
-            log_file.write(log_line + "\n")
-    except Exception:
-        # Last resort: print to stdout (may be captured by callers)
-        try:
-            print(log_line)
-        except Exception:
-            pass
+def _log_debug(message: str):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    log_line = f"[{timestamp}] [API] {message}"
+    try:
+        with LOG_PATH.open("a", encoding="utf-8") as log_file:
+            log_file.write(log_line + "\n")
+    except Exception:
+        # Last resort: print to stdout (may be captured by callers)
+        try:
+            print(log_line)
+        except Exception:
+            pass
+
+
+# ---------------------------------------------------------------------------
+# Shared HTTP client
+# ---------------------------------------------------------------------------
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+CONNECT_TIMEOUT = _env_float("ANALYZER_CONNECT_TIMEOUT", 5.0)
+READ_TIMEOUT = _env_float("ANALYZER_READ_TIMEOUT", 30.0)
+DEFAULT_POOL_SIZE = 2  # Matches the AnalysisBuffer executor (GitHub Models allows 2 concurrent requests)
+
+
+class ModelsHttpClient:
+    """Long-lived keep-alive HTTP client shared by all endpoint/model attempts.
+
+    Wraps a single requests.Session whose connection pool is sized to the
+    number of worker threads, so TCP/TLS handshakes are paid once per
+    connection instead of once per image.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT):
+        self.pool_size = max(1, int(pool_size))
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.requests_sent = 0
+        self._lock = threading.Lock()
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+            "Connection": "keep-alive",
+        })
+        self._adapter = None
+        self._mount_adapter()
+
+    def _mount_adapter(self):
+        old_adapter = self._adapter
+        # Retries are handled by AnalysisBuffer, so the adapter must not retry on its own
+        self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=0)
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        if old_adapter is not None:
+            try:
+                old_adapter.close()
+            except Exception:
+                pass
+
+    def resize(self, pool_size):
+        """Grow the connection pool, e.g. when the executor gets more workers."""
+        pool_size = max(1, int(pool_size))
+        with self._lock:
+            if pool_size <= self.pool_size:
+                return
+            self.pool_size = pool_size
+            self._mount_adapter()
+        _log_debug(f"HTTP connection pool resized to {pool_size}")
+
+    def post(self, url, headers=None, json=None, data=None, stream=False):
+        with self._lock:
+            self.requests_sent += 1
+        return self.session.post(
+            url,
+            headers=headers,
+            json=json,
+            data=data,
+            stream=stream,
+            timeout=(self.connect_timeout, self.read_timeout),
+        )
+
+    def get_stats(self):
+        """Return connection-reuse counters taken from the urllib3 pools."""
+        connections_opened = 0
+        pool_requests = 0
+        try:
+            pools = self._adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                connections_opened += getattr(pool, "num_connections", 0)
+                pool_requests += getattr(pool, "num_requests", 0)
+        except Exception as exc:
+            _log_debug(f"Could not read connection pool stats: {exc}")
+        return {
+            'requests': self.requests_sent,
+            'connections_opened': connections_opened,
+            'connections_reused': max(0, pool_requests - connections_opened),
+            'pool_size': self.pool_size,
+        }
+
+    def close(self):
+        try:
+            self.session.close()
+        except Exception:
+            pass
+
+
+_HTTP_CLIENT = None
+_HTTP_CLIENT_LOCK = threading.Lock()
+
+
+def get_http_client(pool_size=None):
+    """Return the shared HTTP client, creating (or growing) it on demand."""
+    global _HTTP_CLIENT
+    with _HTTP_CLIENT_LOCK:
+        if _HTTP_CLIENT is None:
+            _HTTP_CLIENT = ModelsHttpClient(pool_size=pool_size or DEFAULT_POOL_SIZE)
+            _log_debug(
+                f"Created HTTP client (pool_size={_HTTP_CLIENT.pool_size}, "
+                f"timeouts={CONNECT_TIMEOUT}s connect / {READ_TIMEOUT}s read)"
+            )
+            return _HTTP_CLIENT
+    if pool_size:
+        _HTTP_CLIENT.resize(pool_size)
+    return _HTTP_CLIENT
+
+
+def get_connection_stats():
+    """Expose connection reuse counters (requests vs. opened connections)."""
+    if _HTTP_CLIENT is None:
+        return {'requests': 0, 'connections_opened': 0, 'connections_reused': 0, 'pool_size': 0}
+    return _HTTP_CLIENT.get_stats()
+
+
+def close_http_client():
+    global _HTTP_CLIENT
+    with _HTTP_CLIENT_LOCK:
+        if _HTTP_CLIENT is not None:
+            _HTTP_CLIENT.close()
+            _HTTP_CLIENT = None
+
+
+# ---------------------------------------------------------------------------
+# Upload profiles (client-side downscale / re-encode before base64)
+# ---------------------------------------------------------------------------
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+DEFAULT_UPLOAD_PROFILE = {
+    'max_edge': max(0, _env_int("ANALYZER_UPLOAD_MAX_EDGE", 2048)),  # 0 disables resizing
+    'jpeg_quality': _env_int("ANALYZER_UPLOAD_JPEG_QUALITY", 85),
+    'strip_exif': os.environ.get("ANALYZER_UPLOAD_STRIP_EXIF", "1") != "0",
+}
+
+# Per-model overrides. The footer text (STANDORT/UHRZEIT/DATUM) is small, so
+# gpt-4o keeps the default resolution; gpt-4o-mini is billed per tile and gets a
+# smaller upload (unless resizing is switched off with max_edge 0).
+UPLOAD_PROFILES = {
+    "gpt-4o": dict(DEFAULT_UPLOAD_PROFILE),
+    "gpt-4o-mini": {**DEFAULT_UPLOAD_PROFILE, 'max_edge': min(DEFAULT_UPLOAD_PROFILE['max_edge'], 1536),
+                    'jpeg_quality': 80},
+}
+
+# Assumed uplink bandwidth used to translate saved bytes into saved latency
+UPLINK_MBPS = _env_float("ANALYZER_UPLINK_MBPS", 10.0) or 10.0
+
+_UPLOAD_TOTALS = {'requests': 0, 'original_bytes': 0, 'upload_bytes': 0, 'est_latency_saved_ms': 0.0}
+_UPLOAD_LOCK = threading.Lock()
+
+
+def get_upload_profile(model_name: str):
+    """Return the upload profile for a model (falls back to the default profile)."""
+    return dict(UPLOAD_PROFILES.get(model_name, DEFAULT_UPLOAD_PROFILE))
+
+
+def set_upload_profile(model_name: str, **overrides):
+    """Override max_edge / jpeg_quality / strip_exif for a single model."""
+    profile = get_upload_profile(model_name)
+    profile.update({k: v for k, v in overrides.items() if k in DEFAULT_UPLOAD_PROFILE})
+    UPLOAD_PROFILES[model_name] = profile
+    return profile
+
+
+def get_upload_stats():
+    """Totals of bytes and estimated latency saved by the upload profiles."""
+    with _UPLOAD_LOCK:
+        stats = dict(_UPLOAD_TOTALS)
+    stats['bytes_saved'] = stats['original_bytes'] - stats['upload_bytes']
+    return stats
+
+
+def _encode_image_for_upload(image_data: bytes, profile: dict):
+    """Downscale and re-encode image bytes according to profile.
+
+    Returns (jpeg_bytes, stats). Falls back to the original bytes whenever
+    Pillow is unavailable or re-encoding would not make the upload smaller,
+    unless the profile strips EXIF and the original carries some.
+    """
+    started = time.perf_counter()
+    stats = {
+        'original_bytes': len(image_data),
+        'upload_bytes': len(image_data),
+        'original_size': None,
+        'upload_size': None,
+        'encode_ms': 0.0,
+    }
+    if Image is None or not profile:
+        return image_data, stats
+
+    try:
+        with Image.open(io.BytesIO(image_data)) as img:
+            stats['original_size'] = img.size
+            max_edge = int(profile.get('max_edge') or 0)
+            needs_resize = bool(max_edge) and max(img.size) > max_edge
+            if not needs_resize and not profile.get('strip_exif') and img.format == 'JPEG':
+                stats['upload_size'] = img.size
+                return image_data, stats
+
+            exif = img.info.get('exif')
+            source_format = img.format
+            if needs_resize and source_format == 'JPEG':
+                # Let libjpeg decode at a reduced scale; much cheaper than a full decode + resize
+                img.draft('RGB', (max_edge, max_edge))
+            work = img if img.mode in ('RGB', 'L') else img.convert('RGB')
+            if needs_resize:
+                work = work.copy() if work is img else work
+                work.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+
+            save_kwargs = {'format': 'JPEG', 'quality': int(profile.get('jpeg_quality') or 85), 'optimize': True}
+            if exif and not profile.get('strip_exif'):
+                save_kwargs['exif'] = exif
+            buffer = io.BytesIO()
+            work.save(buffer, **save_kwargs)
+            encoded = buffer.getvalue()
+            upload_size = work.size
+    except Exception as exc:
+        _log_debug(f"Upload re-encode failed, sending original bytes: {exc}")
+        return image_data, stats
+
+    stripping_exif = bool(exif) and bool(profile.get('strip_exif'))
+    if not needs_resize and len(encoded) >= len(image_data) and source_format == 'JPEG' and not stripping_exif:
+        # Re-encoding only makes sense if it actually shrinks the upload (or has to drop EXIF)
+        stats['upload_size'] = stats['original_size']
+        stats['encode_ms'] = (time.perf_counter() - started) * 1000
+        return image_data, stats
+
+    stats['upload_bytes'] = len(encoded)
+    stats['upload_size'] = upload_size
+    stats['encode_ms'] = (time.perf_counter() - started) * 1000
+    return encoded, stats
+
+
+def _record_upload_stats(model_name: str, stats: dict, details=None):
+    # base64 inflates the payload by 4/3, which is what actually goes over the wire
+    saved_wire_bytes = (stats['original_bytes'] - stats['upload_bytes']) * 4 / 3
+    transfer_saved_ms = saved_wire_bytes * 8 / (UPLINK_MBPS * 1_000_000) * 1000
+    stats['bytes_saved'] = stats['original_bytes'] - stats['upload_bytes']
+    stats['est_latency_saved_ms'] = round(transfer_saved_ms - stats['encode_ms'], 1)
+
+    with _UPLOAD_LOCK:
+        _UPLOAD_TOTALS['requests'] += 1
+        _UPLOAD_TOTALS['original_bytes'] += stats['original_bytes']
+        _UPLOAD_TOTALS['upload_bytes'] += stats['upload_bytes']
+        _UPLOAD_TOTALS['est_latency_saved_ms'] += stats['est_latency_saved_ms']
+
+    if details is not None:
+        details['upload'] = dict(stats, model=model_name)
+
+    _log_debug(
+        f"Upload for {model_name}: {stats['original_bytes']} -> {stats['upload_bytes']} bytes "
+        f"({stats['original_size']} -> {stats['upload_size']}), encode {stats['encode_ms']:.0f}ms, "
+        f"est. latency saved {stats['est_latency_saved_ms']:.0f}ms"
+    )
+
+
+# ---------------------------------------------------------------------------
+# Proactive rate limiting (driven by x-ratelimit-* / Retry-After headers)
+# ---------------------------------------------------------------------------
+# Starting budgets until the first response headers tell us the real ones
+# (models without an entry in MODEL_REQUEST_LIMITS)
+DEFAULT_REQUESTS_PER_MINUTE = _env_float("ANALYZER_RPM", 10)
+DEFAULT_REQUESTS_PER_DAY = _env_float("ANALYZER_RPD", 50)
+DEFAULT_MAX_CONCURRENT = _env_int("ANALYZER_MAX_CONCURRENT", 2)
+DEFAULT_TOKENS_PER_MINUTE = _env_float("ANALYZER_TPM", 0)  # 0 = unknown/unlimited
+DEFAULT_TOKENS_PER_REQUEST = 1500
+# Longer waits are not slept away inside a worker thread but reported to the caller
+MAX_LIMITER_WAIT = _env_float("ANALYZER_MAX_LIMITER_WAIT", 20)
+
+
+def _load_model_request_limits():
+    """{model: (requests per minute, requests per day)}; the headers never report the daily limit.
+
+    ANALYZER_MODEL_LIMITS="gpt-4o-mini=15/150,gpt-4o=10/50" overrides single models.
+    """
+    limits = {
+        "gpt-4o": (10.0, 50.0),  # GitHub Models "high" tier
+        "gpt-4o-mini": (15.0, 150.0),  # "low" tier
+    }
+    for item in os.environ.get("ANALYZER_MODEL_LIMITS", "").split(','):
+        model_name, _, values = item.partition('=')
+        per_minute, _, per_day = values.partition('/')
+        try:
+            limits[model_name.strip()] = (float(per_minute), float(per_day))
+        except ValueError:
+            if item.strip():
+                _log_debug(f"Ignoring malformed ANALYZER_MODEL_LIMITS entry: {item!r}")
+    return limits
+
+
+MODEL_REQUEST_LIMITS = _load_model_request_limits()
+
+
+def model_request_limits(model_name: str):
+    """Starting (requests per minute, requests per day) budget for a model."""
+    return MODEL_REQUEST_LIMITS.get(model_name, (DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_REQUESTS_PER_DAY))
+
+
+class RateLimitError(RuntimeError):
+    """Raised when a request cannot be sent (or was rejected) because of a rate limit.
+
+    wait_seconds and limit_type ('minute', 'day', 'tokens' or 'concurrent') let
+    the caller schedule a resume without parsing the message text.
+    """
+
+    def __init__(self, message, wait_seconds, limit_type):
+        super().__init__(message)
+        self.wait_seconds = max(1, int(round(wait_seconds)))
+        self.limit_type = limit_type
+
+
+def _parse_duration(value):
+    """Parse header durations like '12', '1.5', '6m0s', '250ms' into seconds."""
+    if value is None:
+        return None
+    text = str(value).strip().lower()
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', text):
+        matched = True
+        amount = float(amount)
+        total += {'ms': amount / 1000, 's': amount, 'm': amount * 60, 'h': amount * 3600}[unit]
+    return total if matched else None
+
+
+def _header(headers, name):
+    try:
+        return headers.get(name)
+    except Exception:
+        return None
+
+
+def _header_float(headers, name):
+    value = _header(headers, name)
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _seconds_until_midnight():
+    now = datetime.now()
+    return (24 * 3600) - (now.hour * 3600 + now.minute * 60 + now.second)
+
+
+class RateLimiter:
+    """Token-bucket limiter for one model (per-minute, per-day and token budgets).
+
+    Budgets start from the configured defaults and are corrected from the
+    x-ratelimit-* headers of every response, so requests are delayed *before*
+    the service would answer with 429.
+    """
+
+    def __init__(self, name, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+                 requests_per_day=DEFAULT_REQUESTS_PER_DAY, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE):
+        self.name = name
+        self._lock = threading.Lock()
+        now = time.monotonic()
+        self.rpm_capacity = float(requests_per_minute)
+        self.rpm_tokens = float(requests_per_minute)
+        self.tpm_capacity = float(tokens_per_minute)
+        self.tpm_tokens = float(tokens_per_minute)
+        self.rpd_limit = float(requests_per_day)
+        self.rpd_remaining = float(requests_per_day)
+        self._day = datetime.now().date()
+        self._last_refill = now
+        self.blocked_until = 0.0
+        self.blocked_type = None
+        self.avg_tokens_per_request = float(DEFAULT_TOKENS_PER_REQUEST)
+        self.requests_sent = 0
+        self.rejections = 0
+
+    def _refill(self, now):
+        elapsed = max(0.0, now - self._last_refill)
+        self._last_refill = now
+        if self.rpm_capacity > 0:
+            self.rpm_tokens = min(self.rpm_capacity, self.rpm_tokens + elapsed * self.rpm_capacity / 60.0)
+        if self.tpm_capacity > 0:
+            self.tpm_tokens = min(self.tpm_capacity, self.tpm_tokens + elapsed * self.tpm_capacity / 60.0)
+        today = datetime.now().date()
+        if today != self._day:
+            self._day = today
+            self.rpd_remaining = self.rpd_limit
+
+    def _wait_needed(self, now, est_tokens):
+        """Return (wait_seconds, limit_type) for the next request; (0, None) if it may go."""
+        if self.blocked_until > now:
+            return self.blocked_until - now, self.blocked_type or 'minute'
+        if self.rpd_limit > 0 and self.rpd_remaining < 1:
+            return _seconds_until_midnight(), 'day'
+        if self.rpm_capacity > 0 and self.rpm_tokens < 1:
+            return (1 - self.rpm_tokens) * 60.0 / self.rpm_capacity, 'minute'
+        if self.tpm_capacity > 0 and self.tpm_tokens < min(est_tokens, self.tpm_capacity):
+            needed = min(est_tokens, self.tpm_capacity) - self.tpm_tokens
+            return needed * 60.0 / self.tpm_capacity, 'tokens'
+        return 0.0, None
+
+    def try_acquire(self, est_tokens=None):
+        """Consume budget if available. Returns (ok, wait_seconds, limit_type)."""
+        est_tokens = est_tokens or self.avg_tokens_per_request
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait, limit_type = self._wait_needed(now, est_tokens)
+            if wait > 0:
+                return False, wait, limit_type
+            self.rpm_tokens -= 1
+            self.rpd_remaining -= 1
+            if self.tpm_capacity > 0:
+                self.tpm_tokens -= est_tokens
+            self.requests_sent += 1
+            return True, 0.0, None
+
+    def acquire(self, est_tokens=None, max_wait=MAX_LIMITER_WAIT):
+        """Block until the request fits the budgets or raise RateLimitError."""
+        while True:
+            ok, wait, limit_type = self.try_acquire(est_tokens)
+            if ok:
+                return
+            if wait > max_wait:
+                raise RateLimitError(
+                    f"Rate limit ({limit_type}) for {self.name}: next slot in {wait:.0f}s",
+                    wait, limit_type
+                )
+            _log_debug(f"Rate limiter delaying {self.name} request by {wait:.1f}s ({limit_type})")
+            time.sleep(wait)
+
+    def block(self, seconds, limit_type):
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.blocked_type = limit_type
+            self.rejections += 1
+            if limit_type == 'day':
+                self.rpd_remaining = 0
+            elif limit_type == 'minute':
+                self.rpm_tokens = min(self.rpm_tokens, 0)
+
+    def update_from_response(self, headers=None, usage=None):
+        """Adopt the budgets reported by the service and learn tokens per request."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if usage:
+                total = usage.get('total_tokens') or (
+                    (usage.get('prompt_tokens') or 0) + (usage.get('completion_tokens') or 0)
+                )
+                if total:
+                    self.avg_tokens_per_request = 0.8 * self.avg_tokens_per_request + 0.2 * float(total)
+            if headers is None:
+                return
+            for kind in ('requests', 'tokens'):
+                limit = _header_float(headers, f"x-ratelimit-limit-{kind}")
+                remaining = _header_float(headers, f"x-ratelimit-remaining-{kind}")
+                period = _parse_duration(_header(headers, f"x-ratelimit-renewalperiod-{kind}"))
+                reset = _parse_duration(_header(headers, f"x-ratelimit-reset-{kind}"))
+                if limit is None and remaining is None:
+                    continue
+                daily = period is not None and period >= 3600
+                if kind == 'requests' and daily:
+                    if limit is not None:
+                        self.rpd_limit = limit
+                    if remaining is not None:
+                        self.rpd_remaining = remaining
+                elif kind == 'requests':
+                    if limit is not None:
+                        self.rpm_capacity = limit * 60.0 / period if period else limit
+                    if remaining is not None:
+                        self.rpm_tokens = min(self.rpm_capacity or remaining, remaining)
+                elif not daily:
+                    if limit is not None:
+                        self.tpm_capacity = limit * 60.0 / period if period else limit
+                    if remaining is not None:
+                        self.tpm_tokens = min(self.tpm_capacity or remaining, remaining)
+                if remaining is not None and remaining < 1 and reset:
+                    limit_type = 'day' if daily else ('minute' if kind == 'requests' else 'tokens')
+                    self.blocked_until = max(self.blocked_until, now + reset)
+                    self.blocked_type = limit_type
+
+    def get_state(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait, limit_type = self._wait_needed(now, self.avg_tokens_per_request)
+            return {
+                'model': self.name,
+                'minute_remaining': max(0.0, self.rpm_tokens),
+                'minute_limit': self.rpm_capacity,
+                'day_remaining': max(0.0, self.rpd_remaining),
+                'day_limit': self.rpd_limit,
+                'tokens_remaining': max(0.0, self.tpm_tokens) if self.tpm_capacity else None,
+                'tokens_limit': self.tpm_capacity or None,
+                'avg_tokens_per_request': self.avg_tokens_per_request,
+                'wait_seconds': wait,
+                'limit_type': limit_type,
+                'requests_sent': self.requests_sent,
+                'rejections': self.rejections,
+            }
+
+
+class ConcurrencyGate:
+    """Counts in-flight requests; GitHub Models limits concurrency per user, not per model."""
+
+    def __init__(self, max_concurrent=DEFAULT_MAX_CONCURRENT):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def try_enter(self):
+        with self._cond:
+            if self.in_flight >= self.max_concurrent:
+                return False
+            self.in_flight += 1
+            return True
+
+    def enter(self, max_wait=MAX_LIMITER_WAIT):
+        deadline = time.monotonic() + max_wait
+        with self._cond:
+            while self.in_flight >= self.max_concurrent:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RateLimitError("Zu viele gleichzeitige Anfragen", 2, 'concurrent')
+                self._cond.wait(remaining)
+            self.in_flight += 1
+
+    def leave(self):
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._cond.notify()
+
+    def set_max_concurrent(self, max_concurrent):
+        """Change the limit; threads waiting in enter() take newly freed slots right away."""
+        with self._cond:
+            self.max_concurrent = max(1, int(max_concurrent))
+            self._cond.notify_all()
+
+
+_RATE_LIMITERS = {}
+_RATE_LIMITERS_LOCK = threading.Lock()
+CONCURRENCY_GATE = ConcurrencyGate()
+
+
+def get_rate_limiter(model_name: str, token=None):
+    """Return the limiter for a model, or for one (token, model) pair of the token pool."""
+    key = model_name if token is None else (token_fingerprint(token), model_name)
+    with _RATE_LIMITERS_LOCK:
+        limiter = _RATE_LIMITERS.get(key)
+        if limiter is None:
+            name = model_name if token is None else f"{model_name} [{key[0]}]"
+            per_minute, per_day = model_request_limits(model_name)
+            limiter = _RATE_LIMITERS[key] = RateLimiter(name, requests_per_minute=per_minute,
+                                                        requests_per_day=per_day)
+        return limiter
+
+
+def get_rate_limit_state():
+    """Snapshot of all limiter budgets for display in the UI."""
+    with _RATE_LIMITERS_LOCK:
+        limiters = list(_RATE_LIMITERS.values())
+    pool = _TOKEN_POOL
+    return {
+        'models': {limiter.name: limiter.get_state() for limiter in limiters},
+        'in_flight': CONCURRENCY_GATE.in_flight,
+        'max_concurrent': CONCURRENCY_GATE.max_concurrent,
+        'tokens': pool.get_state() if pool is not None and len(pool) > 1 else [],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Token pool (several accounts, each with its own per-minute/per-day quota)
+# ---------------------------------------------------------------------------
+# One token per line; '#' starts a comment. GITHUB_MODELS_TOKENS may also list tokens.
+TOKEN_FILE = Path(os.environ.get("GITHUB_MODELS_TOKEN_FILE") or (LOG_DIR / "tokens.txt"))
+
+
+def token_fingerprint(token: str) -> str:
+    """Short non-reversible id of a token for logs and the status line."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:8]
+
+
+def load_tokens(primary=None):
+    """Collect tokens from primary, GITHUB_MODELS_TOKENS and the token file (deduplicated)."""
+    candidates = [primary or '']
+    candidates.extend(re.split(r'[\s,;]+', os.environ.get("GITHUB_MODELS_TOKENS", "")))
+    try:
+        if TOKEN_FILE.exists():
+            for line in TOKEN_FILE.read_text(encoding="utf-8").splitlines():
+                candidates.append(line.split('#', 1)[0])
+    except Exception as exc:
+        _log_debug(f"Could not read token file {TOKEN_FILE}: {exc}")
+    tokens = []
+    for token in candidates:
+        token = token.strip()
+        if token and token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+class TokenPool:
+    """Round-robin over tokens that still have headroom for a model.
+
+    Every (token, model) pair has its own RateLimiter, so one account hitting
+    its daily limit is parked while the others keep working.
+    """
+
+    def __init__(self, tokens=()):
+        self._lock = threading.Lock()
+        self.tokens = []
+        self._next = 0
+        self._usage = {}  # {fingerprint: {'day': date, 'requests': int}}
+        self._parked = {}  # {(fingerprint, model): monotonic time the day budget returns}
+        for token in tokens:
+            self.add(token)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def add(self, token):
+        token = (token or '').strip()
+        with self._lock:
+            if not token or token in self.tokens:
+                return
+            self.tokens.append(token)
+            # Concurrency is limited per account, so every token adds its own slots
+            CONCURRENCY_GATE.set_max_concurrent(max(1, DEFAULT_MAX_CONCURRENT) * len(self.tokens))
+        _log_debug(f"Token pool: added token {token_fingerprint(token)} ({len(self.tokens)} total)")
+
+    def try_acquire(self, model_name, est_tokens=None):
+        """Pick the next token with headroom. Returns (token, limiter, wait_seconds, limit_type)."""
+        with self._lock:
+            if not self.tokens:
+                raise RuntimeError("Kein GitHub Models Token konfiguriert")
+            count = len(self.tokens)
+            waits = []
+            for offset in range(count):
+                position = (self._next + offset) % count
+                token = self.tokens[position]
+                limiter = get_rate_limiter(model_name, token)
+                ok, wait, limit_type = limiter.try_acquire(est_tokens)
+                if ok:
+                    self._next = (position + 1) % count
+                    self._count_request(token)
+                    self._parked.pop((token_fingerprint(token), model_name), None)
+                    return token, limiter, 0.0, None
+                if limit_type == 'day':
+                    self._park(token, model_name, wait)
+                waits.append((wait, limit_type))
+            wait, limit_type = min(waits)
+            return None, None, wait, limit_type
+
+    def acquire(self, model_name, est_tokens=None, max_wait=MAX_LIMITER_WAIT):
+        """Block until some token may send, or raise RateLimitError."""
+        while True:
+            token, limiter, wait, limit_type = self.try_acquire(model_name, est_tokens)
+            if token is not None:
+                return token, limiter
+            if wait > max_wait:
+                raise RateLimitError(
+                    f"Rate limit ({limit_type}) für {model_name} auf allen {len(self)} Token: "
+                    f"nächster Slot in {wait:.0f}s", wait, limit_type
+                )
+            _log_debug(f"Token pool delaying {model_name} request by {wait:.1f}s ({limit_type})")
+            time.sleep(wait)
+
+    def _count_request(self, token):
+        fingerprint = token_fingerprint(token)
+        today = datetime.now().date()
+        usage = self._usage.get(fingerprint)
+        if usage is None or usage['day'] != today:
+            usage = self._usage[fingerprint] = {'day': today, 'requests': 0}
+        usage['requests'] += 1
+
+    def _park(self, token, model_name, wait):
+        key = (token_fingerprint(token), model_name)
+        if key not in self._parked:
+            _log_debug(f"Token {key[0]} parked for {model_name}: daily limit reached ({wait / 3600:.1f}h)")
+        self._parked[key] = time.monotonic() + wait
+
+    def get_state(self):
+        """Per-token usage for the status display (fingerprints only, never the token)."""
+        now = time.monotonic()
+        today = datetime.now().date()
+        with self._lock:
+            state = []
+            for token in self.tokens:
+                fingerprint = token_fingerprint(token)
+                usage = self._usage.get(fingerprint)
+                state.append({
+                    'token': fingerprint,
+                    'requests_today': usage['requests'] if usage and usage['day'] == today else 0,
+                    'parked_models': sorted(
+                        model for (parked_fp, model), until in self._parked.items()
+                        if parked_fp == fingerprint and until > now
+                    ),
+                })
+            return state
+
+
+_TOKEN_POOL = None
+_TOKEN_POOL_LOCK = threading.Lock()
+
+
+def get_token_pool(primary=None):
+    """Return the shared token pool, built on first use; ``primary`` is added if missing."""
+    global _TOKEN_POOL
+    with _TOKEN_POOL_LOCK:
+        if _TOKEN_POOL is None:
+            _TOKEN_POOL = TokenPool(load_tokens(primary))
+    if primary:
+        _TOKEN_POOL.add(primary)
+    return _TOKEN_POOL
+
+
+def _bearer_token(headers):
+    value = (headers or {}).get("Authorization", "")
+    return value[len("Bearer "):] if value.startswith("Bearer ") else value
+
+
+def _classify_rejection(response):
+    """Turn a 429 response into (wait_seconds, limit_type) using headers first."""
+    headers = response.headers
+    wait = _parse_duration(_header(headers, "retry-after"))
+    if wait is None:
+        retry_ms = _header_float(headers, "retry-after-ms") or _header_float(headers, "x-ms-retry-after-ms")
+        wait = retry_ms / 1000 if retry_ms else None
+    limit_kind = (_header(headers, "x-ratelimit-type") or "").lower()
+    try:
+        body = response.text or ""
+    except Exception:
+        body = ""
+    if 'concurrent' in limit_kind or 'UserConcurrentRequests' in body:
+        return (wait or 2), 'concurrent'
+    if 'day' in limit_kind or 'ByDay' in body or (wait is not None and wait > 3600):
+        return (wait or _seconds_until_midnight()), 'day'
+    if 'token' in limit_kind:
+        return (wait or 60), 'tokens'
+    if wait is None:
+        match = re.search(r'Please wait (\d+) seconds?', body)
+        wait = float(match.group(1)) if match else 60
+    return wait, 'minute'
+
+
+# Only use models.inference.ai.azure.com - api.github.com/models returns 404.
+# ANALYZER_API_BASE points the client at another server (e.g. github_models_mock_server).
+DEFAULT_API_BASE = (os.environ.get("ANALYZER_API_BASE") or "https://models.inference.ai.azure.com").rstrip('/')
+ENDPOINTS_AND_MODELS = [
+    (DEFAULT_API_BASE, "gpt-4o"),
+    (DEFAULT_API_BASE, "gpt-4o-mini"),
+]
+
+
+def set_api_base(api_base: str):
+    """Send all model requests to ``api_base`` (used by the --api-base CLI option)."""
+    global DEFAULT_API_BASE
+    DEFAULT_API_BASE = api_base.rstrip('/')
+    ENDPOINTS_AND_MODELS[:] = [(DEFAULT_API_BASE, model_name) for _, model_name in ENDPOINTS_AND_MODELS]
+    _log_debug(f"API base set to {DEFAULT_API_BASE}")
+
+
+PLACEHOLDER_RESULT = ("Error in analysis", "", "", "")
+
+
+# ---------------------------------------------------------------------------
+# Circuit breaker per (endpoint, model)
+# ---------------------------------------------------------------------------
+BREAKER_FAILURE_THRESHOLD = _env_int("ANALYZER_BREAKER_FAILURES", 3)
+BREAKER_COOLDOWN = _env_float("ANALYZER_BREAKER_COOLDOWN", 60)
+BREAKER_MAX_COOLDOWN = 600
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a model whose circuit is open."""
+
+    def __init__(self, message, retry_in):
+        super().__init__(message)
+        self.retry_in = retry_in
+
+
+class BatchRejectedError(RuntimeError):
+    """Raised when the service answers a multi-image request with a 400 (too large, content filter).
+
+    The endpoint is healthy, so the circuit breaker does not count it; the
+    images are sent one by one instead.
+    """
+
+
+class CircuitBreaker:
+    """closed -> open after N consecutive failures -> half-open probe after the cooldown.
+
+    Failures are exceptions and placeholder answers; rate limits and rejected
+    batches are not failures (the limiter and the single requests handle those). A failed probe re-opens the circuit
+    with a doubled cooldown, a successful one closes it.
+    """
+
+    def __init__(self, api_base, model_name, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 cooldown=BREAKER_COOLDOWN):
+        self.api_base = api_base
+        self.model_name = model_name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.base_cooldown = float(cooldown)
+        self.cooldown = float(cooldown)
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a request may be sent now (claims the probe slot when half-open)."""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = 'half_open'
+                self.probe_in_flight = False
+            if self.state == 'half_open' and not self.probe_in_flight:
+                self.probe_in_flight = True
+                _log_debug(f"Circuit {self.model_name}@{self.api_base}: half-open, sending probe")
+                return True
+            return False
+
+    def retry_in(self):
+        with self._lock:
+            if self.state != 'open':
+                return 0.0
+            return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                _log_debug(f"Circuit {self.model_name}@{self.api_base}: closed again")
+            self.state = 'closed'
+            self.consecutive_failures = 0
+            self.cooldown = self.base_cooldown
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == 'half_open':
+                self.cooldown = min(BREAKER_MAX_COOLDOWN, self.cooldown * 2)
+                self._open()
+            elif self.state == 'closed' and self.consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def release_probe(self):
+        """A probe ended without a verdict (e.g. rate limited) - allow another one."""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def _open(self):
+        self.state = 'open'
+        self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+        self.times_opened += 1
+        _log_debug(
+            f"Circuit {self.model_name}@{self.api_base}: open for {self.cooldown:.0f}s "
+            f"after {self.consecutive_failures} failures"
+        )
+
+    def get_state(self):
+        return {
+            'api_base': self.api_base,
+            'model': self.model_name,
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'retry_in': self.retry_in(),
+            'times_opened': self.times_opened,
+        }
+
+
+_CIRCUIT_BREAKERS = {}
+_CIRCUIT_LOCK = threading.Lock()
+
+
+def get_circuit_breaker(api_base: str, model_name: str):
+    with _CIRCUIT_LOCK:
+        breaker = _CIRCUIT_BREAKERS.get((api_base, model_name))
+        if breaker is None:
+            breaker = _CIRCUIT_BREAKERS[(api_base, model_name)] = CircuitBreaker(api_base, model_name)
+        return breaker
+
+
+def get_circuit_state():
+    """State of every breaker that has seen traffic (for the status line)."""
+    with _CIRCUIT_LOCK:
+        breakers = list(_CIRCUIT_BREAKERS.values())
+    return [breaker.get_state() for breaker in breakers]
+
+
+# ---------------------------------------------------------------------------
+# Observed latency (drives request hedging for the visible image)
+# ---------------------------------------------------------------------------
+_LATENCIES = {}  # {model_name: deque of request seconds}
+_LATENCY_LOCK = threading.Lock()
+
+
+def record_latency(model_name: str, seconds: float):
+    with _LATENCY_LOCK:
+        _LATENCIES.setdefault(model_name, deque(maxlen=100)).append(float(seconds))
+
+
+def get_latency_percentile(model_name: str, fraction: float = 0.9, min_samples: int = 5):
+    """Observed request latency percentile in seconds, or None with too few samples."""
+    with _LATENCY_LOCK:
+        samples = sorted(_LATENCIES.get(model_name, ()))
+    if len(samples) < min_samples:
+        return None
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+def hedge_models():
+    """(primary, alternate) (api_base, model) pairs for a hedged request."""
+    if get_model_policy() == 'strong':
+        return ENDPOINTS_AND_MODELS[0], ENDPOINTS_AND_MODELS[-1]
+    return (_api_base_for(CHEAP_MODEL), CHEAP_MODEL), (_api_base_for(STRONG_MODEL), STRONG_MODEL)
+
+
+def hedge_budget_available(model_name: str):
+    """True if a second request can go out now without waiting for a slot or budget."""
+    if CONCURRENCY_GATE.in_flight >= CONCURRENCY_GATE.max_concurrent:
+        return False
+    if _TOKEN_POOL is not None and len(_TOKEN_POOL) > 1:
+        return True
+    state = get_rate_limiter(model_name).get_state()
+    return state['wait_seconds'] <= 0 and state['minute_remaining'] >= 1
+
+
+def _call_with_breaker(api_base: str, model_name: str, call, is_failure=None):
+    """Run ``call()`` unless the circuit is open and feed the outcome to the breaker."""
+    breaker = get_circuit_breaker(api_base, model_name)
+    if not breaker.allow():
+        raise CircuitOpenError(
+            f"{model_name} vorübergehend deaktiviert (nächster Versuch in {breaker.retry_in():.0f}s)",
+            breaker.retry_in()
+        )
+    try:
+        result = call()
+    except (RateLimitError, BatchRejectedError):
+        breaker.release_probe()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    if is_failure(result) if is_failure is not None else result == PLACEHOLDER_RESULT:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return result
+
+
+VALID_LOCATIONS = ('FP1', 'FP2', 'FP3', 'Nische')
+
+
+# ---------------------------------------------------------------------------
+# Model cascade (cheap model first, escalate on a low-quality parse)
+# ---------------------------------------------------------------------------
+CHEAP_MODEL = os.environ.get("ANALYZER_CHEAP_MODEL", "gpt-4o-mini")
+STRONG_MODEL = os.environ.get("ANALYZER_STRONG_MODEL", "gpt-4o")
+
+# Policies: "cascade" = cheap model first, escalate when validation fails or a
+# Bartgeier needs an individual ID; "strong" = gpt-4o first (previous
+# behaviour); "cheap" = accept any parsed cheap answer, escalate only on errors.
+MODEL_POLICIES = ('cascade', 'strong', 'cheap')
+MODEL_STRATEGY = os.environ.get("ANALYZER_MODEL_STRATEGY", "cascade").strip().lower()
+
+# Per-station overrides, e.g. {"default": "cascade", "stations": {"Nische": "strong"}}
+MODEL_POLICY_PATH = LOG_DIR / "model_policy.json"
+
+_STATION_POLICIES = None
+_CASCADE_STATS = {'cheap_accepted': 0, 'escalated': 0, 'strong_direct': 0, 'reasons': {}}
+_CASCADE_LOCK = threading.Lock()
+
+
+def _load_station_policies():
+    """Read station policies from model_policy.json and ANALYZER_STATION_POLICY (once)."""
+    global _STATION_POLICIES
+    if _STATION_POLICIES is not None:
+        return _STATION_POLICIES
+    policies = {}
+    try:
+        if MODEL_POLICY_PATH.exists():
+            config = json.loads(MODEL_POLICY_PATH.read_text(encoding="utf-8"))
+            if config.get('default'):
+                policies[None] = str(config['default']).strip().lower()
+            for station, policy in (config.get('stations') or {}).items():
+                policies[_normalize_location(station)] = str(policy).strip().lower()
+    except Exception as exc:
+        _log_debug(f"Could not read {MODEL_POLICY_PATH}: {exc}")
+    # ANALYZER_STATION_POLICY="FP1=strong,Nische=cheap" wins over the file
+    for item in os.environ.get("ANALYZER_STATION_POLICY", "").split(','):
+        station, _, policy = item.partition('=')
+        if station.strip() and policy.strip():
+            policies[_normalize_location(station)] = policy.strip().lower()
+    _STATION_POLICIES = {
+        station: policy for station, policy in policies.items() if policy in MODEL_POLICIES
+    }
+    return _STATION_POLICIES
+
+
+def get_model_policy(station=None):
+    """Return the model policy for a station (or the default policy for None)."""
+    policies = _load_station_policies()
+    if station is not None and station in policies:
+        return policies[station]
+    default = policies.get(None, MODEL_STRATEGY)
+    return default if default in MODEL_POLICIES else 'cascade'
+
+
+def set_station_policy(station, policy):
+    """Override the model policy for one station at runtime (None = default)."""
+    policy = str(policy).strip().lower()
+    if policy not in MODEL_POLICIES:
+        raise ValueError(f"Unbekannte Modell-Strategie: {policy}")
+    policies = _load_station_policies()
+    policies[_normalize_location(station) if station is not None else None] = policy
+
+
+def get_cascade_stats():
+    """Counts of cheap answers accepted, escalations and escalation reasons."""
+    with _CASCADE_LOCK:
+        stats = dict(_CASCADE_STATS)
+        stats['reasons'] = dict(_CASCADE_STATS['reasons'])
+    return stats
+
+
+def _record_cascade(outcome, reasons=()):
+    with _CASCADE_LOCK:
+        _CASCADE_STATS[outcome] += 1
+        for reason in reasons:
+            _CASCADE_STATS['reasons'][reason] = _CASCADE_STATS['reasons'].get(reason, 0) + 1
+
+
+def _fold(text):
+    text = str(text or '').strip().lower()
+    for umlaut, plain in (('ä', 'a'), ('ö', 'o'), ('ü', 'u'), ('ß', 'ss')):
+        text = text.replace(umlaut, plain)
+    return text
+
+
+# Group names the prompt asks for instead of the listed species
+_SPECIES_GROUPS = {'Rabenvogel': ('Kolkrabe', 'Rabenkrähe')}
+
+
+def _species_stem(name):
+    """Folded first word without plural/inflection endings (Gämsen -> gam, Füchse -> fuch)."""
+    words = _fold(name).split()
+    return words[0].rstrip('ens') if words else ''
+
+
+def _species_known(animals, animal_species):
+    """True if every listed animal is one of the species (plurals/counts tolerated)."""
+    stems = {_species_stem(species) for species in animal_species}
+    for group, members in _SPECIES_GROUPS.items():
+        if any(_species_stem(member) in stems for member in members):
+            stems.add(_species_stem(group))
+    stems.discard('')
+    for entry in str(animals or '').split(','):
+        name = re.sub(r'\(.*?\)', '', entry)
+        name = _fold(re.sub(r'^\s*\d+\s*x?\s*', '', name))
+        if not name:
+            continue
+        if name.startswith('keine'):
+            continue
+        if _species_stem(name) not in stems:
+            return False
+    return True
+
+
+def validate_result(result, animal_species):
+    """Return the reasons a parsed result looks unreliable (empty list = valid)."""
+    animals, location, time_str, date_str = result
+    reasons = []
+    if not _species_known(animals, animal_species):
+        reasons.append('unknown_species')
+    if location not in VALID_LOCATIONS:
+        reasons.append('invalid_location')
+    try:
+        datetime.strptime(date_str, '%d.%m.%Y')
+        if not re.fullmatch(r'\d{2}\.\d{2}\.\d{4}', date_str):
+            raise ValueError(date_str)
+    except (TypeError, ValueError):
+        reasons.append('invalid_date')
+    try:
+        datetime.strptime(time_str, '%H:%M:%S')
+        if not re.fullmatch(r'\d{2}:\d{2}:\d{2}', time_str):
+            raise ValueError(time_str)
+    except (TypeError, ValueError):
+        reasons.append('invalid_time')
+    return reasons
+
+
+def needs_individual_id(animals):
+    """Bartgeier individuals (Luisa/Generl) are only trusted from the strong model."""
+    return 'bartgeier' in _fold(animals)
+
+
+def _escalation_reasons(result, animal_species):
+    """Validation reasons plus station policy / Bartgeier ID checks for a cheap answer."""
+    if result == PLACEHOLDER_RESULT:
+        return ['placeholder']
+    reasons = validate_result(result, animal_species)
+    policy = get_model_policy(result[1] if result[1] in VALID_LOCATIONS else None)
+    if policy == 'cheap':
+        return []
+    if policy == 'strong':
+        reasons.append('station_policy')
+    elif needs_individual_id(result[0]):
+        reasons.append('bartgeier_id')
+    return reasons
+
+
+def cascade_models():
+    """(cascade, [(api_base, model), ...]) for the default policy.
+
+    cascade is True when the cheap model answers first and the strong model
+    only gets escalations; with the "strong" policy the configured endpoints
+    are tried in order.
+    """
+    if get_model_policy() == 'strong':
+        return False, list(ENDPOINTS_AND_MODELS)
+    return True, [(_api_base_for(CHEAP_MODEL), CHEAP_MODEL), (_api_base_for(STRONG_MODEL), STRONG_MODEL)]
+
+
+def record_escalation(reasons, details):
+    """Count an escalation to the strong model and note its reasons in details."""
+    _record_cascade('escalated', reasons)
+    if details is not None:
+        details['escalation_reasons'] = list(reasons)
+
+
+def judge_cheap_answer(result, animal_species, details):
+    """Decide whether a cheap answer is final and count the outcome; returns the escalation reasons."""
+    reasons = _escalation_reasons(result, animal_species)
+    if reasons:
+        record_escalation(reasons, details)
+    else:
+        _record_cascade('cheap_accepted')
+        if details is not None:
+            details['escalation_reasons'] = []
+    return reasons
+
+
+def cheap_failure_reason(exc):
+    """Escalation reason for a cheap request that raised instead of answering."""
+    if isinstance(exc, RateLimitError):
+        return 'rate_limit'
+    if isinstance(exc, CircuitOpenError):
+        return 'circuit_open'
+    return 'error'
+
+
+def keep_cheap_answer(cheap_result, image_hash, animal_species, details, error):
+    """Return the unvalidated cheap answer after a failed escalation (not cached, so it is re-checked later)."""
+    _store_result(cheap_result, image_hash, _api_base_for(CHEAP_MODEL), CHEAP_MODEL, animal_species,
+                  details, persist=False)
+    if details is not None:
+        details['escalation_failed'] = str(error)
+    return cheap_result
+
+
+def _api_base_for(model_name: str):
+    for api_base, configured_model in ENDPOINTS_AND_MODELS:
+        if configured_model == model_name:
+            return api_base
+    return DEFAULT_API_BASE
+
+
+# ---------------------------------------------------------------------------
+# Image detail policy: low detail (one 512px view, flat token price) for the
+# animals/empty-frame question, high detail only where small details matter
+# ---------------------------------------------------------------------------
+IMAGE_DETAILS = ('auto', 'low', 'high')
+IMAGE_DETAIL = os.environ.get("ANALYZER_IMAGE_DETAIL", "auto").strip().lower()
+# Strong policy: stations where at least this share of frames shows a Bartgeier get high
+# detail right away, since a low-detail answer there would mostly be repeated at high detail
+DETAIL_BARTGEIER_RATE = _env_float("ANALYZER_DETAIL_BARTGEIER_RATE", 0.5)
+DETAIL_MIN_SIGHTINGS = 10
+LOW_DETAIL_TOKENS = 85  # Flat price of a low-detail image (also the base of a high-detail one)
+HIGH_DETAIL_TILE_TOKENS = 170
+_DETAIL_STATS = {'low': 0, 'high': 0, 'reruns': 0, 'est_tokens_saved': 0, 'reasons': {}}
+_STATION_SIGHTINGS = {}  # {station: [frames, frames with a Bartgeier]}
+_DETAIL_LOCK = threading.Lock()
+
+
+def set_image_detail(mode: str):
+    """Switch between the policy ("auto") and a fixed detail level."""
+    global IMAGE_DETAIL
+    if mode not in IMAGE_DETAILS:
+        raise ValueError(f"Unbekannte Bilddetailstufe: {mode}")
+    IMAGE_DETAIL = mode
+
+
+def estimate_image_tokens(size, detail: str):
+    """Image tokens for an upload of ``size`` (width, height) at the given detail.
+
+    High detail scales into 2048x2048, then the short side to 768 px and
+    bills 170 tokens per 512 px tile (gpt-4o-mini bills a fixed multiple,
+    so the low/high ratio is the same). Unknown sizes count as 4:3.
+    """
+    if detail == 'low':
+        return LOW_DETAIL_TOKENS
+    width, height = size or (1024, 768)
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return LOW_DETAIL_TOKENS + HIGH_DETAIL_TILE_TOKENS * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+def bartgeier_rate(station):
+    """Share of analyzed frames at a station that showed a Bartgeier (0 until enough frames)."""
+    with _DETAIL_LOCK:
+        frames, bartgeier = _STATION_SIGHTINGS.get(station, (0, 0))
+    return bartgeier / frames if frames >= DETAIL_MIN_SIGHTINGS else 0.0
+
+
+def choose_image_detail(model_name: str, details=None):
+    """Return (detail, reason) for the next request of an image.
+
+    High detail is only spent where low detail cannot do the job: reading
+    the footer (no confident local OCR) and identifying Bartgeier
+    individuals by their leg rings (a previous answer saw a Bartgeier).
+    """
+    if IMAGE_DETAIL != 'auto':
+        return IMAGE_DETAIL, 'config'
+    details = details if details is not None else {}
+    footer = details.get('ocr_footer')
+    if footer is None:
+        return 'high', 'footer'
+    if details.get('bartgeier_seen') or 'bartgeier_id' in (details.get('escalation_reasons') or ()):
+        return 'high', 'bartgeier_id'
+    if get_model_policy() == 'strong' and bartgeier_rate(footer['location']) >= DETAIL_BARTGEIER_RATE:
+        return 'high', 'bartgeier_likely'
+    return 'low', 'animals'
+
+
+def note_detail_result(model_name: str, detail: str, reason: str, result, details=None):
+    """Account a finished request: token estimate, station sightings, Bartgeier seen at low detail."""
+    size = ((details or {}).get('upload') or {}).get('upload_size')
+    saved = estimate_image_tokens(size, 'high') - LOW_DETAIL_TOKENS if detail == 'low' else 0
+    found_bartgeier = result != PLACEHOLDER_RESULT and needs_individual_id(result[0])
+    station = result[1] if result != PLACEHOLDER_RESULT and result[1] in VALID_LOCATIONS else None
+    with _DETAIL_LOCK:
+        _DETAIL_STATS[detail] = _DETAIL_STATS.get(detail, 0) + 1
+        _DETAIL_STATS['reasons'][reason] = _DETAIL_STATS['reasons'].get(reason, 0) + 1
+        _DETAIL_STATS['est_tokens_saved'] += saved
+        if station is not None:
+            sightings = _STATION_SIGHTINGS.setdefault(station, [0, 0])
+            sightings[0] += 1
+            sightings[1] += int(found_bartgeier)
+    if details is not None:
+        usage = details.get('usage') or {}
+        details['image_detail'] = detail
+        details.setdefault('image_details', []).append({
+            'model': model_name, 'detail': detail, 'reason': reason, 'est_tokens_saved': saved,
+            'prompt_tokens': usage.get('prompt_tokens'),
+        })
+        if detail == 'low' and found_bartgeier:
+            details['bartgeier_seen'] = True
+
+
+def needs_detail_rerun(result, details=None):
+    """True if a final answer from a low-detail request shows a Bartgeier that needs an individual ID."""
+    return (
+        IMAGE_DETAIL == 'auto' and details is not None and details.get('image_detail') == 'low'
+        and result != PLACEHOLDER_RESULT and needs_individual_id(result[0])
+    )
+
+
+def note_detail_rerun(details):
+    """The low-detail request was wasted: take back its saving and count its prompt tokens."""
+    last = (details.get('image_details') or [{}])[-1]
+    with _DETAIL_LOCK:
+        _DETAIL_STATS['reruns'] += 1
+        _DETAIL_STATS['est_tokens_saved'] -= last.get('est_tokens_saved', 0) + (last.get('prompt_tokens') or 0)
+    details['bartgeier_seen'] = True
+
+
+def get_detail_stats():
+    with _DETAIL_LOCK:
+        stats = dict(_DETAIL_STATS, reasons=dict(_DETAIL_STATS['reasons']))
+        stats['stations'] = {station: tuple(counts) for station, counts in _STATION_SIGHTINGS.items()}
+    return stats
+
+
+# Bump whenever the prompt text changes so cached answers are not reused
+PROMPT_VERSION = "2025.2"
+# "system" sends the static instructions as a system message ahead of the image, so the
+# provider can reuse a cached prompt prefix; "user" is the former single-message layout
+PROMPT_LAYOUTS = ('system', 'user')
+PROMPT_LAYOUT = os.environ.get("ANALYZER_PROMPT_LAYOUT", "system").strip().lower()
+# "compact" drops the long plumage description and keeps only the ring colours
+PROMPT_VARIANTS = ('full', 'compact')
+PROMPT_VARIANT = os.environ.get("ANALYZER_PROMPT_VARIANT", "full").strip().lower()
+
+# Ask for schema-validated JSON (response_format) and keep the text parser as fallback
+STRUCTURED_OUTPUT = os.environ.get("ANALYZER_STRUCTURED_OUTPUT", "1") != "0"
+_STRUCTURED_UNSUPPORTED = set()  # Models whose endpoint rejected response_format
+STREAMING = os.environ.get("ANALYZER_STREAMING", "1") != "0"
+_STREAMING_UNSUPPORTED = set()  # Models whose endpoint rejected stream=True
+STREAM_OPTIONS = {'stream': True, 'stream_options': {'include_usage': True}}
+_PARSER_STATS = {'structured': 0, 'fallback': 0}
+_PARSER_LOCK = threading.Lock()
+
+
+def prompt_version(variant=None):
+    """Prompt version used in cache keys and the journal; each variant caches separately."""
+    variant = variant or PROMPT_VARIANT
+    version = PROMPT_VERSION if variant == 'full' else f"{PROMPT_VERSION}-{variant}"
+    # Answers from a forced low-detail run must not stand in for the normal ones
+    return f"{version}-low" if IMAGE_DETAIL == 'low' else version
+
+
+def set_prompt_options(variant=None, layout=None):
+    """Switch prompt variant and/or message layout (e.g. for the prompt benchmark)."""
+    global PROMPT_VARIANT, PROMPT_LAYOUT
+    if variant is not None:
+        if variant not in PROMPT_VARIANTS:
+            raise ValueError(f"Unbekannte Prompt-Variante: {variant}")
+        PROMPT_VARIANT = variant
+    if layout is not None:
+        if layout not in PROMPT_LAYOUTS:
+            raise ValueError(f"Unbekanntes Prompt-Layout: {layout}")
+        PROMPT_LAYOUT = layout
+
+
+def get_cache_stats():
+    """Hit/miss statistics of the on-disk analysis cache (None if disabled)."""
+    cache = gm_cache.get_analysis_cache()
+    return cache.get_stats() if cache is not None else None
+
+
+def _lookup_cached_result(image_path: str, image_hash: str, animal_species: list, details=None):
+    """Return a cached result for any configured model, or None."""
+    # Answers are keyed by content, so renamed/reordered images never hit the network twice
+    cache = gm_cache.get_analysis_cache()
+    if cache is None or gm_journal.is_replay():
+        # Replays go through the current parser instead of stored results
+        return None
+    keys = {
+        gm_cache.make_cache_key(image_hash, model_name, prompt_version(), animal_species): (api_base, model_name)
+        for api_base, model_name in ENDPOINTS_AND_MODELS
+    }
+    hit_key, entry = cache.get_any(list(keys))
+    if entry is None:
+        return None
+    api_base, model_name = keys[hit_key]
+    _log_debug(f"Cache hit for {Path(image_path).name} ({model_name}, sha256={image_hash[:12]})")
+    if details is not None:
+        details['cached'] = True
+        details['model'] = model_name
+        details['api_base'] = api_base
+    return tuple(entry['result'])
+
+
+def _store_result(result, image_hash: str, api_base: str, model_name: str, animal_species: list, details=None,
+                  persist=True):
+    """Record a successful model answer in details and the on-disk cache."""
+    if details is not None:
+        details['cached'] = False
+        details['model'] = model_name
+        details['api_base'] = api_base
+    cache = gm_cache.get_analysis_cache()
+    if cache is not None and persist and not gm_journal.is_replay():
+        cache.put(
+            gm_cache.make_cache_key(image_hash, model_name, prompt_version(), animal_species),
+            result,
+            image_hash=image_hash,
+            model=model_name,
+            prompt_version=prompt_version(),
+        )
 
 
-def analyze_with_github_models(image_path: str, token: str, animal_species: list):
+def analyze_with_github_models(image_path: str, token: str, animal_species: list, details=None, on_fields=None):
     """Attempt analysis with several endpoints/models and return parsed tuple.
 
+    If ``details`` is a dict it is filled with per-request information
+    (model used, upload statistics, escalation reasons, ...).
+
+    ``on_fields`` (called from the worker thread) receives partial results
+    such as {'location': 'FP1'} as soon as a field is known: confident footer
+    OCR right away, the rest while the answer streams in.
+
+    Unless the model policy is "strong", the cheap model answers first and
+    the image is escalated to the strong model only when the answer fails
+    validate_result() or a Bartgeier needs an individual ID.
+
     Returns: (animals, location, time_str, date_str)
     """
-    # Only use models.inference.ai.azure.com - api.github.com/models returns 404
-    endpoints_and_models = [
-        ("https://models.inference.ai.azure.com", "gpt-4o"),
-        ("https://models.inference.ai.azure.com", "gpt-4o-mini"),
-    ]
+    prepared = claim_prepared(image_path)
+    if prepared is not None:
+        # Hashed, OCR'd and encoded by the preparation stage; the file is only read again if needed
+        image_data = None
+        image_hash = prepared.image_hash
+    else:
+        with open(image_path, "rb") as image_file:
+            image_data = image_file.read()
+        image_hash = gm_cache.hash_image_bytes(image_data)
+    if details is not None:
+        details['image_hash'] = image_hash
+
+    cached = _lookup_cached_result(image_path, image_hash, animal_species, details)
+    if cached is not None:
+        return cached
+
+    if details is None:
+        details = {}
+    if prepared is not None:
+        _apply_footer(image_path, prepared.footer, details)
+    else:
+        _read_footer(image_path, image_data, details)
+    deliver_footer_fields(details, on_fields)
+
+    cascade, endpoints_and_models = cascade_models()
+    if not cascade:
+        _record_cascade('strong_direct')
+        return _analyze_in_order(image_path, token, animal_species, details, image_data, image_hash,
+                                 endpoints_and_models, on_fields=on_fields, prepared=prepared)
 
+    # Cascade: cheap model first, the strong model only when its answer is not good enough
     errors = []
+    rate_limits = []
+    cheap_base = endpoints_and_models[0][0]
+    try:
+        result = _call_with_breaker(cheap_base, CHEAP_MODEL, lambda: _try_api_call(
+            image_path, token, cheap_base, CHEAP_MODEL, animal_species,
+            details=details, image_data=image_data, on_fields=on_fields, prepared=prepared
+        ))
+    except Exception as exc:
+        if isinstance(exc, RateLimitError):
+            rate_limits.append(exc)
+        errors.append(f"{CHEAP_MODEL}@{cheap_base}: {exc}")
+        record_escalation([cheap_failure_reason(exc)], details)
+        return _escalate(image_path, token, animal_species, details, image_data, image_hash,
+                         errors=errors, rate_limits=rate_limits, on_fields=on_fields, prepared=prepared)
+
+    if not judge_cheap_answer(result, animal_species, details):
+        _store_result(result, image_hash, cheap_base, CHEAP_MODEL, animal_species, details)
+        return result
+    return _escalate(image_path, token, animal_species, details, image_data, image_hash,
+                     cheap_result=result, on_fields=on_fields, prepared=prepared)
+
+
+def _read_footer(image_path, image_data, details):
+    """Run the local footer OCR; a confident read is stored as details['ocr_footer']."""
+    try:
+        import github_models_ocr as gm_ocr
+    except Exception as exc:
+        _log_debug(f"Footer OCR unavailable: {exc}")
+        return None
+    try:
+        footer = gm_ocr.extract_footer(image_data)
+    except Exception as exc:
+        _log_debug(f"Footer OCR failed for {Path(image_path).name}: {exc}")
+        return None
+    return _apply_footer(image_path, footer, details)
+
+
+def _apply_footer(image_path, footer, details):
+    if footer is None:
+        return None
+    _log_debug(
+        f"Footer OCR for {Path(image_path).name}: {footer['location']} {footer['date']} {footer['time']} "
+        f"(conf={footer['confidence']:.0f}, confident={footer['confident']})"
+    )
+    if footer['confident']:
+        details['ocr_footer'] = {key: footer[key] for key in ('location', 'time', 'date', 'confidence')}
+    return footer
+
+
+def deliver_footer_fields(details, on_fields):
+    """Hand a confident footer OCR read to ``on_fields`` before any request goes out."""
+    footer = details.get('ocr_footer') if details is not None else None
+    if footer is None or on_fields is None:
+        return
+    try:
+        on_fields({key: footer[key] for key in ('location', 'time', 'date') if footer[key]})
+    except Exception as exc:
+        _log_debug(f"Delivering footer fields failed: {exc}")
+
+
+def _analyze_in_order(image_path, token, animal_species, details, image_data, image_hash, endpoints_and_models,
+                      errors=None, rate_limits=None, on_fields=None, prepared=None):
+    """Try each (api_base, model) in turn and return the first non-placeholder answer."""
+    errors = errors if errors is not None else []
+    rate_limits = rate_limits if rate_limits is not None else []
 
     for api_base, model_name in endpoints_and_models:
         try:
-            result = _try_api_call(image_path, token, api_base, model_name, animal_species)
-            if result != ("Error in analysis", "", "", ""):
+            result = _call_with_breaker(api_base, model_name, lambda: _try_api_call(
+                image_path, token, api_base, model_name, animal_species,
+                details=details, image_data=image_data, on_fields=on_fields, prepared=prepared
+            ))
+            if needs_detail_rerun(result, details):
+                result = _rerun_high_detail(image_path, token, api_base, model_name, animal_species, details,
+                                            image_data, prepared, result)
+            if result != PLACEHOLDER_RESULT:
+                _store_result(result, image_hash, api_base, model_name, animal_species, details)
                 return result
             errors.append(f"{model_name}@{api_base}: placeholder response")
+        except RateLimitError as exc:
+            rate_limits.append(exc)
+            errors.append(f"{model_name}@{api_base}: {exc}")
         except Exception as exc:
             errors.append(f"{model_name}@{api_base}: {exc}")
 
-    error_summary = "; ".join(errors) if errors else "Unbekannter Fehler"
-    _log_debug(f"All API attempts failed -> {error_summary}")
-    raise RuntimeError(f"Alle API-Aufrufe fehlgeschlagen: {error_summary}")
+    _raise_all_failed(errors, rate_limits)
+
 
+def _rerun_high_detail(image_path, token, api_base, model_name, animal_species, details, image_data, prepared,
+                       low_result):
+    """Repeat a low-detail answer showing a Bartgeier at high detail; keep the low answer if that fails."""
+    _log_debug(f"Bartgeier in low-detail answer for {Path(image_path).name} - repeating at high detail")
+    note_detail_rerun(details)
+    try:
+        return _call_with_breaker(api_base, model_name, lambda: _try_api_call(
+            image_path, token, api_base, model_name, animal_species,
+            details=details, image_data=image_data, prepared=prepared
+        ))
+    except Exception as exc:
+        _log_debug(f"High-detail re-run failed for {Path(image_path).name}: {exc}")
+        return low_result
 
-def _try_api_call(image_path: str, token: str, api_base: str, model_name: str, animal_species: list):
-    """Make a single API request and parse the response."""
-    with open(image_path, "rb") as image_file:
-        image_data = image_file.read()
-        base64_image = base64.b64encode(image_data).decode('utf-8')
 
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
+def _escalate(image_path, token, animal_species, details, image_data, image_hash,
+              cheap_result=None, errors=None, rate_limits=None, on_fields=None, prepared=None):
+    """Re-run an image on the strong model; fall back to the cheap answer if that fails.
+
+    The escalation is already counted (judge_cheap_answer / record_escalation).
+    """
+    _log_debug(
+        f"Escalating {Path(image_path).name} to {STRONG_MODEL}: {', '.join(details.get('escalation_reasons') or [])}"
+    )
+    try:
+        return _analyze_in_order(image_path, token, animal_species, details, image_data, image_hash,
+                                 [(_api_base_for(STRONG_MODEL), STRONG_MODEL)], errors=errors,
+                                 rate_limits=rate_limits, on_fields=on_fields, prepared=prepared)
+    except Exception as exc:
+        if cheap_result is None or cheap_result == PLACEHOLDER_RESULT:
+            raise
+        # Better an unvalidated cheap answer than none
+        _log_debug(f"Escalation failed for {Path(image_path).name} ({exc}) - keeping {CHEAP_MODEL} answer")
+        return keep_cheap_answer(cheap_result, image_hash, animal_species, details, exc)
+
+
+def claim_prepared(image_path):
+    """PreparedImage from the preparation stage, or None (stage unused or replaying)."""
+    if gm_journal.is_replay():
+        return None
+    try:
+        import github_models_prepare as gm_prepare
+    except Exception:
+        return None
+    return gm_prepare.claim(image_path)
+
+
+def _raise_all_failed(errors, rate_limits):
+    """Raise the combined error; a RateLimitError if every model was rate limited."""
+    error_summary = "; ".join(errors) if errors else "Unbekannter Fehler"
+    _log_debug(f"All API attempts failed -> {error_summary}")
+    if rate_limits and len(rate_limits) == len(errors):
+        soonest = min(rate_limits, key=lambda exc: exc.wait_seconds)
+        raise RateLimitError(
+            f"Alle API-Aufrufe fehlgeschlagen: {error_summary}", soonest.wait_seconds, soonest.limit_type
+        )
+    raise RuntimeError(f"Alle API-Aufrufe fehlgeschlagen: {error_summary}")
 
-    prompt = f"""Analysiere dieses Kamerafallen-Bild und gib die folgenden Informationen:
 
-    1. TIERE: Identifiziere alle sichtbaren Tiere im Bild. Wähle nur aus dieser Liste: {', '.join(animal_species)}
+def _animal_instructions(animal_species: list):
+    return f"""1. TIERE: Identifiziere alle sichtbaren Tiere im Bild. Wähle nur aus dieser Liste: {', '.join(animal_species)}
     - Für Bartgeier: Wenn möglich, identifiziere die Individuen basierend auf diesen Merkmalen:
       - Luisa: Hellere braune Federn mit mehr weißen Flecken, dunklerer Kopf, gelber Ring am rechten Bein, grüner Ring am linken Bein, gebleichte Federn am linken Flügel (nur sichtbar bei geöffnetem Flügel) und am Schwanz (sichtbar beim Sitzen).
       - Generl: Dunkelbraune Federn mit weniger Flecken, gebleichte Federn am linken Flügel (sichtbar beim Sitzen) und an den rechten Fingern (nur bei geöffnetem Flügel). Schwarzer Ring am linken Bein, roter Ring am rechten Bein.
       - Wenn das Individuum identifiziert werden kann, füge es in Klammern hinzu, z.B., "Bartgeier (Luisa)". Wenn unsicher, sage nur "Bartgeier (unbestimmt)".
     - Für alle anderen Tiere: inklusive die Anzahl (z.B., "2 Rabenvögel", "1 Fuchs", "3 Gämsen")
     - Wenn Kolkrabe oder Rabenkrähe erkannt wird: Gib "Rabenvogel/Rabenvögel" aus.
-    - Wenn keine Tiere sichtbar sind, sage "Keine erkannt"
+    - Wenn keine Tiere sichtbar sind, sage "Keine erkannt\""""
+
+
+def _compact_prompt(animal_species: list, animals_only: bool = False, structured: bool = False, batch: bool = False):
+    """Short prompt: species list, Bartgeier ring colours and the answer format only."""
+    intro = "Kamerafallen-Bilder, jeweils angekündigt mit \"BILD n:\"." if batch else "Kamerafallen-Bild."
+    animals = (
+        f"Tiere nur aus: {', '.join(animal_species)}. "
+        "Bartgeier-Individuen an den Beinringen: Luisa gelb rechts/grün links, Generl rot rechts/schwarz links"
+    )
+    if structured:
+        metadata = "" if animals_only else (
+            " Fußzeile (ohne \"NLP\"): location FP1/FP2/FP3/Nische/Unbekannt, date YYYY-MM-DD, time HH:MM:SS."
+        )
+        answer = " Nur JSON gemäß Schema, je Bild ein Eintrag in images." if batch else " Nur JSON gemäß Schema."
+        return (f"{intro} {animals}; individual sonst \"unbestimmt\", bei anderen Arten \"\". "
+                f"Keine Tiere: leere Liste.{metadata}{answer}")
+    answer = "TIERE: [Tier mit Anzahl oder \"Keine erkannt\"]"
+    metadata = ""
+    if not animals_only:
+        metadata = " Fußzeile (ohne \"NLP\"): Standort FP1/FP2/FP3/Nische, Uhrzeit HH:MM:SS, Datum DD.MM.YYYY."
+        answer += "\nSTANDORT: [FP1/FP2/FP3/Nische]\nUHRZEIT: [HH:MM:SS]\nDATUM: [DD.MM.YYYY]"
+    answer = f"Antworte je Bild genau so:\nBILD [n]:\n{answer}" if batch else f"Antworte genau so:\n{answer}"
+    return (f"{intro} {animals}, z.B. \"Bartgeier (Luisa)\", sonst \"Bartgeier (unbestimmt)\". "
+            f"Andere Tiere mit Anzahl (z.B. \"2 Gämsen\"), Kolkrabe/Rabenkrähe als \"Rabenvogel/Rabenvögel\"."
+            f"{metadata}\n{answer}")
+
+
+def _prompt_instructions(animal_species: list, animals_only: bool = False, structured: bool = False):
+    """Numbered instruction sections of the full prompt, without intro and answer format."""
+    if structured:
+        metadata = "" if animals_only else """
+
+    2. METADATEN: Lies den Text am unteren Rand des Bildes (ignoriere jegliches "NLP"-Präfix):
+    - location: FP1, FP2, FP3 oder Nische ("Unbekannt" wenn nicht lesbar)
+    - date: Datum im Format YYYY-MM-DD
+    - time: Uhrzeit im Format HH:MM:SS (mit Sekunden)"""
+        return f"""1. animals: Liste aller sichtbaren Tiere, je Art ein Eintrag mit species (nur aus dieser Liste: {', '.join(animal_species)}), count und individual.
+    - individual nur für Bartgeier: "Luisa", "Generl" oder "unbestimmt"; sonst "".
+      - Luisa: Hellere braune Federn mit mehr weißen Flecken, dunklerer Kopf, gelber Ring am rechten Bein, grüner Ring am linken Bein, gebleichte Federn am linken Flügel (nur sichtbar bei geöffnetem Flügel) und am Schwanz (sichtbar beim Sitzen).
+      - Generl: Dunkelbraune Federn mit weniger Flecken, gebleichte Federn am linken Flügel (sichtbar beim Sitzen) und an den rechten Fingern (nur bei geöffnetem Flügel). Schwarzer Ring am linken Bein, roter Ring am rechten Bein.
+    - Wenn keine Tiere sichtbar sind, gib eine leere Liste zurück.{metadata}"""
+    if animals_only:
+        return _animal_instructions(animal_species)
+    return f"""{_animal_instructions(animal_species)}
 
     2. METADATEN: Lies den Text am unteren Rand des Bildes und extrahiere:
     - Standort: Suche nach FP1, FP2, FP3 oder Nische (ignoriere jegliches "NLP"-Präfix)
     - Uhrzeit: Extrahiere die Uhrzeit im HH:MM:SS-Format (mit Sekunden)
-    - Datum: Extrahiere das Datum im DD.MM.YYYY-Format (deutsches Format mit Punkten)
+    - Datum: Extrahiere das Datum im DD.MM.YYYY-Format (deutsches Format mit Punkten)"""
 
-    Bitte formatiere deine Antwort genau wie folgt:
-    TIERE: [Tiername mit Anzahl oder "Keine erkannt"]
+
+def _answer_lines(animals_only: bool = False):
+    lines = 'TIERE: [Tiername mit Anzahl oder "Keine erkannt"]'
+    if not animals_only:
+        lines += """
     STANDORT: [FP1/FP2/FP3/Nische]
     UHRZEIT: [Uhrzeit in HH:MM:SS]
     DATUM: [Datum in DD.MM.YYYY]"""
+    return lines
+
+
+def build_prompt(animal_species: list, animals_only: bool = False, structured: bool = False, variant=None):
+    """Return the analysis prompt for the given species list.
+
+    With ``animals_only`` the footer metadata is not requested (it was read
+    locally by OCR). With ``structured`` the answer format is the JSON schema
+    from build_response_format() instead of TIERE/STANDORT/... lines.
+    ``variant`` defaults to PROMPT_VARIANT ("full" or "compact").
+    """
+    if (variant or PROMPT_VARIANT) == 'compact':
+        return _compact_prompt(animal_species, animals_only, structured)
+    instructions = _prompt_instructions(animal_species, animals_only, structured)
+    if structured:
+        return f"""Analysiere dieses Kamerafallen-Bild.
+
+    {instructions}
+
+    Antworte ausschließlich mit JSON gemäß dem vorgegebenen Schema."""
+    return f"""Analysiere dieses Kamerafallen-Bild und gib die folgenden Informationen:
+
+    {instructions}
+
+    Bitte formatiere deine Antwort genau wie folgt:
+    {_answer_lines(animals_only)}"""
+
+
+def _response_properties(animal_species: list, animals_only: bool = False):
+    properties = {
+        'animals': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'species': {'type': 'string', 'enum': list(animal_species)},
+                    'count': {'type': 'integer'},
+                    'individual': {'type': 'string', 'enum': ['', 'Luisa', 'Generl', 'unbestimmt']},
+                },
+                'required': ['species', 'count', 'individual'],
+                'additionalProperties': False,
+            },
+        },
+    }
+    if not animals_only:
+        properties['location'] = {'type': 'string', 'enum': list(VALID_LOCATIONS) + ['Unbekannt']}
+        properties['date'] = {'type': 'string', 'description': 'YYYY-MM-DD'}
+        properties['time'] = {'type': 'string', 'description': 'HH:MM:SS'}
+    return properties
+
+
+def build_response_format(animal_species: list, animals_only: bool = False, batch: bool = False):
+    """Strict JSON schema for the chat completion ``response_format``.
+
+    With ``batch`` the answer is {"images": [{"image": n, ...}, ...]}, one
+    entry per "BILD n:" of a multi-image request.
+    """
+    properties = _response_properties(animal_species, animals_only)
+    if batch:
+        item = {'image': {'type': 'integer'}}
+        item.update(properties)
+        properties = {
+            'images': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': item,
+                    'required': list(item),
+                    'additionalProperties': False,
+                },
+            },
+        }
+    return {
+        'type': 'json_schema',
+        'json_schema': {
+            'name': 'kamerafallen_analyse_batch' if batch else 'kamerafallen_analyse',
+            'strict': True,
+            'schema': {
+                'type': 'object',
+                'properties': properties,
+                'required': list(properties),
+                'additionalProperties': False,
+            },
+        },
+    }
+
+
+def structured_output_enabled(model_name: str):
+    return STRUCTURED_OUTPUT and model_name not in _STRUCTURED_UNSUPPORTED
+
+
+def disable_structured_output(model_name: str, reason=""):
+    """Remember that an endpoint rejected response_format; later requests use the text prompt."""
+    _STRUCTURED_UNSUPPORTED.add(model_name)
+    _log_debug(f"Structured output disabled for {model_name}: {reason}")
+
+
+def rejected_option(status_code, body, structured=False, stream=False):
+    """Name the request option a 400 answer rejects ('stream' or 'response_format'), or None.
+
+    Only an error that names the option switches it off for the model; a
+    content filter hit, a broken image or a context overflow is a failure of
+    this one request.
+    """
+    if status_code != 400:
+        return None
+    text = str(body or '').lower()
+    if stream and re.search(r'\bstream(_options)?\b', text):
+        return 'stream'
+    if structured and ('response_format' in text or 'json_schema' in text):
+        return 'response_format'
+    return None
+
+
+def streaming_enabled(model_name: str):
+    return STREAMING and model_name not in _STREAMING_UNSUPPORTED
+
+
+def disable_streaming(model_name: str, reason=""):
+    if model_name not in _STREAMING_UNSUPPORTED:
+        _STREAMING_UNSUPPORTED.add(model_name)
+        _log_debug(f"Streaming disabled for {model_name}: {reason[:200]}")
+
+
+def get_parser_stats():
+    """How often structured answers parsed directly vs. needed the text parser."""
+    with _PARSER_LOCK:
+        stats = dict(_PARSER_STATS)
+    total = stats['structured'] + stats['fallback']
+    stats['fallback_rate'] = stats['fallback'] / total if total else 0.0
+    return stats
+
+
+def build_request(image_data: bytes, token: str, model_name: str, animal_species: list, details=None,
+                  animals_only: bool = False, structured: bool = False, detail=None):
+    """Prepare headers and chat payload for one image/model combination."""
+    upload_data, upload_stats = _encode_image_for_upload(image_data, get_upload_profile(model_name))
+    _record_upload_stats(model_name, upload_stats, details)
+    base64_image = base64.b64encode(upload_data).decode('utf-8')
+
+    headers = {"Authorization": f"Bearer {token}"}
+    payload = _chat_payload(model_name, animal_species, base64_image, animals_only, structured, detail)
+    return headers, payload
+
+
+def _chat_messages(prompt, image_parts, layout=None):
+    """Messages for a prompt and the image content parts in the configured layout."""
+    if (layout or PROMPT_LAYOUT) == 'system':
+        # Static instructions first and identical for every image -> cacheable prefix
+        return [{"role": "system", "content": prompt}, {"role": "user", "content": image_parts}]
+    return [{"role": "user", "content": [{"type": "text", "text": prompt}] + image_parts}]
+
+
+def _chat_payload(model_name, animal_species, base64_image, animals_only=False, structured=False, detail=None):
+    prompt = build_prompt(animal_species, animals_only=animals_only, structured=structured)
+    image_url = {"url": f"data:image/jpeg;base64,{base64_image}"}
+    if detail:
+        image_url["detail"] = detail
+    image_parts = [{"type": "image_url", "image_url": image_url}]
 
     # Payload for GPT-4o models
     payload = {
         "model": model_name,
-        "messages": [{"role": "user", "content": [{"type": "text", "text": prompt}, {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}]}],
+        "messages": _chat_messages(prompt, image_parts),
         "max_tokens": 500,
         "temperature": 0.1
     }
+    if structured:
+        payload["response_format"] = build_response_format(animal_species, animals_only=animals_only)
+    return payload
+
+
+_IMAGE_PLACEHOLDER = "@@IMAGE_BASE64@@"
+_BODY_TEMPLATES = {}  # {(model, species, flags..., detail, variant, layout): (prefix bytes, suffix bytes)}
+_BODY_TEMPLATES_LOCK = threading.Lock()
+
+
+def _body_template(model_name, animal_species, animals_only, structured, stream, detail=None):
+    key = (model_name, tuple(animal_species), animals_only, structured, stream, detail, PROMPT_VARIANT,
+           PROMPT_LAYOUT)
+    with _BODY_TEMPLATES_LOCK:
+        template = _BODY_TEMPLATES.get(key)
+        if template is None:
+            payload = _chat_payload(model_name, animal_species, _IMAGE_PLACEHOLDER, animals_only, structured,
+                                    detail)
+            if stream:
+                payload.update(STREAM_OPTIONS)
+            prefix, suffix = json.dumps(payload).encode("utf-8").split(_IMAGE_PLACEHOLDER.encode("ascii"))
+            template = _BODY_TEMPLATES[key] = (prefix, suffix)
+        return template
+
+
+def build_request_body(prepared, token: str, model_name: str, animal_species: list, details=None,
+                       animals_only: bool = False, structured: bool = False, stream: bool = False, detail=None):
+    """Headers and ready-to-send JSON body bytes from a prepared image (github_models_prepare).
+
+    The serialised request around the image is cached per prompt variant, so
+    the base64 bytes from the worker process are spliced in without building
+    or serialising a dict. Returns None if the image was prepared for a
+    different upload profile.
+    """
+    upload = prepared.uploads.get(model_name)
+    if upload is None:
+        return None
+    base64_image, upload_stats = upload
+    _record_upload_stats(model_name, dict(upload_stats), details)
+    prefix, suffix = _body_template(model_name, animal_species, animals_only, structured, stream, detail)
+    return {"Authorization": f"Bearer {token}"}, prefix + base64_image + suffix
+
+
+def parse_completion(result: dict, api_base: str, model_name: str, raw_body: str = "", structured: bool = False):
+    """Extract the message text from a chat completion and parse it into fields.
+
+    Structured (JSON schema) answers are read in one pass; anything else goes
+    through parse_analysis_response. For structured requests the fallback
+    is counted in get_parser_stats().
+    """
+    try:
+        analysis_text = result['choices'][0]['message']['content']
+    except (TypeError, KeyError, IndexError) as exc:
+        _log_debug(
+            f"Failed to parse API response from {model_name}@{api_base}: {exc} | body={raw_body[:500]}"
+        )
+        raise RuntimeError(f"Ungültige Antwort vom Modell {model_name}@{api_base}") from exc
+
+    _log_debug(f"Raw analysis response from {model_name}@{api_base} ->\n{analysis_text}")
+    if structured or str(analysis_text or '').lstrip().startswith('{'):
+        try:
+            parsed = parse_structured_response(analysis_text)
+        except ValueError as exc:
+            _log_debug(f"Structured parse failed for {model_name}@{api_base}: {exc} - using text parser")
+        else:
+            if structured:
+                _count_parse('structured')
+            return parsed
+    if structured:
+        _count_parse('fallback')
+    return parse_analysis_response(analysis_text)
+
+
+def _count_parse(kind):
+    with _PARSER_LOCK:
+        _PARSER_STATS[kind] += 1
+
+
+def parse_structured_response(analysis_text: str):
+    """Convert a schema-conforming JSON answer into (animals, location, time, date).
+
+    Raises ValueError if the text is not JSON of the expected shape.
+    """
+    return _structured_fields(json.loads(analysis_text))  # json.JSONDecodeError is a ValueError
+
+
+def _structured_fields(payload):
+    if not isinstance(payload, dict) or not isinstance(payload.get('animals'), list):
+        raise ValueError("missing animals list")
+
+    animals_value = _format_structured_animals(payload['animals'])
+    location_value = _normalize_location(payload.get('location', ''))
+    time_value = _normalize_time(payload.get('time', ''))
+    date_value = _normalize_date(payload.get('date', ''))
+    return animals_value, location_value, time_value, date_value
+
+
+def _format_structured_animals(animals):
+    """Render the schema's animals list in the wording of the text prompt."""
+    parts = []
+    for animal in animals:
+        if not isinstance(animal, dict) or not animal.get('species'):
+            raise ValueError(f"invalid animal entry: {animal!r}")
+        species = str(animal['species']).strip()
+        try:
+            count = max(1, int(animal.get('count') or 1))
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid count: {animal.get('count')!r}")
+        individual = str(animal.get('individual') or '').strip()
+        if species == 'Bartgeier':
+            label = f"Bartgeier ({individual or 'unbestimmt'})"
+            parts.append(label if count == 1 else f"{count} {label}")
+        elif species in ('Kolkrabe', 'Rabenkrähe'):
+            # Same grouping as the text prompt asks for
+            parts.append("1 Rabenvogel" if count == 1 else f"{count} Rabenvögel")
+        else:
+            parts.append(f"{count} {species}")
+    return ', '.join(parts) if parts else 'Keine erkannt'
+
+
+# ---------------------------------------------------------------------------
+# Streamed completions
+# ---------------------------------------------------------------------------
+_STREAM_KEYS = {
+    'tiere': 'animals', 'animals': 'animals', 'standort': 'location', 'location': 'location',
+    'uhrzeit': 'time', 'time': 'time', 'datum': 'date', 'date': 'date',
+}
+_STREAM_KEY_RE = re.compile(
+    r'^[\s•\-*\d.]*\**\s*(tiere|animals|standort|location|uhrzeit|time|datum|date)\**\s*[:\-\u2013\u2014]',
+    re.IGNORECASE
+)
+_STREAM_JSON_FIELD_RE = re.compile(r'"(location|time|date)"\s*:\s*"((?:[^"\\]|\\.)*)"')
+_STREAM_JSON_ANIMALS_RE = re.compile(r'"animals"\s*:\s*(\[.*?\])', re.DOTALL)
+
+
+class StreamingFieldParser:
+    """Parse an answer while it streams in and report each field once it is complete.
+
+    In the text format a field is complete when its line has ended; the
+    animals may continue over several lines, so they count as complete when
+    the next field starts. Structured (JSON) answers report a field once its
+    string (or the animals array) is closed.
+    """
+
+    def __init__(self, on_fields, structured=False):
+        self.on_fields = on_fields
+        self.structured = structured
+        self.text = ""
+        self.delivered = set()
+
+    def feed(self, delta):
+        self.text += delta
+        if self.structured or self.text.lstrip().startswith('{'):
+            fields = self._json_fields()
+        elif '\n' in delta:
+            fields = self._text_fields()
+        else:
+            return
+        fields = {key: value for key, value in fields.items() if key not in self.delivered and value}
+        if not fields:
+            return
+        self.delivered.update(fields)
+        try:
+            self.on_fields(fields)
+        except Exception as exc:
+            _log_debug(f"Delivering streamed fields failed: {exc}")
+
+    def _text_fields(self):
+        finished = self.text[:self.text.rfind('\n')]
+        started = []
+        for line in finished.splitlines():
+            match = _STREAM_KEY_RE.match(line.strip())
+            if match:
+                started.append(_STREAM_KEYS[match.group(1).lower()])
+        complete = {
+            key for position, key in enumerate(started)
+            if key != 'animals' or any(later != 'animals' for later in started[position + 1:])
+        }
+        if not complete:
+            return {}
+        parsed = dict(zip(('animals', 'location', 'time', 'date'), _parse_from_lines(finished)))
+        return {key: parsed[key] for key in complete}
+
+    def _json_fields(self):
+        fields = {}
+        for key, raw in _STREAM_JSON_FIELD_RE.findall(self.text):
+            try:
+                value = json.loads(f'"{raw}"')
+            except ValueError:
+                continue
+            normalize = {'location': _normalize_location, 'time': _normalize_time, 'date': _normalize_date}[key]
+            fields[key] = normalize(value)
+        match = _STREAM_JSON_ANIMALS_RE.search(self.text)
+        if match:
+            try:
+                fields['animals'] = _format_structured_animals(json.loads(match.group(1)))
+            except ValueError:
+                pass
+        return fields
+
+
+class ChatStream:
+    """Assemble a streamed (server-sent events) chat completion.
+
+    feed_line() takes the raw event lines; result() returns the same dict
+    shape as a non-streamed completion so the usual parsers apply.
+    """
+
+    def __init__(self, on_fields=None, structured=False):
+        self.parser = StreamingFieldParser(on_fields, structured) if on_fields is not None else None
+        self.pieces = []
+        self.usage = None
+        self.model = None
+        self.finish_reason = None
+
+    def feed_line(self, line):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        line = line.strip()
+        if not line.startswith('data:'):
+            return
+        data = line[5:].strip()
+        if not data or data == '[DONE]':
+            return
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            _log_debug(f"Unreadable stream event: {data[:200]}")
+            return
+        if chunk.get('error'):
+            raise RuntimeError(f"Fehler im Antwortstrom: {chunk['error']}")
+        self.model = chunk.get('model') or self.model
+        if chunk.get('usage'):
+            self.usage = chunk['usage']
+        for choice in chunk.get('choices') or []:
+            self.finish_reason = choice.get('finish_reason') or self.finish_reason
+            delta = (choice.get('delta') or {}).get('content')
+            if delta:
+                self.pieces.append(delta)
+                if self.parser is not None:
+                    self.parser.feed(delta)
+
+    @property
+    def content(self):
+        return "".join(self.pieces)
+
+    def result(self):
+        return {
+            'model': self.model,
+            'choices': [{
+                'index': 0,
+                'finish_reason': self.finish_reason,
+                'message': {'role': 'assistant', 'content': self.content},
+            }],
+            'usage': self.usage,
+        }
+
+
+def _try_api_call(image_path: str, token: str, api_base: str, model_name: str, animal_species: list,
+                  details=None, image_data=None, on_fields=None, prepared=None, retried=False):
+    """Make a single API request and parse the response (streamed if ``on_fields`` is given).
+
+    A 400 naming an unsupported option (streaming, response_format) switches
+    that option off for the model and repeats the request once.
+    """
+    if image_data is None and prepared is None:
+        with open(image_path, "rb") as image_file:
+            image_data = image_file.read()
+    footer = details.get('ocr_footer') if details is not None else None
+    image_hash = (
+        (details or {}).get('image_hash')
+        or (prepared.image_hash if prepared is not None else gm_cache.hash_image_bytes(image_data))
+    )
+    structured = structured_output_enabled(model_name)
+    stream_to = on_fields if on_fields is not None and streaming_enabled(model_name) else None
+    detail, detail_reason = choose_image_detail(model_name, details)
+    exchange = {
+        'image_hash': image_hash,
+        'prompt_kind': 'animals' if footer is not None else 'full',
+        'structured': structured,
+        'streamed': stream_to is not None,
+        'detail': detail,
+    }
+
+    if gm_journal.is_replay():
+        result, raw_body = _replay_chat(model_name, exchange)
+    else:
+        encode_started = time.monotonic()
+        request = None
+        if prepared is not None:
+            request = build_request_body(
+                prepared, token, model_name, animal_species, details, animals_only=footer is not None,
+                structured=structured, stream=stream_to is not None, detail=detail
+            )
+        if request is None:
+            if image_data is None:
+                # Prepared for another model's upload profile
+                with open(image_path, "rb") as image_file:
+                    image_data = image_file.read()
+            request = build_request(
+                image_data, token, model_name, animal_species, details, animals_only=footer is not None,
+                structured=structured, detail=detail
+            )
+        headers, payload = request
+        exchange['latency_ms'] = {'encode': round((time.monotonic() - encode_started) * 1000, 1)}
+        try:
+            result, raw_body = _post_chat(api_base, model_name, headers, payload, exchange=exchange,
+                                          on_fields=stream_to)
+        except requests.HTTPError as exc:
+            body = getattr(exc.response, 'text', '')
+            option = None if retried else rejected_option(
+                getattr(exc.response, 'status_code', None), body, structured=structured, stream=stream_to is not None
+            )
+            if option == 'stream':
+                # Endpoint/model without streaming -> wait for complete answers from now on
+                disable_streaming(model_name, body)
+            elif option == 'response_format':
+                # Endpoint/model without json_schema support -> plain text prompt from now on
+                disable_structured_output(model_name, body)
+            else:
+                raise
+            return _try_api_call(image_path, token, api_base, model_name, animal_species, details, image_data,
+                                 on_fields, prepared, retried=True)
+    if details is not None and isinstance(result, dict):
+        details['usage'] = result.get('usage')
+    parsed = parse_completion(result, api_base, model_name, raw_body=raw_body, structured=structured)
+    if footer is not None and parsed != PLACEHOLDER_RESULT:
+        # Metadata comes from the local footer OCR, the model only saw the animals question
+        parsed = parsed[0], footer['location'], footer['time'], footer['date']
+    note_detail_result(model_name, detail, detail_reason, parsed, details)
+    return parsed
+
+
+def _replay_chat(model_name: str, exchange: dict):
+    """Serve a chat completion from the API journal (ANALYZER_API_BACKEND=replay)."""
+    entry = gm_journal.get_journal().lookup(
+        exchange['image_hash'], model_name, prompt_version(), exchange.get('prompt_kind')
+    )
+    if entry is None:
+        raise RuntimeError(f"Keine Aufzeichnung für {model_name} (sha256={exchange['image_hash'][:12]})")
+    result = {
+        'choices': [{'message': {'role': 'assistant', 'content': entry['content']}}],
+        'usage': entry.get('usage'),
+    }
+    return result, entry['content']
+
+
+def _post_chat(api_base: str, model_name: str, headers: dict, payload: dict, est_tokens=None, exchange=None,
+               on_fields=None):
+    """Send one chat completion through the limiter and return (json, raw_body).
+
+    With more than one token in the pool the request goes out on the next
+    token with headroom; a 429 on one token is retried on the others.
+    ``exchange`` carries journal fields (image hash, prompt kind, timings).
+    With ``on_fields`` the answer is streamed and fields are reported as
+    they complete; the return value is the same as for a plain request.
+    """
+    exchange = dict(exchange or {})
+    exchange['latency_ms'] = dict(exchange.get('latency_ms') or {})
+    pool = get_token_pool(_bearer_token(headers))
+    limiter_started = time.monotonic()
+    if len(pool) <= 1:
+        limiter = get_rate_limiter(model_name)
+        limiter.acquire(est_tokens)
+        exchange['latency_ms']['limiter'] = round((time.monotonic() - limiter_started) * 1000, 1)
+        return _send_chat(api_base, model_name, headers, payload, limiter, exchange, on_fields)
+
+    for attempt in range(len(pool)):
+        token, limiter = pool.acquire(model_name, est_tokens)
+        exchange['latency_ms']['limiter'] = round((time.monotonic() - limiter_started) * 1000, 1)
+        try:
+            return _send_chat(api_base, model_name, {**headers, "Authorization": f"Bearer {token}"},
+                              payload, limiter, exchange, on_fields)
+        except RateLimitError as exc:
+            if attempt + 1 >= len(pool):
+                raise
+            _log_debug(f"Token {token_fingerprint(token)} rejected ({exc.limit_type}) - trying next token")
+
+
+def _journal_exchange(exchange, api_base, model_name, headers, status, content=None, usage=None, error=None):
+    entry = dict(exchange)
+    entry.update({
+        'api_base': api_base,
+        'model': model_name,
+        'prompt_version': prompt_version(),
+        'prompt_layout': PROMPT_LAYOUT,
+        'token': token_fingerprint(_bearer_token(headers)),
+        'status': status,
+        'usage': usage,
+        'content': content,
+    })
+    if error:
+        entry['error'] = error
+    gm_journal.record(entry)
+    if not gm_journal.is_replay():
+        gm_usage.record_exchange(entry)
+
 
+def _send_chat(api_base: str, model_name: str, headers: dict, payload: dict, limiter, exchange=None,
+               on_fields=None):
+    exchange = exchange if exchange is not None else {'latency_ms': {}}
+    stream = ChatStream(on_fields, exchange.get('structured')) if on_fields is not None else None
+    gate_started = time.monotonic()
+    CONCURRENCY_GATE.enter()
+    request_started = time.monotonic()
+    exchange['latency_ms']['gate'] = round((request_started - gate_started) * 1000, 1)
+    response = None
     try:
-        response = requests.post(
+        if isinstance(payload, bytes):
+            # Pre-serialised body from build_request_body() (stream options already included)
+            body = {'data': payload}
+        else:
+            body = {'json': {**payload, **STREAM_OPTIONS} if stream is not None else payload}
+        response = get_http_client().post(
             f"{api_base}/chat/completions",
             headers=headers,
-            json=payload,
-            timeout=30
+            stream=stream is not None,
+            **body,
         )
+        exchange['latency_ms']['request'] = round((time.monotonic() - request_started) * 1000, 1)
+        _update_limiter(limiter, response)
         response.raise_for_status()
+        if stream is not None:
+            # 'request' is the time to the first byte here, 'stream' the time until the answer is complete
+            try:
+                for line in response.iter_lines():
+                    stream.feed_line(line)
+            except RuntimeError as exc:
+                # Error event from the service: the request counted against the quota all the same
+                exchange['latency_ms']['stream'] = round((time.monotonic() - request_started) * 1000, 1)
+                _log_debug(f"Stream from {model_name}@{api_base} failed: {exc}")
+                _journal_exchange(exchange, api_base, model_name, headers, response.status_code,
+                                  content=stream.content or None, usage=stream.usage, error=str(exc))
+                raise
+            exchange['latency_ms']['stream'] = round((time.monotonic() - request_started) * 1000, 1)
+        record_latency(model_name, time.monotonic() - request_started)
     except requests.RequestException as exc:
+        exchange['latency_ms'].setdefault('request', round((time.monotonic() - request_started) * 1000, 1))
         body = ""
         if getattr(exc, "response", None) is not None:
             try:
                 body = exc.response.text
             except Exception:
                 body = "<unlesbare Antwort>"
-        elif 'response' in locals():
+        elif response is not None:
             try:
                 body = response.text
             except Exception:
                 body = "<unlesbare Antwort>"
         _log_debug(f"API request failed for {model_name}@{api_base}: {exc} | body={body}")
+        rejected = getattr(exc, "response", None)
+        _journal_exchange(exchange, api_base, model_name, headers,
+                          rejected.status_code if rejected is not None else None,
+                          content=body[:2000] or None, error=str(exc))
+        if rejected is not None and rejected.status_code == 429:
+            wait, limit_type = _classify_rejection(rejected)
+            limiter.block(wait, limit_type)
+            raise RateLimitError(f"429 Rate limit ({limit_type}) für {model_name}: {body}", wait, limit_type) from exc
         raise
+    finally:
+        if stream is not None and response is not None:
+            response.close()  # Hands the pooled connection back, also after a failed stream
+        CONCURRENCY_GATE.leave()
+
+    if stream is not None:
+        result = stream.result()
+        limiter.update_from_response(usage=result['usage'])
+        _journal_exchange(exchange, api_base, model_name, headers, response.status_code,
+                          content=stream.content, usage=result['usage'])
+        return result, stream.content
 
     try:
         result = response.json()
-        analysis_text = result['choices'][0]['message']['content']
-    except (ValueError, KeyError, IndexError) as exc:
+    except ValueError as exc:
         _log_debug(
             f"Failed to parse API response from {model_name}@{api_base}: {exc} | body={response.text[:500]}"
         )
+        _journal_exchange(exchange, api_base, model_name, headers, response.status_code,
+                          content=response.text[:2000], error="invalid JSON")
         raise RuntimeError(f"Ungültige Antwort vom Modell {model_name}@{api_base}") from exc
 
-    _log_debug(f"Raw analysis response from {model_name}@{api_base} ->\n{analysis_text}")
-    return parse_analysis_response(analysis_text)
+    usage = result.get('usage') if isinstance(result, dict) else None
+    limiter.update_from_response(usage=usage)
+    try:
+        content = result['choices'][0]['message']['content']
+    except (TypeError, KeyError, IndexError):
+        content = None
+    _journal_exchange(exchange, api_base, model_name, headers, response.status_code, content=content, usage=usage)
+    return result, response.text
+
+
+# ---------------------------------------------------------------------------
+# Multi-image batched requests
+# ---------------------------------------------------------------------------
+MAX_BATCH_IMAGES = 6
+
+
+def build_batch_prompt(animal_species: list, animals_only: bool = False, structured: bool = False, variant=None):
+    """Instructions for a multi-image request, the images follow as "BILD n:" in the user message.
+
+    Same instructions as build_prompt() with one answer block (or one JSON
+    entry) per image. The text does not depend on the number of images, so
+    with the "system" layout it stays a cacheable prefix.
+    """
+    if (variant or PROMPT_VARIANT) == 'compact':
+        return _compact_prompt(animal_species, animals_only, structured, batch=True)
+    instructions = _prompt_instructions(animal_species, animals_only, structured)
+    if structured:
+        return f"""Analysiere jedes der folgenden Kamerafallen-Bilder einzeln (jeweils angekündigt mit "BILD n:").
+
+    {instructions}
+
+    Antworte ausschließlich mit JSON gemäß dem vorgegebenen Schema, mit einem Eintrag je Bild in images (image = n)."""
+    return f"""Analysiere jedes der folgenden Kamerafallen-Bilder einzeln (jeweils angekündigt mit "BILD n:") und gib die folgenden Informationen:
+
+    {instructions}
+
+    Bitte antworte für jedes Bild in einem eigenen Block genau wie folgt:
+    BILD [n]:
+    {_answer_lines(animals_only)}"""
+
+
+def parse_batch_response(analysis_text: str, image_count: int, animals_only: bool = False, structured: bool = False):
+    """Split a batched reply into per-image result tuples.
+
+    Returns a list with image_count entries; entries whose block is missing
+    or malformed are None so the caller can retry just those images. With
+    ``animals_only`` the location is not checked (it comes from the footer
+    OCR).
+    """
+    if structured or str(analysis_text or '').lstrip().startswith('{'):
+        try:
+            results = _parse_structured_batch(analysis_text, image_count)
+        except ValueError as exc:
+            _log_debug(f"Structured batch parse failed: {exc} - using text parser")
+        else:
+            if structured:
+                _count_parse('structured')
+            return results
+    if structured:
+        _count_parse('fallback')
+
+    blocks = {}
+    matches = list(re.finditer(r'^[\s#*>]*BILD\s*(\d+)\s*[:.)\-]?[\s*]*', analysis_text, re.IGNORECASE | re.MULTILINE))
+    for position, match in enumerate(matches):
+        number = int(match.group(1))
+        block_end = matches[position + 1].start() if position + 1 < len(matches) else len(analysis_text)
+        blocks.setdefault(number, analysis_text[match.end():block_end])
+
+    results = []
+    for number in range(1, image_count + 1):
+        block = blocks.get(number)
+        if not block or 'tiere' not in block.lower():
+            results.append(None)
+            continue
+        parsed = _parse_from_lines(block)
+        results.append(parsed if animals_only or parsed[1] in VALID_LOCATIONS else None)
+    return results
+
+
+def _parse_structured_batch(analysis_text: str, image_count: int):
+    """Per-image tuples from a build_response_format(batch=True) answer; bad entries become None."""
+    payload = json.loads(analysis_text)
+    if not isinstance(payload, dict) or not isinstance(payload.get('images'), list):
+        raise ValueError("missing images list")
+    results = [None] * image_count
+    for entry in payload['images']:
+        try:
+            number = int(entry['image'])
+            if 1 <= number <= image_count and results[number - 1] is None:
+                results[number - 1] = _structured_fields(entry)
+        except (TypeError, KeyError, ValueError) as exc:
+            _log_debug(f"Skipping malformed batch entry {entry!r}: {exc}")
+    return results
+
+
+def analyze_batch_with_github_models(image_paths: list, token: str, animal_species: list, details_list=None):
+    """Analyze several images with one chat completion per model attempt.
+
+    Each image that is cached is served from the cache; the rest are packed
+    into a single request. Footer OCR, structured output, the prompt layout,
+    the image detail and the cheap/strong cascade work as for single images.
+    Images whose result block is missing or malformed fall back to
+    analyze_with_github_models individually.
+
+    Returns a list with one entry per image: a result tuple or the Exception
+    raised by the single-image fallback.
+    """
+    image_paths = list(image_paths)
+    if details_list is None:
+        details_list = [{} for _ in image_paths]
+    results = [None] * len(image_paths)
+    image_data = {}
+    image_hashes = {}
+
+    for position, image_path in enumerate(image_paths):
+        try:
+            with open(image_path, "rb") as image_file:
+                data = image_file.read()
+        except OSError as exc:
+            results[position] = exc
+            continue
+        image_hashes[position] = gm_cache.hash_image_bytes(data)
+        details_list[position]['image_hash'] = image_hashes[position]
+        cached = _lookup_cached_result(image_path, image_hashes[position], animal_species, details_list[position])
+        if cached is not None:
+            results[position] = cached
+        else:
+            image_data[position] = data
+
+    pending = sorted(image_data)
+    cascade, batch_models = cascade_models()
+    escalations = {}
+    # The journal replays single-image answers only
+    if len(pending) >= 2 and not gm_journal.is_replay():
+        for position in pending:
+            _read_footer(image_paths[position], image_data[position], details_list[position])
+        cheap_failure = None
+        for step, (api_base, model_name) in enumerate(batch_models):
+            cheap_step = cascade and step == 0
+            try:
+                batch_results = _call_with_breaker(
+                    api_base, model_name,
+                    lambda: _try_batch_api_call(
+                        [image_data[position] for position in pending], token, api_base, model_name,
+                        animal_species, [details_list[position] for position in pending]
+                    ),
+                    is_failure=lambda results: all(result is None for result in results),
+                )
+            except BatchRejectedError as exc:
+                # Every image gets its own request (and cascade) below
+                _log_debug(str(exc))
+                break
+            except Exception as exc:
+                _log_debug(f"Batch request of {len(pending)} images failed on {model_name}: {exc}")
+                if cheap_step:
+                    cheap_failure = cheap_failure_reason(exc)
+                continue
+            # The cascade outcome is counted once per image: here for batch answers, by
+            # analyze_with_github_models for images that fall back to a single request
+            for position, result in zip(pending, batch_results):
+                if result is None:
+                    continue
+                details = details_list[position]
+                details['batched'] = len(pending)
+                if cheap_step:
+                    if judge_cheap_answer(result, animal_species, details):
+                        escalations[position] = result
+                        continue
+                else:
+                    if cascade:
+                        record_escalation([cheap_failure], details)
+                    else:
+                        _record_cascade('strong_direct')
+                    if needs_detail_rerun(result, details):
+                        result = _rerun_high_detail(image_paths[position], token, api_base, model_name,
+                                                    animal_species, details, image_data[position], None, result)
+                results[position] = result
+                _store_result(result, image_hashes[position], api_base, model_name, animal_species, details)
+            break
+
+    for position, image_path in enumerate(image_paths):
+        if results[position] is not None:
+            continue
+        try:
+            if position in escalations:
+                results[position] = _escalate(
+                    image_path, token, animal_species, details_list[position], image_data[position],
+                    image_hashes[position], cheap_result=escalations[position]
+                )
+                continue
+            _log_debug(f"Batch block missing for {Path(image_path).name} - falling back to single request")
+            results[position] = analyze_with_github_models(image_path, token, animal_species, details_list[position])
+        except Exception as exc:
+            results[position] = exc
+    return results
+
+
+def _try_batch_api_call(images: list, token: str, api_base: str, model_name: str, animal_species: list,
+                        details_list: list, retried=False):
+    """Send one multi-image request; returns a result tuple or None per image.
+
+    A 400 that does not name response_format (payload too large, one broken
+    image, content filter) raises BatchRejectedError, so the images are
+    retried one by one instead of switching a feature off.
+    """
+    # One prompt for the whole request: the footer question is left out only if OCR read every image
+    animals_only = all(details.get('ocr_footer') for details in details_list)
+    structured = structured_output_enabled(model_name)
+    content = []
+    detail_choices = []
+    profile = get_upload_profile(model_name)
+    for number, (data, details) in enumerate(zip(images, details_list), start=1):
+        upload_data, upload_stats = _encode_image_for_upload(data, profile)
+        _record_upload_stats(model_name, upload_stats, details)
+        base64_image = base64.b64encode(upload_data).decode('utf-8')
+        detail, detail_reason = choose_image_detail(model_name, details)
+        detail_choices.append((detail, detail_reason))
+        image_url = {"url": f"data:image/jpeg;base64,{base64_image}"}
+        if detail:
+            image_url["detail"] = detail
+        content.append({"type": "text", "text": f"BILD {number}:"})
+        content.append({"type": "image_url", "image_url": image_url})
+
+    prompt = build_batch_prompt(animal_species, animals_only=animals_only, structured=structured)
+    payload = {
+        "model": model_name,
+        "messages": _chat_messages(prompt, content),
+        "max_tokens": 250 * len(images) + 100,
+        "temperature": 0.1
+    }
+    if structured:
+        payload["response_format"] = build_response_format(animal_species, animals_only=animals_only, batch=True)
+    headers = {"Authorization": f"Bearer {token}"}
+    limiter = get_rate_limiter(model_name)
+    exchange = {
+        'batch': len(images),
+        'image_hashes': [details.get('image_hash') for details in details_list],
+        'prompt_kind': 'batch',
+        'animals_only': animals_only,
+        'structured': structured,
+        'detail': [detail for detail, _ in detail_choices],
+    }
+    try:
+        result, raw_body = _post_chat(
+            api_base, model_name, headers, payload, est_tokens=limiter.avg_tokens_per_request * len(images),
+            exchange=exchange
+        )
+    except requests.HTTPError as exc:
+        status = getattr(exc.response, 'status_code', None)
+        body = getattr(exc.response, 'text', '')
+        if not retried and rejected_option(status, body, structured=structured) == 'response_format':
+            # Endpoint/model without json_schema support -> plain text prompt from now on
+            disable_structured_output(model_name, body)
+            return _try_batch_api_call(images, token, api_base, model_name, animal_species, details_list,
+                                       retried=True)
+        if status != 400:
+            raise
+        raise BatchRejectedError(
+            f"Batch of {len(images)} images rejected by {model_name}@{api_base}: {body[:200]}"
+        ) from exc
+    try:
+        analysis_text = result['choices'][0]['message']['content']
+    except (TypeError, KeyError, IndexError) as exc:
+        raise RuntimeError(f"Ungültige Antwort vom Modell {model_name}@{api_base}") from exc
+    _log_debug(f"Raw batch response ({len(images)} images) from {model_name}@{api_base} ->\n{analysis_text}")
+
+    results = parse_batch_response(analysis_text, len(images), animals_only=animals_only, structured=structured)
+    for position, (parsed, details) in enumerate(zip(results, details_list)):
+        if parsed is None or parsed == PLACEHOLDER_RESULT:
+            continue
+        footer = details.get('ocr_footer')
+        if footer is not None:
+            # Metadata comes from the local footer OCR, as for single requests
+            results[position] = parsed = parsed[0], footer['location'], footer['time'], footer['date']
+        detail, detail_reason = detail_choices[position]
+        note_detail_result(model_name, detail, detail_reason, parsed, details)
+    return results
+
+
+def _update_limiter(limiter, response):
+    try:
+        limiter.update_from_response(headers=response.headers)
+    except Exception as exc:
+        _log_debug(f"Could not read rate limit headers: {exc}")
 
 
 def parse_analysis_response(analysis_text: str):
@@ -0,0 +1,657 @@
+#!/usr/bin/env python3
+"""asyncio client for GitHub Models image analysis.
+
+Provides AsyncModelsClient with analyze() and analyze_many(). Requests are
+issued with httpx.AsyncClient when available, so hundreds of images can be
+queued without a thread per request; only ``max_concurrency`` requests are in
+flight at any time. Model fallback, the cheap/strong cascade decisions,
+caching and response parsing are shared with github_models_api.
+
+analyze_hedged() serves the image the user is looking at: if the first model
+has not answered within its observed p90 latency, the alternate model is
+asked as well and the first usable answer wins; the slower request is
+cancelled (its httpx connection is closed). AnalysisBuffer calls it through
+analyze_hedged_sync() for the foreground image only, prefetching stays
+unhedged so it does not double the quota use. The prefetch itself is not
+driven through analyze_many(): its threads are already capped by
+CONCURRENCY_GATE.max_concurrent (2 by default), and batched requests and the
+preparation stage are synchronous, so moving it here would save neither
+requests nor latency. The headless ``--batch`` mode of the analyzer sends its
+single-image requests through analyze_many().
+
+Example:
+
+    async with AsyncModelsClient(token, ANIMAL_SPECIES) as client:
+        async for item in client.analyze_many(paths):
+            print(item['path'], item['result'] or item['error'])
+"""
+import asyncio
+import os
+import threading
+import time
+
+import github_models_api as gm_api
+import github_models_cache as gm_cache
+import github_models_journal as gm_journal
+
+try:
+    import httpx  # type: ignore[import]
+except ImportError:  # Fall back to the sync client in worker threads
+    httpx = None
+
+
+DEFAULT_MAX_CONCURRENCY = 2  # GitHub Models allows only 2 concurrent requests
+HEDGING_ENABLED = os.environ.get("ANALYZER_HEDGING", "1") != "0"
+# Hedge delay while fewer than 5 latencies have been observed for the model
+HEDGE_DEFAULT_AFTER = gm_api._env_float("ANALYZER_HEDGE_AFTER", 8.0)
+_HEDGE_STATS = {'requests': 0, 'hedged': 0, 'hedge_won': 0, 'skipped_budget': 0}
+_HEDGE_LOCK = threading.Lock()
+
+
+class AsyncModelsClient:
+    """Bounded-concurrency async analysis client with per-request cancellation."""
+
+    def __init__(self, token: str, animal_species: list, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 connect_timeout: float = gm_api.CONNECT_TIMEOUT, read_timeout: float = gm_api.READ_TIMEOUT):
+        self.token = token
+        self.animal_species = list(animal_species)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._semaphore = None
+        self._client = None
+        self._tasks = {}  # {image_path: asyncio.Task}
+
+    async def __aenter__(self):
+        self._ensure_started()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    def _ensure_started(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self._client is None and httpx is not None:
+            limits = httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            )
+            timeout = httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+            self._client = httpx.AsyncClient(
+                limits=limits,
+                timeout=timeout,
+                headers={"Accept": "application/json", "Content-Type": "application/json"},
+            )
+
+    async def aclose(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def cancel(self, image_path: str) -> bool:
+        """Cancel a queued or in-flight analysis. Returns True if a task was cancelled."""
+        task = self._tasks.get(image_path)
+        if task is None or task.done():
+            return False
+        return task.cancel()
+
+    async def analyze(self, image_path: str, details=None):
+        """Analyze one image; returns (animals, location, time_str, date_str)."""
+        self._ensure_started()
+        async with self._semaphore:
+            if self._client is None or gm_journal.is_replay():
+                # No httpx (or replaying the journal): run the sync implementation, still bounded by the semaphore
+                return await asyncio.to_thread(
+                    gm_api.analyze_with_github_models, image_path, self.token, self.animal_species, details
+                )
+            return await self._analyze_with_httpx(image_path, details)
+
+    async def _load_image(self, image_path: str):
+        """(image_data, image_hash, prepared); image_data is None when the preparation stage has the image."""
+        prepared = await asyncio.to_thread(gm_api.claim_prepared, image_path)
+        if prepared is not None:
+            return None, prepared.image_hash, prepared
+        image_data = await asyncio.to_thread(_read_file, image_path)
+        return image_data, gm_cache.hash_image_bytes(image_data), None
+
+    async def _read_footer(self, image_path, image_data, prepared, details):
+        if prepared is not None:
+            gm_api._apply_footer(image_path, prepared.footer, details)
+        else:
+            await asyncio.to_thread(gm_api._read_footer, image_path, image_data, details)
+
+    async def _analyze_with_httpx(self, image_path: str, details=None):
+        image_data, image_hash, prepared = await self._load_image(image_path)
+        if details is not None:
+            details['image_hash'] = image_hash
+
+        cached = gm_api._lookup_cached_result(image_path, image_hash, self.animal_species, details)
+        if cached is not None:
+            return cached
+        if details is None:
+            details = {}
+        await self._read_footer(image_path, image_data, prepared, details)
+
+        errors = []
+        rate_limits = []
+        fallback = None  # Cheap answer kept in case the escalation fails
+        cascade, endpoints_and_models = gm_api.cascade_models()
+        if not cascade:
+            gm_api._record_cascade('strong_direct')
+        for position, (api_base, model_name) in enumerate(endpoints_and_models):
+            cheap_step = cascade and position == 0
+            try:
+                result = await _call_with_breaker(
+                    api_base, model_name,
+                    lambda: self._try_api_call(image_data, api_base, model_name, details, prepared=prepared)
+                )
+                if cheap_step:
+                    reasons = gm_api.judge_cheap_answer(result, self.animal_species, details)
+                    if reasons:
+                        if result != gm_api.PLACEHOLDER_RESULT:
+                            fallback = result
+                        errors.append(f"{model_name}@{api_base}: escalated ({', '.join(reasons)})")
+                        continue
+                if gm_api.needs_detail_rerun(result, details):
+                    result = await self._rerun_high_detail(image_data, api_base, model_name, details, prepared,
+                                                           result)
+                if result != gm_api.PLACEHOLDER_RESULT:
+                    gm_api._store_result(result, image_hash, api_base, model_name, self.animal_species, details)
+                    return result
+                errors.append(f"{model_name}@{api_base}: placeholder response")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                if isinstance(exc, gm_api.RateLimitError):
+                    rate_limits.append(exc)
+                errors.append(f"{model_name}@{api_base}: {exc}")
+                if cheap_step:
+                    gm_api.record_escalation([gm_api.cheap_failure_reason(exc)], details)
+
+        if fallback is not None:
+            return gm_api.keep_cheap_answer(fallback, image_hash, self.animal_species, details, "; ".join(errors))
+        gm_api._raise_all_failed(errors, rate_limits)
+
+    async def analyze_hedged(self, image_path: str, details=None, hedge_after=None, on_fields=None):
+        """Analyze one image, racing the alternate model once the first one is slow.
+
+        ``hedge_after`` defaults to the observed p90 request latency of the
+        first model. The second request is only sent if the concurrency gate
+        and rate limit have room right now. ``on_fields`` gets streamed
+        partial fields (see analyze_with_github_models) from whichever
+        request reports first.
+        """
+        self._ensure_started()
+        if self._client is None or gm_journal.is_replay():
+            return await asyncio.to_thread(
+                gm_api.analyze_with_github_models, image_path, self.token, self.animal_species, details, on_fields
+            )
+        image_data, image_hash, prepared = await self._load_image(image_path)
+        if details is None:
+            details = {}
+        details['image_hash'] = image_hash
+        cached = gm_api._lookup_cached_result(image_path, image_hash, self.animal_species, details)
+        if cached is not None:
+            return cached
+        await self._read_footer(image_path, image_data, prepared, details)
+        gm_api.deliver_footer_fields(details, on_fields)
+
+        primary, alternate = gm_api.hedge_models()
+        cascade = gm_api.cascade_models()[0]
+        if hedge_after is None:
+            hedge_after = gm_api.get_latency_percentile(primary[1], 0.9) or HEDGE_DEFAULT_AFTER
+        _count_hedge('requests')
+        if not cascade:
+            gm_api._record_cascade('strong_direct')
+
+        streaming_from = []  # Model whose partial fields reach the UI; the other racer stays silent
+
+        def _fields_from(model_name):
+            if on_fields is None:
+                return None
+
+            def _deliver(fields):
+                # Runs on the event loop thread, so no lock is needed
+                if not streaming_from:
+                    streaming_from.append(model_name)
+                if streaming_from[0] == model_name:
+                    on_fields(fields)
+            return _deliver
+
+        def _start(candidate):
+            # Each racer gets its own details so upload/exchange stats do not mix
+            call_details = {key: value for key, value in details.items()
+                            if key in ('image_hash', 'ocr_footer', 'escalation_reasons', 'bartgeier_seen')}
+            api_base, model_name = candidate
+            task = asyncio.create_task(_call_with_breaker(
+                api_base, model_name, lambda: self._try_api_call(
+                    image_data, api_base, model_name, call_details, _fields_from(model_name), prepared
+                )
+            ))
+            tasks[task] = (candidate, call_details)
+
+        tasks = {}
+        errors = []
+        rate_limits = []
+        fallback = None  # Cheap answer kept while the strong model is still running
+        cheap_judged = False  # The cascade outcome is counted once, whichever racer ends first
+        alternate_started = False
+        _start(primary)
+        try:
+            done, _ = await asyncio.wait(list(tasks), timeout=hedge_after)
+            if not done:
+                if gm_api.hedge_budget_available(alternate[1]):
+                    gm_api._log_debug(
+                        f"Hedging {os.path.basename(image_path)}: {primary[1]} slower than {hedge_after:.1f}s, "
+                        f"also asking {alternate[1]}"
+                    )
+                    _count_hedge('hedged')
+                    details['hedged'] = True
+                    alternate_started = True
+                    _start(alternate)
+                else:
+                    _count_hedge('skipped_budget')
+
+            while tasks:
+                done, _ = await asyncio.wait(list(tasks), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    (api_base, model_name), call_details = tasks.pop(task)
+                    cheap_step = cascade and (api_base, model_name) == primary
+                    try:
+                        result = task.result()
+                    except Exception as exc:
+                        if isinstance(exc, gm_api.RateLimitError):
+                            rate_limits.append(exc)
+                        errors.append(f"{model_name}@{api_base}: {exc}")
+                        if cheap_step:
+                            cheap_judged = True
+                            gm_api.record_escalation([gm_api.cheap_failure_reason(exc)], details)
+                        result = None
+                    if result is not None and cheap_step:
+                        if call_details.get('bartgeier_seen'):
+                            details['bartgeier_seen'] = True  # The strong model then looks at high detail
+                        cheap_judged = True
+                        reasons = gm_api.judge_cheap_answer(result, self.animal_species, details)
+                        if reasons:
+                            errors.append(f"{model_name}@{api_base}: escalated ({', '.join(reasons)})")
+                            if result != gm_api.PLACEHOLDER_RESULT:
+                                fallback = (result, call_details)
+                            result = None
+                    if result == gm_api.PLACEHOLDER_RESULT:
+                        errors.append(f"{model_name}@{api_base}: placeholder response")
+                        result = None
+                    if result is None:
+                        continue
+                    for other in tasks:
+                        other.cancel()
+                    if gm_api.needs_detail_rerun(result, call_details):
+                        result = await self._rerun_high_detail(image_data, api_base, model_name, call_details,
+                                                               prepared, result)
+                    details.update(call_details)
+                    if cascade and not cheap_judged:
+                        # The strong model answered before the cheap one, which was cancelled
+                        gm_api.record_escalation(['hedge'], details)
+                    if details.get('hedged'):
+                        details['hedge_winner'] = model_name
+                        if (api_base, model_name) == alternate:
+                            _count_hedge('hedge_won')
+                    gm_api._store_result(result, image_hash, api_base, model_name, self.animal_species, details)
+                    return result
+
+                if not tasks and not alternate_started:
+                    # The first model failed (or needs escalation) before the hedge fired
+                    alternate_started = True
+                    _start(alternate)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if fallback is not None:
+            result, call_details = fallback
+            details.update(call_details)
+            return gm_api.keep_cheap_answer(result, image_hash, self.animal_species, details, "; ".join(errors))
+        gm_api._raise_all_failed(errors, rate_limits)
+
+    async def _try_api_call(self, image_data: bytes, api_base: str, model_name: str, details=None,
+                            on_fields=None, prepared=None, retried=False):
+        footer = details.get('ocr_footer') if details is not None else None
+        image_hash = (details or {}).get('image_hash') or (
+            prepared.image_hash if prepared is not None else gm_cache.hash_image_bytes(image_data)
+        )
+        structured = gm_api.structured_output_enabled(model_name)
+        stream = None
+        if on_fields is not None and gm_api.streaming_enabled(model_name):
+            stream = gm_api.ChatStream(on_fields, structured)
+        detail, detail_reason = gm_api.choose_image_detail(model_name, details)
+        exchange = {
+            'image_hash': image_hash,
+            'prompt_kind': 'animals' if footer is not None else 'full',
+            'structured': structured,
+            'streamed': stream is not None,
+            'detail': detail,
+            'latency_ms': {},
+        }
+        started = time.monotonic()
+        request = None
+        if prepared is not None:
+            # Only splices bytes into a cached body, cheap enough for the event loop
+            request = gm_api.build_request_body(
+                prepared, self.token, model_name, self.animal_species, details, footer is not None, structured,
+                stream is not None, detail
+            )
+        if request is None:
+            if image_data is None:
+                image_data = await asyncio.to_thread(_read_file, prepared.image_path)
+            # Pillow re-encoding is CPU-bound, keep it off the event loop
+            request = await asyncio.to_thread(
+                gm_api.build_request, image_data, self.token, model_name, self.animal_species, details,
+                footer is not None, structured, detail
+            )
+        headers, payload = request
+        if isinstance(payload, bytes):
+            body = {'content': payload}  # Stream options are part of the prepared body
+        else:
+            body = {'json': {**payload, **gm_api.STREAM_OPTIONS} if stream is not None else payload}
+        exchange['latency_ms']['encode'] = round((time.monotonic() - started) * 1000, 1)
+        try:
+            response, limiter, headers = await self._post_chat(api_base, model_name, headers, body, exchange, stream)
+        except httpx.HTTPStatusError as exc:
+            option = None if retried else gm_api.rejected_option(
+                exc.response.status_code, exc.response.text, structured=structured, stream=stream is not None
+            )
+            if option == 'stream':
+                gm_api.disable_streaming(model_name, exc.response.text)
+            elif option == 'response_format':
+                gm_api.disable_structured_output(model_name, exc.response.text)
+            else:
+                raise RuntimeError(f"{exc.response.status_code} {exc.response.text}") from exc
+            return await self._try_api_call(image_data, api_base, model_name, details, on_fields, prepared,
+                                            retried=True)
+        if stream is not None:
+            result = stream.result()
+            raw_body = content = stream.content
+        else:
+            try:
+                result = response.json()
+            except ValueError as exc:
+                gm_api._log_debug(
+                    f"Failed to parse API response from {model_name}@{api_base}: {exc} | body={response.text[:500]}"
+                )
+                raise RuntimeError(f"Ungültige Antwort vom Modell {model_name}@{api_base}") from exc
+            raw_body = response.text
+            try:
+                content = result['choices'][0]['message']['content']
+            except (TypeError, KeyError, IndexError):
+                content = None
+        usage = result.get('usage') if isinstance(result, dict) else None
+        if details is not None:
+            details['usage'] = usage
+        limiter.update_from_response(usage=usage)
+        gm_api._journal_exchange(exchange, api_base, model_name, headers, response.status_code,
+                                 content=content, usage=usage)
+        parsed = gm_api.parse_completion(result, api_base, model_name, raw_body=raw_body,
+                                         structured=structured)
+        if footer is not None and parsed != gm_api.PLACEHOLDER_RESULT:
+            parsed = parsed[0], footer['location'], footer['time'], footer['date']
+        gm_api.note_detail_result(model_name, detail, detail_reason, parsed, details)
+        return parsed
+
+    async def _post_chat(self, api_base, model_name, headers, body, exchange, stream):
+        """Async counterpart of github_models_api._post_chat; returns (response, limiter, headers).
+
+        With more than one token in the pool a 429 on one token is retried on
+        the others.
+        """
+        started = time.monotonic()
+        pool = gm_api.get_token_pool(self.token)
+        if len(pool) <= 1:
+            limiter = gm_api.get_rate_limiter(model_name)
+            await _acquire_limiter(limiter)
+            exchange['latency_ms']['limiter'] = round((time.monotonic() - started) * 1000, 1)
+            response = await self._send_chat(api_base, model_name, headers, body, limiter, exchange, stream)
+            return response, limiter, headers
+
+        for attempt in range(len(pool)):
+            token, limiter = await _acquire_pool_token(pool, model_name)
+            exchange['latency_ms']['limiter'] = round((time.monotonic() - started) * 1000, 1)
+            token_headers = {**headers, "Authorization": f"Bearer {token}"}
+            try:
+                response = await self._send_chat(api_base, model_name, token_headers, body, limiter, exchange,
+                                                 stream)
+                return response, limiter, token_headers
+            except gm_api.RateLimitError as exc:
+                if attempt + 1 >= len(pool):
+                    raise
+                gm_api._log_debug(
+                    f"Token {gm_api.token_fingerprint(token)} rejected ({exc.limit_type}) - trying next token"
+                )
+
+    async def _send_chat(self, api_base, model_name, headers, body, limiter, exchange, stream):
+        """One request through the concurrency gate; a 429 blocks the limiter and raises RateLimitError."""
+        started = time.monotonic()
+        await _enter_gate(gm_api.CONCURRENCY_GATE)
+        exchange['latency_ms']['gate'] = round((time.monotonic() - started) * 1000, 1)
+        started = time.monotonic()
+        try:
+            if stream is not None:
+                async with self._client.stream("POST", f"{api_base}/chat/completions", headers=headers,
+                                               **body) as response:
+                    exchange['latency_ms']['request'] = round((time.monotonic() - started) * 1000, 1)
+                    gm_api._update_limiter(limiter, response)
+                    if response.is_error:
+                        await response.aread()  # The error handlers below need the body
+                    response.raise_for_status()
+                    try:
+                        async for line in response.aiter_lines():
+                            stream.feed_line(line)
+                    except RuntimeError as exc:
+                        # Error event from the service: the request counted against the quota all the same
+                        exchange['latency_ms']['stream'] = round((time.monotonic() - started) * 1000, 1)
+                        gm_api._log_debug(f"Async stream from {model_name}@{api_base} failed: {exc}")
+                        gm_api._journal_exchange(exchange, api_base, model_name, headers, response.status_code,
+                                                 content=stream.content or None, usage=stream.usage,
+                                                 error=str(exc))
+                        raise
+                exchange['latency_ms']['stream'] = round((time.monotonic() - started) * 1000, 1)
+            else:
+                response = await self._client.post(f"{api_base}/chat/completions", headers=headers, **body)
+                exchange['latency_ms']['request'] = round((time.monotonic() - started) * 1000, 1)
+                gm_api._update_limiter(limiter, response)
+                response.raise_for_status()
+            gm_api.record_latency(model_name, time.monotonic() - started)
+            return response
+        except httpx.HTTPStatusError as exc:
+            gm_api._log_debug(
+                f"Async API request failed for {model_name}@{api_base}: {exc} | body={exc.response.text}"
+            )
+            gm_api._journal_exchange(exchange, api_base, model_name, headers, exc.response.status_code,
+                                     content=exc.response.text[:2000] or None, error=str(exc))
+            if exc.response.status_code == 429:
+                wait, limit_type = gm_api._classify_rejection(exc.response)
+                limiter.block(wait, limit_type)
+                raise gm_api.RateLimitError(
+                    f"429 Rate limit ({limit_type}) für {model_name}: {exc.response.text}", wait, limit_type
+                ) from exc
+            raise
+        except httpx.HTTPError as exc:
+            gm_api._log_debug(f"Async API request failed for {model_name}@{api_base}: {exc!r}")
+            gm_api._journal_exchange(exchange, api_base, model_name, headers, None, error=repr(exc))
+            raise
+        finally:
+            gm_api.CONCURRENCY_GATE.leave()
+
+    async def _rerun_high_detail(self, image_data, api_base, model_name, details, prepared, low_result):
+        """Async counterpart of github_models_api._rerun_high_detail."""
+        gm_api._log_debug(f"Bartgeier in low-detail answer from {model_name} - repeating at high detail")
+        gm_api.note_detail_rerun(details)
+        try:
+            return await _call_with_breaker(
+                api_base, model_name, lambda: self._try_api_call(image_data, api_base, model_name, details,
+                                                                 prepared=prepared)
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            gm_api._log_debug(f"High-detail re-run failed for {model_name}: {exc}")
+            return low_result
+
+    async def analyze_many(self, image_paths):
+        """Analyze many images, yielding result dicts in completion order.
+
+        Each yielded dict has the keys path, result (tuple or None), error
+        (str or None), exception (the raised exception or None), cancelled
+        (bool) and details.
+        """
+        self._ensure_started()
+        queue = asyncio.Queue()
+        pending = 0
+
+        async def _run(path):
+            details = {}
+            try:
+                result = await self.analyze(path, details)
+                item = {'path': path, 'result': result, 'error': None, 'exception': None, 'cancelled': False,
+                        'details': details}
+            except asyncio.CancelledError as exc:
+                item = {'path': path, 'result': None, 'error': 'cancelled', 'exception': exc, 'cancelled': True,
+                        'details': details}
+            except Exception as exc:
+                item = {'path': path, 'result': None, 'error': str(exc), 'exception': exc, 'cancelled': False,
+                        'details': details}
+            finally:
+                self._tasks.pop(path, None)
+            await queue.put(item)
+
+        for path in image_paths:
+            path = os.fspath(path)
+            self._tasks[path] = asyncio.create_task(_run(path))
+            pending += 1
+
+        while pending:
+            item = await queue.get()
+            pending -= 1
+            yield item
+
+
+def _count_hedge(key):
+    with _HEDGE_LOCK:
+        _HEDGE_STATS[key] += 1
+
+
+def get_hedge_stats():
+    with _HEDGE_LOCK:
+        return dict(_HEDGE_STATS)
+
+
+_HEDGE_LOOP = None
+_HEDGE_CLIENTS = {}  # {(token, species): AsyncModelsClient} living on _HEDGE_LOOP
+_HEDGE_LOOP_LOCK = threading.Lock()
+
+
+def _hedge_loop():
+    """Background event loop shared by all hedged requests (keeps httpx connections alive)."""
+    global _HEDGE_LOOP
+    with _HEDGE_LOOP_LOCK:
+        if _HEDGE_LOOP is None:
+            _HEDGE_LOOP = asyncio.new_event_loop()
+            threading.Thread(target=_HEDGE_LOOP.run_forever, name="hedge-loop", daemon=True).start()
+        return _HEDGE_LOOP
+
+
+def analyze_hedged_sync(image_path: str, token: str, animal_species: list, details=None, on_fields=None):
+    """Blocking analyze_hedged() for worker threads; plain analysis if hedging is unavailable."""
+    if not HEDGING_ENABLED or httpx is None or gm_journal.is_replay():
+        return gm_api.analyze_with_github_models(image_path, token, animal_species, details, on_fields)
+    loop = _hedge_loop()
+    key = (token, tuple(animal_species))
+    with _HEDGE_LOOP_LOCK:
+        client = _HEDGE_CLIENTS.get(key)
+        if client is None:
+            # Room for the first request and its hedge; the global gate still caps the total
+            client = _HEDGE_CLIENTS[key] = AsyncModelsClient(token, animal_species, max_concurrency=2)
+    future = asyncio.run_coroutine_threadsafe(client.analyze_hedged(image_path, details, on_fields=on_fields), loop)
+    return future.result()
+
+
+def shutdown_hedging():
+    """Close the hedging clients and stop the background loop."""
+    global _HEDGE_LOOP
+    with _HEDGE_LOOP_LOCK:
+        loop, _HEDGE_LOOP = _HEDGE_LOOP, None
+        clients = list(_HEDGE_CLIENTS.values())
+        _HEDGE_CLIENTS.clear()
+    if loop is None:
+        return
+    try:
+        for client in clients:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=5)
+    except Exception as exc:
+        gm_api._log_debug(f"Closing hedging clients failed: {exc}")
+    loop.call_soon_threadsafe(loop.stop)
+
+
+async def _call_with_breaker(api_base, model_name, make_call):
+    """Async counterpart of github_models_api._call_with_breaker()."""
+    breaker = gm_api.get_circuit_breaker(api_base, model_name)
+    if not breaker.allow():
+        raise gm_api.CircuitOpenError(
+            f"{model_name} vorübergehend deaktiviert (nächster Versuch in {breaker.retry_in():.0f}s)",
+            breaker.retry_in()
+        )
+    try:
+        result = await make_call()
+    except (asyncio.CancelledError, gm_api.RateLimitError):
+        breaker.release_probe()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    if result == gm_api.PLACEHOLDER_RESULT:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return result
+
+
+async def _acquire_limiter(limiter, max_wait=gm_api.MAX_LIMITER_WAIT):
+    """Async counterpart of RateLimiter.acquire() that sleeps on the event loop."""
+    while True:
+        ok, wait, limit_type = limiter.try_acquire()
+        if ok:
+            return
+        if wait > max_wait:
+            raise gm_api.RateLimitError(
+                f"Rate limit ({limit_type}) for {limiter.name}: next slot in {wait:.0f}s", wait, limit_type
+            )
+        await asyncio.sleep(wait)
+
+
+async def _acquire_pool_token(pool, model_name, max_wait=gm_api.MAX_LIMITER_WAIT):
+    """Async counterpart of TokenPool.acquire(); returns (token, limiter)."""
+    while True:
+        token, limiter, wait, limit_type = pool.try_acquire(model_name)
+        if token is not None:
+            return token, limiter
+        if wait > max_wait:
+            raise gm_api.RateLimitError(
+                f"Rate limit ({limit_type}) für {model_name} auf allen {len(pool)} Token: "
+                f"nächster Slot in {wait:.0f}s", wait, limit_type
+            )
+        await asyncio.sleep(wait)
+
+
+async def _enter_gate(gate, max_wait=gm_api.MAX_LIMITER_WAIT, poll_interval=0.1):
+    """Async counterpart of ConcurrencyGate.enter(), gives up after ``max_wait`` seconds like the sync path."""
+    deadline = time.monotonic() + max_wait
+    while not gate.try_enter():
+        if time.monotonic() >= deadline:
+            raise gm_api.RateLimitError("Zu viele gleichzeitige Anfragen", 2, 'concurrent')
+        await asyncio.sleep(poll_interval)
+
+
+def _read_file(image_path: str) -> bytes:
+    with open(image_path, "rb") as image_file:
+        return image_file.read()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Content-addressed on-disk cache for AI analysis results.
+
+Entries are keyed by the SHA-256 of the image bytes together with the prompt
+version, the species list and the model name. Because the key does not depend
+on the file name, renamed images (create_backup_and_rename_image), restarts,
+refreshes and reordering all hit the cache instead of the API.
+
+The cache lives under ~/.kamerafallen-tools/analysis_cache, one small JSON
+file per entry. File modification times double as LRU timestamps; the total
+size is bounded and the least recently used entries are evicted first.
+"""
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+CACHE_DIR = Path.home() / ".kamerafallen-tools" / "analysis_cache"
+MAX_CACHE_BYTES = _env_int("ANALYZER_CACHE_MAX_BYTES", 50 * 1024 * 1024)
+CACHE_ENABLED = os.environ.get("ANALYZER_CACHE", "1") != "0"
+
+
+def hash_image_bytes(image_data: bytes) -> str:
+    """Return the hex SHA-256 digest of the raw image bytes."""
+    return hashlib.sha256(image_data).hexdigest()
+
+
+def hash_image_file(image_path: str) -> str:
+    """Return the hex SHA-256 digest of an image file on disk."""
+    digest = hashlib.sha256()
+    with open(image_path, "rb") as image_file:
+        for chunk in iter(lambda: image_file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_cache_key(image_hash: str, model_name: str, prompt_version: str, animal_species) -> str:
+    """Combine image hash, model, prompt version and species list into one key."""
+    material = json.dumps(
+        {
+            'image': image_hash,
+            'model': model_name,
+            'prompt': prompt_version,
+            'species': list(animal_species or []),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """Size-bounded LRU cache of parsed analysis results stored on disk."""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = None  # OrderedDict {key: size_bytes}, oldest first
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writes = 0
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _load_index(self):
+        """Build the in-memory LRU index from the files on disk (once)."""
+        if self._index is not None:
+            return
+        entries = []
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for path in self.cache_dir.glob("*/*.json"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path.stem, stat.st_size))
+        except Exception:
+            entries = []
+        entries.sort()
+        self._index = OrderedDict((key, size) for _, key, size in entries)
+        self._total_bytes = sum(self._index.values())
+
+    def get(self, key: str):
+        """Return the cached entry dict or None. Touches the entry on hit."""
+        return self.get_any([key])[1]
+
+    def get_any(self, keys):
+        """Return (key, entry) for the first cached key, or (None, None).
+
+        Counts as a single hit or miss regardless of how many keys are tried.
+        """
+        with self._lock:
+            self._load_index()
+            for key in keys:
+                if key not in self._index:
+                    continue
+                path = self._entry_path(key)
+                try:
+                    entry = json.loads(path.read_text(encoding="utf-8"))
+                    now = time.time()
+                    os.utime(path, (now, now))
+                except Exception:
+                    # Corrupt or vanished entry -> drop it and keep looking
+                    self._total_bytes -= self._index.pop(key, 0)
+                    continue
+                self._index.move_to_end(key)
+                self.hits += 1
+                return key, entry
+            self.misses += 1
+            return None, None
+
+    def put(self, key: str, result, **metadata):
+        """Store a parsed result tuple plus optional metadata."""
+        entry = dict(metadata)
+        entry['result'] = list(result)
+        entry['created'] = datetime.now().isoformat(timespec="seconds")
+        data = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._load_index()
+            path = self._entry_path(key)
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_suffix(".tmp")
+                tmp_path.write_text(data, encoding="utf-8")
+                os.replace(tmp_path, path)
+            except Exception:
+                return False
+            size = len(data.encode("utf-8"))
+            self._total_bytes += size - self._index.pop(key, 0)
+            self._index[key] = size
+            self.writes += 1
+            self._evict()
+            return True
+
+    def _evict(self):
+        while self._index and self._total_bytes > self.max_bytes:
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                self._entry_path(key).unlink()
+            except OSError:
+                pass
+
+    def get_stats(self):
+        with self._lock:
+            self._load_index()
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._index),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+                'evictions': self.evictions,
+                'writes': self.writes,
+            }
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_analysis_cache():
+    """Return the shared cache instance, or None when disabled via ANALYZER_CACHE=0."""
+    global _CACHE
+    if not CACHE_ENABLED:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = AnalysisCache()
+        return _CACHE
@@ -44,6 +44,23 @@ def get_image_files(images_folder: str, reverse: bool = False):
     return sorted(files, key=_natural_sort_key, reverse=reverse)
 
 
+def file_identity(path: str):
+    """
+    Stable identity of an image file that survives renames and re-sorting.
+
+    Returns (device, inode, size, mtime_ns), or None if the file cannot be
+    read. Renaming keeps inode and mtime; editing the file changes the
+    identity. Filesystems without inode numbers (st_ino == 0, e.g. FAT)
+    fall back to the normalised path, which still survives re-sorting.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    inode = stat.st_ino or os.path.normcase(os.path.abspath(path))
+    return stat.st_dev, inode, stat.st_size, stat.st_mtime_ns
+
+
 def refresh_image_list(images_folder: str, old_list: list, current_index: int, reverse: bool = False):
     """
     Refresh the list of image files and maintain current position.
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""Append-only JSONL journal of GitHub Models API exchanges and replay backend.
+
+Every chat completion (successful or not) is appended as one JSON line to
+~/.kamerafallen-tools/api_journal.jsonl with the image hash, model, prompt
+version, latency breakdown, HTTP status, token usage and the raw message
+content. The file can be overridden with ANALYZER_JOURNAL_PATH and the
+journal disabled with ANALYZER_JOURNAL=0.
+
+With ANALYZER_API_BACKEND=replay, github_models_api answers requests from the
+journal instead of the network: no quota is spent, no rate limits apply and
+the recorded content goes through the current parser, so parser changes,
+benchmarks and UI sessions can be re-run over real responses.
+
+``python github_models_journal.py`` prints journal statistics; ``--reparse``
+runs the current parser over every recorded answer.
+"""
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+import os
+import sys
+import threading
+
+
+JOURNAL_PATH = Path(
+    os.environ.get("ANALYZER_JOURNAL_PATH")
+    or (Path.home() / ".kamerafallen-tools" / "api_journal.jsonl")
+)
+JOURNAL_ENABLED = os.environ.get("ANALYZER_JOURNAL", "1") != "0"
+API_BACKEND = os.environ.get("ANALYZER_API_BACKEND", "live").strip().lower()
+
+
+def is_replay():
+    """True when answers should come from the journal instead of the API."""
+    return API_BACKEND == "replay"
+
+
+class ApiJournal:
+    """Thread-safe JSONL writer plus an index of recorded answers for replay."""
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._index = None  # {(image_hash, model): [entry, ...]} of successful answers
+        self.appended = 0
+        self.replayed = 0
+
+    def append(self, entry):
+        entry = dict(entry)
+        entry.setdefault('timestamp', datetime.now().isoformat(timespec="milliseconds"))
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as journal_file:
+                    journal_file.write(line + "\n")
+            except Exception:
+                return False
+            self.appended += 1
+            if self._index is not None:
+                self._add_to_index(entry)
+            return True
+
+    def iter_entries(self):
+        """Yield all journal entries; unreadable lines are skipped."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as journal_file:
+                for line in journal_file:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            return
+
+    def _add_to_index(self, entry):
+        if entry.get('status') != 200 or entry.get('content') is None:
+            return
+        for image_hash in entry.get('image_hashes') or [entry.get('image_hash')]:
+            if image_hash and not entry.get('batch'):
+                self._index.setdefault((image_hash, entry.get('model')), []).append(entry)
+
+    def _load_index(self):
+        if self._index is None:
+            self._index = {}
+            for entry in self.iter_entries():
+                self._add_to_index(entry)
+
+    def lookup(self, image_hash, model_name, prompt_version=None, prompt_kind=None):
+        """Return the latest recorded answer for an image/model, preferring the same prompt."""
+        with self._lock:
+            self._load_index()
+            candidates = self._index.get((image_hash, model_name)) or []
+        if not candidates:
+            return None
+
+        def _score(entry):
+            return (
+                entry.get('prompt_version') == prompt_version,
+                entry.get('prompt_kind') == prompt_kind,
+                entry.get('timestamp', ''),
+            )
+
+        entry = max(candidates, key=_score)
+        self.replayed += 1
+        return entry
+
+
+_JOURNAL = None
+_JOURNAL_LOCK = threading.Lock()
+
+
+def get_journal():
+    """Return the shared journal (None when disabled and not replaying)."""
+    global _JOURNAL
+    if not JOURNAL_ENABLED and not is_replay():
+        return None
+    with _JOURNAL_LOCK:
+        if _JOURNAL is None:
+            _JOURNAL = ApiJournal()
+        return _JOURNAL
+
+
+def record(entry):
+    """Append one exchange to the journal; never raises."""
+    if not JOURNAL_ENABLED or is_replay():
+        return
+    journal = get_journal()
+    if journal is not None:
+        journal.append(entry)
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def summarize(entries):
+    """Counts per model/status and latency percentiles of journal entries."""
+    summary = {'entries': 0, 'by_status': {}, 'by_model': {}, 'request_ms': [], 'tokens': 0}
+    for entry in entries:
+        summary['entries'] += 1
+        status = str(entry.get('status'))
+        summary['by_status'][status] = summary['by_status'].get(status, 0) + 1
+        model = entry.get('model') or '?'
+        summary['by_model'][model] = summary['by_model'].get(model, 0) + 1
+        latency = (entry.get('latency_ms') or {}).get('request')
+        if latency is not None:
+            summary['request_ms'].append(latency)
+        summary['tokens'] += (entry.get('usage') or {}).get('total_tokens') or 0
+    request_ms = summary.pop('request_ms')
+    summary['request_ms_p50'] = _percentile(request_ms, 0.5)
+    summary['request_ms_p90'] = _percentile(request_ms, 0.9)
+    return summary
+
+
+def reparse(entries):
+    """Run the current parser over recorded answers; returns (parsed, placeholders, failures)."""
+    import github_models_api as gm_api
+
+    parsed = placeholders = failures = 0
+    for entry in entries:
+        if entry.get('status') != 200 or entry.get('content') is None or entry.get('batch'):
+            continue
+        try:
+            if entry.get('structured'):
+                result = gm_api.parse_structured_response(entry['content'])
+            else:
+                result = gm_api.parse_analysis_response(entry['content'])
+        except Exception:
+            failures += 1
+            continue
+        if result == gm_api.PLACEHOLDER_RESULT:
+            placeholders += 1
+        else:
+            parsed += 1
+    return parsed, placeholders, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='API-Journal auswerten')
+    parser.add_argument('--journal', help='Pfad zum Journal', default=None)
+    parser.add_argument('--reparse', action='store_true', help='Aufgezeichnete Antworten neu parsen')
+    args = parser.parse_args(argv)
+
+    journal = ApiJournal(args.journal or JOURNAL_PATH)
+    summary = summarize(journal.iter_entries())
+    print(f"Journal: {journal.path}")
+    print(f"Einträge: {summary['entries']}, Tokens gesamt: {summary['tokens']}")
+    print(f"Status: {summary['by_status']}")
+    print(f"Modelle: {summary['by_model']}")
+    print(f"Anfragedauer p50/p90: {summary['request_ms_p50']:.0f}/{summary['request_ms_p90']:.0f} ms")
+    if args.reparse:
+        parsed, placeholders, failures = reparse(journal.iter_entries())
+        print(f"Neu geparst: {parsed} ok, {placeholders} Platzhalter, {failures} Fehler")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""Local stand-in for the GitHub Models /chat/completions endpoint.
+
+Used to exercise github_models_api and AnalysisBuffer without quota:
+latency follows a configurable distribution, per-minute/per-day limits and
+the concurrent-request limit answer with 429 bodies shaped like the real
+service ("Rate limit of 1 per 60s exceeded for UserByModelByMinute ..."),
+and a fraction of requests can hang to trigger client timeouts. Answers are
+derived from the uploaded image bytes, so the same upload always gets the
+same animals, location, time and date (models with different upload
+profiles may disagree, which exercises the cascade).
+
+Start it and point the analyzer at it:
+
+    python github_models_mock_server.py --port 8765 --latency lognormal:1500,0.4 --rpm 15
+    ANALYZER_API_BASE=http://127.0.0.1:8765 python github_models_analyzer.py
+    # or: python github_models_analyzer.py --api-base http://127.0.0.1:8765
+
+Requests with "stream": true are answered as server-sent events: the first
+chunk arrives after 30 % of the drawn latency, the rest of the answer
+trickles in over the remaining time.
+
+GET /stats returns counters (requests, 429s per type, peak concurrency,
+latency percentiles) as JSON.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+
+
+SPECIES = ["Bartgeier (Luisa)", "Bartgeier (unbestimmt)", "2 Rabenvögel", "1 Fuchs", "3 Gämsen", "Keine erkannt"]
+# The same animals as schema entries for response_format requests
+STRUCTURED_SPECIES = [
+    [{'species': 'Bartgeier', 'count': 1, 'individual': 'Luisa'}],
+    [{'species': 'Bartgeier', 'count': 1, 'individual': 'unbestimmt'}],
+    [{'species': 'Kolkrabe', 'count': 2, 'individual': ''}],
+    [{'species': 'Fuchs', 'count': 1, 'individual': ''}],
+    [{'species': 'Gams', 'count': 3, 'individual': ''}],
+    [],
+]
+LOCATIONS = ["FP1", "FP2", "FP3", "Nische"]
+
+
+def parse_latency(spec):
+    """Return a sampler for 'fixed:ms', 'uniform:min,max', 'normal:mean,sd' or 'lognormal:median,sigma'."""
+    kind, _, params = (spec or "fixed:0").partition(':')
+    values = [float(value) for value in params.split(',') if value.strip()] or [0.0]
+    kind = kind.strip().lower()
+    if kind == 'fixed':
+        return lambda rng: values[0] / 1000
+    if kind == 'uniform':
+        low, high = values[0], values[1] if len(values) > 1 else values[0]
+        return lambda rng: rng.uniform(low, high) / 1000
+    if kind == 'normal':
+        mean, sd = values[0], values[1] if len(values) > 1 else values[0] * 0.2
+        return lambda rng: max(0.0, rng.gauss(mean, sd)) / 1000
+    if kind == 'lognormal':
+        median, sigma = values[0], values[1] if len(values) > 1 else 0.5
+        return lambda rng: rng.lognormvariate(0, sigma) * median / 1000
+    raise ValueError(f"Unbekannte Latenzverteilung: {spec}")
+
+
+class MockState:
+    """Limits, counters and the seeded random source shared by all handler threads."""
+
+    def __init__(self, args):
+        self.args = args
+        self.latency = parse_latency(args.latency)
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.minute_windows = {}  # {(token, model): [timestamps]}
+        self.day_counts = {}  # {(token, model): count}
+        self.prefixes = set()  # (model, prompt prefix) pairs seen before, for cached_tokens
+        self.stats = {
+            'requests': 0, 'ok': 0, 'rejected_minute': 0, 'rejected_day': 0, 'rejected_concurrent': 0,
+            'errors': 0, 'hangs': 0, 'streamed': 0, 'peak_in_flight': 0, 'latencies_ms': [],
+        }
+
+    def draw(self):
+        """Return (latency_seconds, hang, error) for the next request."""
+        with self.lock:
+            return (
+                self.latency(self.rng),
+                self.rng.random() < self.args.timeout_rate,
+                self.rng.random() < self.args.error_rate,
+            )
+
+    def admit(self, token, model):
+        """Apply the limits. Returns None or (limit_type, wait_seconds)."""
+        now = time.monotonic()
+        key = (token, model)
+        with self.lock:
+            self.stats['requests'] += 1
+            if self.args.max_concurrent and self.in_flight >= self.args.max_concurrent:
+                self.stats['rejected_concurrent'] += 1
+                return 'concurrent', 1
+            if self.args.rpd and self.day_counts.get(key, 0) >= self.args.rpd:
+                self.stats['rejected_day'] += 1
+                return 'day', 86400
+            window = [stamp for stamp in self.minute_windows.get(key, []) if now - stamp < 60]
+            self.minute_windows[key] = window
+            if self.args.rpm and len(window) >= self.args.rpm:
+                self.stats['rejected_minute'] += 1
+                return 'minute', max(1, int(60 - (now - window[0])) + 1)
+            window.append(now)
+            self.day_counts[key] = self.day_counts.get(key, 0) + 1
+            self.in_flight += 1
+            self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.in_flight)
+            return None
+
+    def release(self):
+        with self.lock:
+            self.in_flight = max(0, self.in_flight - 1)
+
+    def remaining(self, token, model):
+        with self.lock:
+            used_minute = len(self.minute_windows.get((token, model), []))
+            used_day = self.day_counts.get((token, model), 0)
+        return max(0, self.args.rpm - used_minute), max(0, self.args.rpd - used_day)
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+            latencies = sorted(stats.pop('latencies_ms'))
+            stats['in_flight'] = self.in_flight
+        for label, fraction in (('p50_ms', 0.5), ('p90_ms', 0.9), ('p99_ms', 0.99)):
+            stats[label] = latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] if latencies else 0
+        return stats
+
+
+def _rejection_body(limit_type, limit, wait, model):
+    if limit_type == 'concurrent':
+        message = (f"Rate limit of {limit} concurrent requests exceeded for UserConcurrentRequests. "
+                   f"Please wait {wait} seconds before retrying.")
+    elif limit_type == 'day':
+        message = (f"Rate limit of {limit} per 86400s exceeded for UserByModelByDay. "
+                   f"Please wait {wait} seconds before retrying.")
+    else:
+        message = (f"Rate limit of {limit} per 60s exceeded for UserByModelByMinute. "
+                   f"Please wait {wait} seconds before retrying.")
+    return {'error': {'code': 'RateLimitReached', 'message': message, 'details': f"model={model}"}}
+
+
+def _fake_answer(image_bytes, animals_only):
+    digest = hashlib.sha256(image_bytes).digest()
+    lines = [f"TIERE: {SPECIES[digest[0] % len(SPECIES)]}"]
+    if not animals_only:
+        lines.extend([
+            f"STANDORT: NLP {LOCATIONS[digest[1] % len(LOCATIONS)]}",
+            f"UHRZEIT: {digest[2] % 24:02d}:{digest[3] % 60:02d}:{digest[4] % 60:02d}",
+            f"DATUM: {digest[5] % 28 + 1:02d}.{digest[6] % 12 + 1:02d}.2025",
+        ])
+    return "\n".join(lines)
+
+
+def _fake_structured_answer(image_bytes, animals_only):
+    digest = hashlib.sha256(image_bytes).digest()
+    answer = {'animals': STRUCTURED_SPECIES[digest[0] % len(STRUCTURED_SPECIES)]}
+    if not animals_only:
+        answer['location'] = LOCATIONS[digest[1] % len(LOCATIONS)]
+        answer['time'] = f"{digest[2] % 24:02d}:{digest[3] % 60:02d}:{digest[4] % 60:02d}"
+        answer['date'] = f"2025-{digest[6] % 12 + 1:02d}-{digest[5] % 28 + 1:02d}"
+    return json.dumps(answer, ensure_ascii=False)
+
+
+def build_answer(payload):
+    """Answer text for a chat payload: one block per image, BILD n headers for batches."""
+    images = []
+    prompt = ""
+    for message in payload.get('messages') or []:
+        content = message.get('content')
+        if isinstance(content, str):
+            prompt += content
+            continue
+        for part in content or []:
+            if part.get('type') == 'text':
+                prompt += part.get('text', '')
+            elif part.get('type') == 'image_url':
+                url = (part.get('image_url') or {}).get('url', '')
+                try:
+                    images.append(base64.b64decode(url.split(',', 1)[1]))
+                except Exception:
+                    images.append(url.encode("utf-8"))
+    response_format = payload.get('response_format') or {}
+    if response_format.get('type') == 'json_schema':
+        properties = ((response_format.get('json_schema') or {}).get('schema') or {}).get('properties') or {}
+        if 'images' in properties:
+            item = ((properties['images'].get('items') or {}).get('properties')) or {}
+            entries = [
+                dict(json.loads(_fake_structured_answer(image, 'location' not in item)), image=number)
+                for number, image in enumerate(images, start=1)
+            ]
+            return json.dumps({'images': entries}, ensure_ascii=False)
+        animals_only = 'location' not in properties
+        return _fake_structured_answer(images[0] if images else b"", animals_only)
+    animals_only = 'STANDORT' not in prompt
+    if len(images) <= 1:
+        return _fake_answer(images[0] if images else b"", animals_only)
+    return "\n\n".join(
+        f"BILD {number}:\n{_fake_answer(image, animals_only)}" for number, image in enumerate(images, start=1)
+    )
+
+
+def prompt_usage(payload, state):
+    """(prompt_tokens, cached_tokens) for a payload, roughly like the real service.
+
+    Text counts ~4 characters per token, each image 85 tokens at low detail
+    and 765 otherwise (four 512px tiles), plus 85 base tokens. Like provider-side prompt caching, the text before the first image
+    is reported as cached when the same prefix was sent before and is at least
+    1024 tokens long (rounded down to 128-token steps).
+    """
+    prefix, text_chars, images, image_tokens = "", 0, 0, 0
+    for message in payload.get('messages') or []:
+        content = message.get('content')
+        parts = [{'type': 'text', 'text': content}] if isinstance(content, str) else content or []
+        for part in parts:
+            if part.get('type') == 'text':
+                text_chars += len(part.get('text', ''))
+                if not images:
+                    prefix += part.get('text', '')
+            elif part.get('type') == 'image_url':
+                images += 1
+                image_tokens += 85 if (part.get('image_url') or {}).get('detail') == 'low' else 765
+    prefix_tokens = len(prefix) // 4
+    key = (payload.get('model'), prefix)
+    with state.lock:
+        seen = key in state.prefixes
+        state.prefixes.add(key)
+    cached = prefix_tokens // 128 * 128 if seen and prefix_tokens >= 1024 else 0
+    return 85 + text_chars // 4 + image_tokens, cached
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None  # MockState, set by serve()
+
+    def log_message(self, fmt, *args):
+        if self.state.args.verbose:
+            super().log_message(fmt, *args)
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, model, content, usage, latency, headers, include_usage):
+        """Answer as server-sent events in chunked transfer encoding."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        for name, value in headers.items():
+            self.send_header(name, str(value))
+        self.end_headers()
+
+        def _event(body):
+            data = f"data: {body}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        pieces = [content[start:start + 12] for start in range(0, len(content), 12)] or [""]
+        for number, piece in enumerate(pieces):
+            chunk = {'id': 'mock-stream', 'object': 'chat.completion.chunk', 'model': model,
+                     'choices': [{'index': 0, 'delta': {'content': piece},
+                                  'finish_reason': 'stop' if number == len(pieces) - 1 else None}]}
+            _event(json.dumps(chunk, ensure_ascii=False))
+            time.sleep(latency * 0.7 / len(pieces))
+        if include_usage:
+            _event(json.dumps({'id': 'mock-stream', 'object': 'chat.completion.chunk', 'model': model,
+                               'choices': [], 'usage': usage}))
+        _event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            self._send_json(200, self.state.snapshot())
+        else:
+            self._send_json(404, {'error': {'code': 'NotFound', 'message': self.path}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length)
+        if not re.search(r'/chat/completions/?$', self.path.split('?', 1)[0]):
+            self._send_json(404, {'error': {'code': 'NotFound', 'message': self.path}})
+            return
+        try:
+            payload = json.loads(raw or b"{}")
+        except ValueError:
+            self._send_json(400, {'error': {'code': 'BadRequest', 'message': 'invalid JSON'}})
+            return
+
+        args = self.state.args
+        token = self.headers.get('Authorization', '')
+        model = payload.get('model', 'gpt-4o')
+        rejection = self.state.admit(token, model)
+        if rejection is not None:
+            limit_type, wait = rejection
+            limit = {'concurrent': args.max_concurrent, 'day': args.rpd, 'minute': args.rpm}[limit_type]
+            self._send_json(429, _rejection_body(limit_type, limit, wait, model), {"Retry-After": wait})
+            return
+
+        started = time.monotonic()
+        try:
+            latency, hang, error = self.state.draw()
+            if hang:
+                with self.state.lock:
+                    self.state.stats['hangs'] += 1
+                time.sleep(args.hang_seconds)
+            streamed = bool(payload.get('stream'))
+            time.sleep(latency * 0.3 if streamed else latency)
+            if error:
+                with self.state.lock:
+                    self.state.stats['errors'] += 1
+                self._send_json(500, {'error': {'code': 'InternalServerError', 'message': 'mock failure'}})
+                return
+            content = build_answer(payload)
+            remaining_minute, remaining_day = self.state.remaining(token, model)
+            headers = {
+                'x-ratelimit-limit-requests': args.rpm,
+                'x-ratelimit-remaining-requests': remaining_minute,
+                'x-ratelimit-renewalperiod-requests': 60,
+            }
+            prompt_tokens, cached_tokens = prompt_usage(payload, self.state)
+            completion_tokens = len(content) // 4
+            usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                     'total_tokens': prompt_tokens + completion_tokens,
+                     'prompt_tokens_details': {'cached_tokens': cached_tokens}}
+            if streamed:
+                include_usage = bool((payload.get('stream_options') or {}).get('include_usage'))
+                self._send_stream(model, content, usage, latency, headers, include_usage)
+            else:
+                self._send_json(200, {
+                    'id': f"mock-{self.state.stats['requests']}",
+                    'object': 'chat.completion',
+                    'model': model,
+                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                 'message': {'role': 'assistant', 'content': content}}],
+                    'usage': usage,
+                }, headers)
+            with self.state.lock:
+                self.state.stats['ok'] += 1
+                self.state.stats['streamed'] += int(streamed)
+                self.state.stats['latencies_ms'].append(round((time.monotonic() - started) * 1000, 1))
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client gave up (timeout) - nothing to answer
+        finally:
+            self.state.release()
+
+
+def serve(args):
+    MockHandler.state = MockState(args)
+    server = ThreadingHTTPServer((args.host, args.port), MockHandler)
+    server.daemon_threads = True
+    print(f"Mock GitHub Models läuft auf http://{args.host}:{server.server_address[1]} "
+          f"(Latenz {args.latency}, {args.rpm}/Min., {args.rpd}/Tag, {args.max_concurrent} gleichzeitig)")
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Lokaler Mock-Server für GitHub Models /chat/completions')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default='lognormal:1500,0.4',
+                        help="fixed:ms | uniform:min,max | normal:mean,sd | lognormal:median,sigma")
+    parser.add_argument('--rpm', type=int, default=15, help='Anfragen pro Minute und Modell (0 = unbegrenzt)')
+    parser.add_argument('--rpd', type=int, default=150, help='Anfragen pro Tag und Modell (0 = unbegrenzt)')
+    parser.add_argument('--max-concurrent', type=int, default=2, help='Gleichzeitige Anfragen (0 = unbegrenzt)')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='Anteil hängender Anfragen (0-1)')
+    parser.add_argument('--hang-seconds', type=float, default=120.0, help='Dauer einer hängenden Anfrage')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Anteil von 500-Antworten (0-1)')
+    parser.add_argument('--seed', type=int, default=1, help='Zufallsstartwert für reproduzierbare Läufe')
+    parser.add_argument('--verbose', action='store_true', help='Jede Anfrage protokollieren')
+    args = parser.parse_args(argv)
+
+    server = serve(args)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
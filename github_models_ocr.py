@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""Local OCR of the burned-in camera footer (STANDORT / UHRZEIT / DATUM).
+
+The trail cameras print location, time and date into a strip at the bottom
+of every image. Reading that strip with Tesseract on the CPU is much cheaper
+than asking the remote model, so when the OCR result is confident the API is
+only asked for the animals (see github_models_api.analyze_with_github_models).
+
+Crop settings (strip height, binarisation threshold, inversion) differ per
+camera; the working setting is cached per station in
+~/.kamerafallen-tools/ocr_calibration.json and can be searched with
+``--calibrate``. ``--benchmark`` compares OCR against the model answers recorded
+in the API journal.
+
+pytesseract and the tesseract binary are optional; without them
+extract_footer() returns None and everything falls back to the model.
+"""
+from pathlib import Path
+import argparse
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import github_models_api as gm_api
+import github_models_cache as gm_cache
+import github_models_journal as gm_journal
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+try:
+    import pytesseract  # type: ignore[import]
+except ImportError:  # OCR fast path disabled
+    pytesseract = None
+
+
+CALIBRATION_PATH = gm_api.LOG_DIR / "ocr_calibration.json"
+OCR_ENABLED = os.environ.get("ANALYZER_OCR", "1") != "0"
+# Mean Tesseract word confidence (0-100) required before the model is skipped for metadata
+MIN_CONFIDENCE = gm_api._env_float("ANALYZER_OCR_MIN_CONFIDENCE", 70.0)
+
+DEFAULT_SETTING = {'strip': 0.07, 'threshold': 150, 'invert': False}
+# Search grid for calibrate()
+STRIP_FRACTIONS = (0.04, 0.05, 0.06, 0.07, 0.08, 0.10, 0.12)
+THRESHOLDS = (None, 110, 150, 190)
+TESSERACT_CONFIG = "--psm 7"
+
+_TIME_RE = re.compile(r'(\d{1,2})\s*[:.]\s*(\d{2})\s*[:.]\s*(\d{2})')
+_DATE_RE = re.compile(r'(\d{1,2})\s*[./-]\s*(\d{1,2})\s*[./-]\s*(\d{4})(?!\d)')
+_SHORT_DATE_RE = re.compile(r'(\d{1,2})\s*[./-]\s*(\d{1,2})\s*[./-]\s*(\d{2})(?!\d)')
+_LOCATION_RE = re.compile(r'FP\s*[123]|NISCHE', re.IGNORECASE)
+
+_CALIBRATION = None
+_CALIBRATION_LOCK = threading.Lock()
+_AVAILABLE = None  # is_available() result
+
+
+def is_available():
+    """True if pytesseract, Pillow and the tesseract binary can be used (probed once per process)."""
+    global _AVAILABLE
+    if _AVAILABLE is None:
+        if not OCR_ENABLED or pytesseract is None or Image is None:
+            _AVAILABLE = False
+        else:
+            try:
+                pytesseract.get_tesseract_version()  # Starts a tesseract process
+                _AVAILABLE = True
+            except Exception:
+                _AVAILABLE = False
+    return _AVAILABLE
+
+
+def load_calibration():
+    """Return {station: setting} from the calibration file (cached)."""
+    global _CALIBRATION
+    with _CALIBRATION_LOCK:
+        if _CALIBRATION is None:
+            try:
+                _CALIBRATION = json.loads(CALIBRATION_PATH.read_text(encoding="utf-8"))
+            except Exception:
+                _CALIBRATION = {}
+        return dict(_CALIBRATION)
+
+
+def save_calibration(station, setting):
+    """Persist the crop setting that works for a station.
+
+    Settings another process saved in the meantime are merged in, and the
+    file is replaced atomically.
+    """
+    load_calibration()
+    with _CALIBRATION_LOCK:
+        try:
+            _CALIBRATION.update(json.loads(CALIBRATION_PATH.read_text(encoding="utf-8")))
+        except Exception:
+            pass
+        _CALIBRATION[station] = {key: setting[key] for key in DEFAULT_SETTING}
+        try:
+            CALIBRATION_PATH.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = CALIBRATION_PATH.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(_CALIBRATION, indent=2), encoding="utf-8")
+            os.replace(tmp_path, CALIBRATION_PATH)
+        except Exception as exc:
+            gm_api._log_debug(f"Could not save OCR calibration: {exc}")
+
+
+def remember_calibration(footer, calibration=None):
+    """Save the setting of a confident read for a station that has no calibration yet."""
+    if footer is None or not footer['confident']:
+        return
+    if footer['location'] not in (calibration if calibration is not None else load_calibration()):
+        save_calibration(footer['location'], footer['setting'])
+
+
+def _crop_footer(img, setting):
+    width, height = img.size
+    strip_height = max(8, int(height * setting['strip']))
+    footer = img.crop((0, height - strip_height, width, height)).convert("L")
+    # Tesseract reads small glyphs much better at ~30px cap height
+    if strip_height < 60:
+        scale = 60 / strip_height
+        footer = footer.resize((int(width * scale), 60), Image.BICUBIC)
+    if setting.get('invert'):
+        footer = ImageOps.invert(footer)
+    if setting.get('threshold') is not None:
+        threshold = setting['threshold']
+        footer = footer.point(lambda value: 255 if value > threshold else 0)
+    return footer
+
+
+def _ocr_strip(footer):
+    """Return (text, mean word confidence) for a prepared footer strip."""
+    data = pytesseract.image_to_data(footer, config=TESSERACT_CONFIG, output_type=pytesseract.Output.DICT)
+    words = []
+    confidences = []
+    for text, conf in zip(data.get('text', []), data.get('conf', [])):
+        text = str(text).strip()
+        try:
+            conf = float(conf)
+        except (TypeError, ValueError):
+            conf = -1
+        if text and conf >= 0:
+            words.append(text)
+            confidences.append(conf)
+    mean_conf = sum(confidences) / len(confidences) if confidences else 0.0
+    return " ".join(words), mean_conf
+
+
+def parse_footer_text(text):
+    """Extract (location, time, date) from OCR text via the API normalisers."""
+    text = text or ''
+    location_match = _LOCATION_RE.search(text)
+    date_match = _DATE_RE.search(text) or _SHORT_DATE_RE.search(text)
+    if date_match:
+        # Dates use dots too; blank them out so they are not read as a time
+        text = text[:date_match.start()] + ' ' * len(date_match.group(0)) + text[date_match.end():]
+    time_match = _TIME_RE.search(text)
+    location = gm_api._normalize_location(location_match.group(0).replace(' ', '')) if location_match else ''
+    time_str = gm_api._normalize_time(":".join(time_match.groups())) if time_match else ''
+    date_str = gm_api._normalize_date(".".join(date_match.groups())) if date_match else ''
+    return location, time_str, date_str
+
+
+def _read_with_setting(img, setting):
+    text, confidence = _ocr_strip(_crop_footer(img, setting))
+    location, time_str, date_str = parse_footer_text(text)
+    complete = not gm_api.validate_result(("Keine erkannt", location, time_str, date_str), [])
+    return {
+        'location': location,
+        'time': time_str,
+        'date': date_str,
+        'text': text,
+        'confidence': confidence,
+        'confident': complete and confidence >= MIN_CONFIDENCE,
+        'setting': dict(setting),
+    }
+
+
+def extract_footer(image, station_hint=None, calibration=None, remember=True):
+    """OCR the footer of an image (path, bytes or PIL image).
+
+    Tries the calibrated setting of ``station_hint`` (or of every known
+    station) before the default. Returns a dict with location, time, date,
+    confidence and confident, or None when OCR is unavailable.
+
+    ``calibration`` replaces the saved settings (worker processes get the
+    parent's copy); with ``remember=False`` a new station's setting is not
+    saved, the caller passes the result to remember_calibration() instead.
+    """
+    if not is_available():
+        return None
+    try:
+        if isinstance(image, (bytes, bytearray)):
+            img = Image.open(io.BytesIO(image))
+        elif isinstance(image, (str, Path)):
+            img = Image.open(image)
+        else:
+            img = image
+        img.load()
+    except Exception as exc:
+        gm_api._log_debug(f"OCR could not open image: {exc}")
+        return None
+
+    if calibration is None:
+        calibration = load_calibration()
+    settings = []
+    if station_hint in calibration:
+        settings.append(calibration[station_hint])
+    settings.extend(setting for station, setting in calibration.items() if station != station_hint)
+    settings.append(DEFAULT_SETTING)
+
+    best = None
+    tried = []
+    started = time.time()
+    for setting in settings:
+        if setting in tried:
+            continue
+        tried.append(setting)
+        try:
+            footer = _read_with_setting(img, setting)
+        except Exception as exc:
+            gm_api._log_debug(f"OCR failed with setting {setting}: {exc}")
+            continue
+        if best is None or (footer['confident'], footer['confidence']) > (best['confident'], best['confidence']):
+            best = footer
+        if footer['confident']:
+            break
+    if best is None:
+        return None
+    best['seconds'] = time.time() - started
+    if remember:
+        # First confident read for a station -> remember what worked
+        remember_calibration(best, calibration)
+    return best
+
+
+def calibrate(image_paths, station=None):
+    """Search the crop grid on sample images and store the best setting.
+
+    The station is taken from the OCR result unless given. Returns
+    (station, setting, confident_rate).
+    """
+    if not is_available():
+        raise RuntimeError("pytesseract/tesseract nicht verfügbar")
+    images = []
+    for path in image_paths:
+        try:
+            img = Image.open(path)
+            img.load()
+            images.append(img)
+        except Exception as exc:
+            print(f"Überspringe {path}: {exc}")
+    if not images:
+        raise RuntimeError("Keine lesbaren Bilder für die Kalibrierung")
+
+    best = None
+    for strip in STRIP_FRACTIONS:
+        for threshold in THRESHOLDS:
+            for invert in (False, True):
+                setting = {'strip': strip, 'threshold': threshold, 'invert': invert}
+                reads = [_read_with_setting(img, setting) for img in images]
+                confident = [read for read in reads if read['confident']]
+                score = (len(confident), sum(read['confidence'] for read in reads) / len(reads))
+                if best is None or score > best[0]:
+                    stations = [read['location'] for read in confident]
+                    best = (score, setting, max(set(stations), key=stations.count) if stations else None)
+    score, setting, detected_station = best
+    station = station or detected_station
+    if station:
+        save_calibration(station, setting)
+    return station, setting, score[0] / len(images)
+
+
+def journal_footer_references(journal=None):
+    """{image_hash: (location, time, date)} read by the model, from the raw answers in the API journal.
+
+    Answers to the animals-only prompt are skipped: their footer fields were
+    filled in by this OCR, not read by the model. The strong model's newest
+    answer wins.
+    """
+    journal = journal or gm_journal.ApiJournal()
+    ranked = {}
+    for entry in journal.iter_entries():
+        if (entry.get('status') != 200 or not entry.get('content') or entry.get('batch')
+                or entry.get('prompt_kind') == 'animals' or not entry.get('image_hash')):
+            continue
+        try:
+            if entry.get('structured'):
+                result = gm_api.parse_structured_response(entry['content'])
+            else:
+                result = gm_api.parse_analysis_response(entry['content'])
+        except Exception:
+            continue
+        if result[1] not in gm_api.VALID_LOCATIONS:
+            continue
+        rank = (entry.get('model') == gm_api.STRONG_MODEL, entry.get('timestamp', ''))
+        current = ranked.get(entry['image_hash'])
+        if current is None or rank > current[0]:
+            ranked[entry['image_hash']] = (rank, tuple(result[1:]))
+    return {image_hash: fields for image_hash, (_, fields) in ranked.items()}
+
+
+def benchmark(image_paths, journal=None):
+    """Compare OCR against the footer fields the model read (see journal_footer_references)."""
+    fields = ('location', 'time', 'date')
+    references = journal_footer_references(journal)
+    totals = {'images': 0, 'with_reference': 0, 'confident': 0, 'confident_correct': 0, 'seconds': 0.0}
+    correct = {field: 0 for field in fields}
+    for path in image_paths:
+        try:
+            image_data = Path(path).read_bytes()
+        except OSError:
+            continue
+        totals['images'] += 1
+        reference = references.get(gm_cache.hash_image_bytes(image_data))
+        footer = extract_footer(image_data)
+        if footer is None:
+            continue
+        totals['seconds'] += footer['seconds']
+        totals['confident'] += int(footer['confident'])
+        if reference is None:
+            continue
+        totals['with_reference'] += 1
+        expected = dict(zip(fields, reference))
+        matches = {field: footer[field] == expected[field] for field in fields}
+        for field in fields:
+            correct[field] += int(matches[field])
+        if footer['confident'] and all(matches.values()):
+            totals['confident_correct'] += 1
+
+    compared = totals['with_reference'] or 1
+    return {
+        **totals,
+        'accuracy': {field: correct[field] / compared for field in fields},
+        'images_per_second': totals['images'] / totals['seconds'] if totals['seconds'] else 0.0,
+    }
+
+
+def _collect_images(folder):
+    return sorted(
+        path for path in Path(folder).iterdir()
+        if path.suffix.lower() in ('.jpg', '.jpeg', '.png')
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fußzeilen-OCR (Standort/Uhrzeit/Datum) kalibrieren und testen')
+    parser.add_argument('images', help='Bilderordner')
+    parser.add_argument('--calibrate', action='store_true', help='Zuschnitt für die Station suchen und speichern')
+    parser.add_argument('--station', help='Station (FP1/FP2/FP3/Nische) für --calibrate')
+    parser.add_argument('--benchmark', action='store_true', help='OCR mit den Modellantworten im API-Journal vergleichen')
+    parser.add_argument('--limit', type=int, default=0, help='Nur die ersten N Bilder verwenden')
+    args = parser.parse_args(argv)
+
+    if not is_available():
+        print("pytesseract bzw. tesseract ist nicht installiert.")
+        return 1
+    paths = _collect_images(args.images)
+    if args.limit:
+        paths = paths[:args.limit]
+
+    if args.calibrate:
+        station, setting, rate = calibrate(paths, args.station)
+        print(f"Station {station or '?'}: {setting} (sicher erkannt: {rate:.0%})")
+    if args.benchmark or not args.calibrate:
+        report = benchmark(paths)
+        print(f"Bilder: {report['images']}, mit Referenz: {report['with_reference']}")
+        print(f"Sicher erkannt: {report['confident']}, davon korrekt: {report['confident_correct']}")
+        for field, accuracy in report['accuracy'].items():
+            print(f"  {field}: {accuracy:.1%}")
+        print(f"Durchsatz: {report['images_per_second']:.1f} Bilder/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""Preparation stage: read, hash, OCR and encode upcoming images in worker processes.
+
+AnalysisBuffer submits the images it is about to analyze; a
+ProcessPoolExecutor reads each file, hashes it, runs the footer OCR and
+re-encodes/base64-encodes it with the upload profile of the first model of
+the current policy. The network threads then only splice the ready base64
+bytes into a cached request body (github_models_api.build_request_body) and
+wait on the socket, instead of decoding JPEGs while holding the GIL.
+
+claim() returns the prepared image if it is finished or being worked on;
+jobs that have not started yet are cancelled so the caller encodes inline
+rather than queueing behind other images. ANALYZER_PREPARE_WORKERS=0
+disables the stage (everything is encoded in the network thread as before).
+"""
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import base64
+import os
+import threading
+import time
+
+import github_models_api as gm_api
+import github_models_cache as gm_cache
+
+
+PREPARE_WORKERS = gm_api._env_int("ANALYZER_PREPARE_WORKERS", max(1, min(2, (os.cpu_count() or 2) - 1)))
+MAX_PREPARED = 24  # Prepared images kept in memory (base64 of a downscaled JPEG each)
+CLAIM_TIMEOUT = 15.0
+
+
+class PreparedImage:
+    """Result of the preparation stage for one file."""
+
+    def __init__(self, image_path, file_key, image_hash, uploads, footer, prepare_ms):
+        self.image_path = image_path
+        self.file_key = file_key  # (size, mtime_ns) the preparation was based on
+        self.image_hash = image_hash
+        self.uploads = uploads  # {model_name: (base64 bytes, upload stats)}
+        self.footer = footer  # github_models_ocr.extract_footer() result or None
+        self.prepare_ms = prepare_ms
+
+
+def _file_key(image_path):
+    stat = os.stat(image_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _prepare_worker(image_path, profiles, calibration):
+    """Runs in a worker process; returns a PreparedImage.
+
+    ``calibration`` is the parent's OCR calibration (None skips the OCR). A
+    setting found for a new station comes back in the footer and is saved by
+    the parent, so workers never write the calibration file.
+    """
+    started = time.perf_counter()
+    file_key = _file_key(image_path)
+    with open(image_path, "rb") as image_file:
+        image_data = image_file.read()
+    image_hash = gm_cache.hash_image_bytes(image_data)
+    uploads = {}
+    for model_name, profile in profiles.items():
+        encoded, stats = gm_api._encode_image_for_upload(image_data, profile)
+        uploads[model_name] = (base64.b64encode(encoded), stats)
+    footer = None
+    if calibration is not None:
+        try:
+            import github_models_ocr as gm_ocr
+            footer = gm_ocr.extract_footer(image_data, calibration=calibration, remember=False)
+        except Exception:
+            footer = None
+    return PreparedImage(image_path, file_key, image_hash, uploads, footer,
+                         (time.perf_counter() - started) * 1000)
+
+
+def _ocr_calibration():
+    """The parent's OCR calibration for a worker job, or None if OCR is unavailable."""
+    try:
+        import github_models_ocr as gm_ocr
+    except Exception:
+        return None
+    return gm_ocr.load_calibration() if gm_ocr.is_available() else None
+
+
+class PrepareStage:
+    """Process pool plus a bounded {path: Future} table of prepared images."""
+
+    def __init__(self, workers=PREPARE_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._jobs = OrderedDict()  # {image_path: Future}
+        self._lock = threading.Lock()
+        self.stats = {'submitted': 0, 'used': 0, 'stale': 0, 'cancelled': 0, 'failed': 0}
+
+    def _ensure_executor(self):
+        if self._executor is None and self.workers > 0:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def submit(self, image_path, models=None):
+        """Queue an image for preparation (no-op if already queued or the stage is off)."""
+        image_path = os.fspath(image_path)
+        with self._lock:
+            if image_path in self._jobs:
+                self._jobs.move_to_end(image_path)
+                return
+            executor = self._ensure_executor()
+            if executor is None:
+                return
+            if models is None:
+                models = [gm_api.hedge_models()[0][1]]
+            profiles = {model_name: gm_api.get_upload_profile(model_name) for model_name in models}
+            try:
+                self._jobs[image_path] = executor.submit(_prepare_worker, image_path, profiles, _ocr_calibration())
+            except Exception as exc:
+                gm_api._log_debug(f"Preparation stage unavailable, encoding inline from now on: {exc}")
+                self.workers = 0
+                return
+            self.stats['submitted'] += 1
+            while len(self._jobs) > MAX_PREPARED:
+                _, old = self._jobs.popitem(last=False)
+                old.cancel()
+
+    def claim(self, image_path, timeout=CLAIM_TIMEOUT):
+        """Return the PreparedImage for a path, or None if it has to be encoded inline."""
+        image_path = os.fspath(image_path)
+        with self._lock:
+            future = self._jobs.get(image_path)
+        if future is None:
+            return None
+        if not future.running() and not future.done() and future.cancel():
+            # Still queued behind other images - encoding inline is faster than waiting
+            self._forget(image_path, 'cancelled')
+            return None
+        try:
+            prepared = future.result(timeout=timeout)
+        except Exception as exc:
+            gm_api._log_debug(f"Preparation failed for {os.path.basename(image_path)}: {exc}")
+            self._forget(image_path, 'failed')
+            return None
+        try:
+            current_key = _file_key(image_path)
+        except OSError:
+            current_key = None
+        if current_key != prepared.file_key:
+            # Renamed over or modified since it was prepared
+            self._forget(image_path, 'stale')
+            return None
+        with self._lock:
+            self.stats['used'] += 1
+        if prepared.footer is not None:
+            try:
+                import github_models_ocr as gm_ocr
+                gm_ocr.remember_calibration(prepared.footer)
+            except Exception as exc:
+                gm_api._log_debug(f"Could not save OCR calibration: {exc}")
+        return prepared
+
+    def _forget(self, image_path, reason):
+        with self._lock:
+            self._jobs.pop(image_path, None)
+            self.stats[reason] += 1
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, queued=sum(1 for job in self._jobs.values() if not job.done()))
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            for job in self._jobs.values():
+                job.cancel()
+            self._jobs.clear()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_STAGE = None
+_STAGE_LOCK = threading.Lock()
+
+
+def get_stage():
+    global _STAGE
+    with _STAGE_LOCK:
+        if _STAGE is None:
+            _STAGE = PrepareStage()
+        return _STAGE
+
+
+def submit(image_path, models=None):
+    get_stage().submit(image_path, models)
+
+
+def claim(image_path, timeout=CLAIM_TIMEOUT):
+    """PreparedImage for image_path if the stage has (or is making) one, else None."""
+    if _STAGE is None:
+        return None
+    return _STAGE.claim(image_path, timeout)
+
+
+def shutdown():
+    global _STAGE
+    with _STAGE_LOCK:
+        stage, _STAGE = _STAGE, None
+    if stage is not None:
+        stage.shutdown()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""Compare prompt variants and message layouts on a folder of images.
+
+Every image is sent once per combination of prompt variant ("full" or
+"compact") and layout ("system": static instructions as a system message in
+front of the image, "user": prompt text and image in one user message),
+straight through _try_api_call so neither the result cache nor the cascade
+interferes. Per combination the report shows the average prompt tokens, the
+average cached prompt tokens (``usage.prompt_tokens_details.cached_tokens``),
+the parse success rate (answer parsed and validate_result() without
+complaints) and the average request latency.
+
+Providers only cache prompt prefixes of at least 1024 tokens, so cached
+tokens stay at 0 while the static instructions are shorter than that.
+
+With ``--detail`` the image detail policy (ANALYZER_IMAGE_DETAIL) is
+checked instead: every image with a recorded high-detail answer in the API
+journal is analyzed through the full pipeline once per detail mode, and the
+animals, Bartgeier presence and individual are compared with the recorded
+answer, next to prompt tokens and requests per image.
+
+    python github_models_prompt_bench.py BILDERORDNER --limit 20
+    python github_models_prompt_bench.py BILDERORDNER --detail auto,high
+"""
+from pathlib import Path
+import argparse
+import os
+import re
+import sys
+import time
+
+import github_models_api as gm_api
+import github_models_cache as gm_cache
+import github_models_journal as gm_journal
+import github_models_usage as gm_usage
+
+
+def run_variant(image_paths, token, animal_species, variant, layout, api_base=None, model_name=None):
+    """Analyze all images with one variant/layout and return the aggregated numbers."""
+    if api_base is None or model_name is None:
+        api_base, model_name = gm_api.hedge_models()[0]
+    previous = (gm_api.PROMPT_VARIANT, gm_api.PROMPT_LAYOUT)
+    gm_api.set_prompt_options(variant=variant, layout=layout)
+    totals = {'variant': variant, 'layout': layout, 'images': 0, 'answered': 0, 'parsed': 0,
+              'prompt_tokens': 0, 'cached_tokens': 0, 'seconds': 0.0}
+    try:
+        for path in image_paths:
+            totals['images'] += 1
+            details = {}
+            started = time.monotonic()
+            try:
+                result = gm_api._try_api_call(str(path), token, api_base, model_name, animal_species,
+                                              details=details)
+            except Exception as exc:
+                print(f"  {Path(path).name}: {exc}")
+                continue
+            totals['seconds'] += time.monotonic() - started
+            usage = details.get('usage')
+            if usage:
+                totals['answered'] += 1
+                totals['prompt_tokens'] += int(usage.get('prompt_tokens') or 0)
+                totals['cached_tokens'] += gm_usage.cached_tokens(usage)
+            if result != gm_api.PLACEHOLDER_RESULT and not gm_api.validate_result(result, animal_species):
+                totals['parsed'] += 1
+    finally:
+        gm_api.set_prompt_options(*previous)
+    answered = totals['answered'] or 1
+    totals['avg_prompt_tokens'] = totals['prompt_tokens'] / answered
+    totals['avg_cached_tokens'] = totals['cached_tokens'] / answered
+    totals['parse_rate'] = totals['parsed'] / totals['images'] if totals['images'] else 0.0
+    totals['avg_latency_ms'] = totals['seconds'] * 1000 / answered
+    return totals
+
+
+def _recorded_answer(entry):
+    try:
+        if entry.get('structured'):
+            return gm_api.parse_structured_response(entry['content'])
+        return gm_api.parse_analysis_response(entry['content'])
+    except Exception:
+        return gm_api.PLACEHOLDER_RESULT
+
+
+def journal_references(journal=None):
+    """{image_hash: (result, prompt_tokens)} of recorded high-detail answers, the strong model preferred."""
+    journal = journal or gm_journal.ApiJournal()
+    ranked = {}
+    for entry in journal.iter_entries():
+        if (entry.get('status') != 200 or not entry.get('content') or entry.get('batch')
+                or entry.get('detail') == 'low' or not entry.get('image_hash')):
+            continue
+        result = _recorded_answer(entry)
+        if result == gm_api.PLACEHOLDER_RESULT:
+            continue
+        rank = (entry.get('model') == gm_api.STRONG_MODEL, entry.get('timestamp', ''))
+        current = ranked.get(entry['image_hash'])
+        if current is None or rank > current[0]:
+            ranked[entry['image_hash']] = (rank, result, (entry.get('usage') or {}).get('prompt_tokens'))
+    return {image_hash: (result, tokens) for image_hash, (_, result, tokens) in ranked.items()}
+
+
+def _individual(animals):
+    match = re.search(r'luisa|generl', gm_api._fold(animals))
+    return match.group(0) if match else None
+
+
+def run_detail_mode(image_paths, token, animal_species, mode, references):
+    """Analyze images that have a journal reference with one detail mode and compare the answers."""
+    previous = gm_api.IMAGE_DETAIL
+    gm_api.set_image_detail(mode)
+    totals = {'mode': mode, 'images': 0, 'animals_match': 0, 'bartgeier_match': 0, 'with_individual': 0,
+              'individual_match': 0, 'requests': 0, 'low_requests': 0, 'prompt_tokens': 0,
+              'reference_tokens': 0, 'reference_counted': 0}
+    try:
+        for path in image_paths:
+            image_hash = gm_cache.hash_image_bytes(Path(path).read_bytes())
+            if image_hash not in references:
+                continue
+            expected, reference_tokens = references[image_hash]
+            details = {}
+            try:
+                result = gm_api.analyze_with_github_models(str(path), token, animal_species, details)
+            except Exception as exc:
+                print(f"  {Path(path).name}: {exc}")
+                continue
+            totals['images'] += 1
+            totals['animals_match'] += int(gm_api._fold(result[0]) == gm_api._fold(expected[0]))
+            totals['bartgeier_match'] += int(
+                gm_api.needs_individual_id(result[0]) == gm_api.needs_individual_id(expected[0])
+            )
+            if _individual(expected[0]):
+                totals['with_individual'] += 1
+                totals['individual_match'] += int(_individual(result[0]) == _individual(expected[0]))
+            for request in details.get('image_details') or []:
+                totals['requests'] += 1
+                totals['low_requests'] += int(request['detail'] == 'low')
+                totals['prompt_tokens'] += request.get('prompt_tokens') or 0
+            if reference_tokens:
+                totals['reference_tokens'] += reference_tokens
+                totals['reference_counted'] += 1
+    finally:
+        gm_api.set_image_detail(previous)
+    images = totals['images'] or 1
+    totals['avg_prompt_tokens'] = totals['prompt_tokens'] / images
+    totals['avg_reference_tokens'] = totals['reference_tokens'] / (totals['reference_counted'] or 1)
+    totals['requests_per_image'] = totals['requests'] / images
+    return totals
+
+
+def _detail_benchmark(paths, token, animal_species, modes):
+    references = journal_references()
+    print(f"{len(paths)} Bilder, {len(references)} Referenzantworten im Journal")
+    # Compare fresh answers, not the ones cached by earlier runs
+    gm_cache.CACHE_ENABLED = False
+    for mode in modes:
+        report = run_detail_mode(paths, token, animal_species, mode, references)
+        individual = (f"{report['individual_match']}/{report['with_individual']}"
+                      if report['with_individual'] else "-")
+        print(
+            f"  {report['mode']:<5} {report['images']} Bilder: Tiere {report['animals_match']}/{report['images']}, "
+            f"Bartgeier {report['bartgeier_match']}/{report['images']}, Individuum {individual}, "
+            f"Ø {report['avg_prompt_tokens']:.0f} Prompt-Tokens (Referenz Ø {report['avg_reference_tokens']:.0f}), "
+            f"{report['requests_per_image']:.2f} Anfragen/Bild ({report['low_requests']} mit low)"
+        )
+    stats = gm_api.get_detail_stats()
+    print(f"Geschätzt gespart: {stats['est_tokens_saved']} Bild-Tokens, {stats['reruns']} Wiederholungen in high")
+
+
+def _collect_images(folder):
+    return sorted(
+        path for path in Path(folder).iterdir()
+        if path.suffix.lower() in ('.jpg', '.jpeg', '.png')
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Prompt-Varianten und Layouts vergleichen (Tokens, Cache, Parse-Rate)')
+    parser.add_argument('images', help='Bilderordner')
+    parser.add_argument('--limit', type=int, default=10, help='Nur die ersten N Bilder verwenden')
+    parser.add_argument('--variants', default=','.join(gm_api.PROMPT_VARIANTS), help='z.B. full,compact')
+    parser.add_argument('--layouts', default=','.join(gm_api.PROMPT_LAYOUTS), help='z.B. system,user')
+    parser.add_argument('--model', help='Modell (Standard: erstes Modell der aktuellen Strategie)')
+    parser.add_argument('--token', default=os.environ.get("GITHUB_MODELS_TOKEN"), help='GitHub Models Token')
+    parser.add_argument('--detail', help='Bilddetail-Modi gegen das Journal prüfen, z.B. auto,high')
+    args = parser.parse_args(argv)
+
+    tokens = gm_api.load_tokens(args.token)
+    if not tokens:
+        print("Kein Token gefunden (GITHUB_MODELS_TOKEN, GITHUB_MODELS_TOKENS oder Token-Datei).")
+        return 1
+    paths = _collect_images(args.images)
+    if args.limit:
+        paths = paths[:args.limit]
+    if not paths:
+        print("Keine Bilder gefunden.")
+        return 1
+    api_base, model_name = gm_api.hedge_models()[0]
+    if args.model:
+        api_base = dict((model, base) for base, model in gm_api.ENDPOINTS_AND_MODELS).get(args.model, api_base)
+        model_name = args.model
+
+    from github_models_analyzer import ANIMAL_SPECIES
+    if args.detail:
+        _detail_benchmark(paths, tokens[0], ANIMAL_SPECIES, [mode.strip() for mode in args.detail.split(',')])
+        return 0
+    print(f"{len(paths)} Bilder, Modell {model_name}")
+    reports = []
+    for variant in args.variants.split(','):
+        for layout in args.layouts.split(','):
+            report = run_variant(paths, tokens[0], ANIMAL_SPECIES, variant.strip(), layout.strip(),
+                                 api_base, model_name)
+            reports.append(report)
+            print(
+                f"  {report['variant']:<8} {report['layout']:<7} Ø {report['avg_prompt_tokens']:>6.0f} Prompt-Tokens, "
+                f"Ø {report['avg_cached_tokens']:>6.0f} aus Cache, Parse-Rate {report['parse_rate']:.0%} "
+                f"({report['parsed']}/{report['images']}), Ø {report['avg_latency_ms']:.0f} ms"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""SQLite store of per-image analysis state, so a folder resumes where it was left.
+
+Every image the analyzer touches gets one row in
+~/.kamerafallen-tools/analysis_store.sqlite3 (override with
+ANALYZER_STORE_PATH, disable with ANALYZER_STORE=0): the analysis result, the
+last failure reason, the retry count and the review status
+('new' -> 'analyzed' -> 'shown' -> 'saved' -> 'renamed'). A second table
+remembers the image last shown per folder.
+
+Rows are keyed by gm_io.file_identity(), like the AnalysisBuffer, so renames
+and re-sorting keep their state. Images whose device or inode changed (copied
+folder, remounted drive) are found again by file name, size and modification
+time. The database runs in WAL mode: a crash loses at most the last write and
+readers never wait for the writer.
+
+``python github_models_store.py [ORDNER]`` prints a summary.
+"""
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+
+STORE_PATH = Path(
+    os.environ.get("ANALYZER_STORE_PATH")
+    or (Path.home() / ".kamerafallen-tools" / "analysis_store.sqlite3")
+)
+STORE_ENABLED = os.environ.get("ANALYZER_STORE", "1") != "0"
+REVIEW_STATES = ('new', 'analyzed', 'shown', 'saved', 'renamed')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    image_key TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    result TEXT,
+    error TEXT,
+    friendly_error TEXT,
+    failed_at REAL,
+    retry_count INTEGER NOT NULL DEFAULT 0,
+    review TEXT NOT NULL DEFAULT 'new',
+    updated TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS images_by_file ON images (name, size, mtime_ns);
+CREATE INDEX IF NOT EXISTS images_by_folder ON images (folder);
+CREATE TABLE IF NOT EXISTS folders (
+    folder TEXT PRIMARY KEY,
+    current_name TEXT,
+    current_index INTEGER,
+    updated TEXT NOT NULL
+);
+"""
+
+
+def store_key(identity):
+    """Text form of a gm_io.file_identity() tuple."""
+    return json.dumps(list(identity))
+
+
+def _folder_key(folder):
+    return os.path.normcase(os.path.abspath(folder))
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class ResultStore:
+    """Thread-safe per-image state backed by one SQLite database in WAL mode."""
+
+    def __init__(self, path=STORE_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db = None
+        self.reads = 0
+        self.writes = 0
+
+    def _connect(self):
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    def _row_state(self, row):
+        result = None
+        if row['result']:
+            try:
+                result = json.loads(row['result'])
+            except ValueError:
+                result = None
+        return {
+            'name': row['name'],
+            'result': result,
+            'error': row['error'],
+            'friendly_error': row['friendly_error'],
+            'failed_at': row['failed_at'],
+            'retry_count': row['retry_count'],
+            'review': row['review'],
+        }
+
+    def lookup(self, entries):
+        """Return {identity: state} for the [(identity, path)] entries that have a row.
+
+        Entries found only by name, size and modification time take the row of
+        the same folder if there is one. The row is re-keyed to the current
+        identity when its original file is gone (remounted drive, restored
+        backup) and copied when the original still exists (copied folder): the
+        copy keeps the analysis but starts its own review.
+        """
+        found = {}
+        with self._lock:
+            try:
+                db = self._connect()
+                for identity, path in entries:
+                    key = store_key(identity)
+                    row = db.execute("SELECT * FROM images WHERE image_key = ?", (key,)).fetchone()
+                    if row is None:
+                        folder = _folder_key(os.path.dirname(path))
+                        row = db.execute(
+                            "SELECT * FROM images WHERE name = ? AND size = ? AND mtime_ns = ? "
+                            "ORDER BY folder = ? DESC, updated DESC LIMIT 1",
+                            (os.path.basename(path), identity[2], identity[3], folder),
+                        ).fetchone()
+                        if row is None:
+                            continue
+                        original = os.path.join(row['folder'], row['name'])
+                        if _folder_key(original) != _folder_key(path) and os.path.exists(original):
+                            values = dict(row)
+                            values.update(image_key=key, folder=folder, updated=_now(),
+                                          review='analyzed' if row['result'] else 'new')
+                            db.execute(
+                                f"INSERT OR IGNORE INTO images ({', '.join(values)}) "
+                                f"VALUES ({', '.join('?' for _ in values)})",
+                                tuple(values.values()),
+                            )
+                            row = values
+                        else:
+                            db.execute(
+                                "UPDATE OR IGNORE images SET image_key = ?, folder = ? WHERE image_key = ?",
+                                (key, folder, row['image_key']),
+                            )
+                        db.commit()
+                    found[identity] = self._row_state(row)
+                self.reads += 1
+            except Exception:
+                pass  # Without the store the analyzer simply starts fresh
+        return found
+
+    @staticmethod
+    def _write_row(db, identity, path, **fields):
+        values = {
+            'image_key': store_key(identity),
+            'folder': _folder_key(os.path.dirname(path)),
+            'name': os.path.basename(path),
+            'size': identity[2],
+            'mtime_ns': identity[3],
+            'updated': _now(),
+        }
+        values.update(fields)
+        columns = ', '.join(values)
+        placeholders = ', '.join('?' for _ in values)
+        updates = ', '.join(f"{column} = excluded.{column}" for column in values if column != 'image_key')
+        db.execute(
+            f"INSERT INTO images ({columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT(image_key) DO UPDATE SET {updates}",
+            tuple(values.values()),
+        )
+
+    def _upsert(self, identity, path, **fields):
+        with self._lock:
+            try:
+                db = self._connect()
+                self._write_row(db, identity, path, **fields)
+                db.commit()
+                self.writes += 1
+                return True
+            except Exception:
+                return False
+
+    def put_result(self, identity, path, result):
+        """Store a finished analysis; clears any earlier failure and retry count.
+
+        A cheap answer whose escalation failed is not finished: it is left out
+        (returns False), so a resumed session or --batch analyses the image again.
+        """
+        if result.get('escalation_failed'):
+            return False
+        review = max(self.get_review(identity), 'analyzed', key=REVIEW_STATES.index)
+        return self._upsert(
+            identity, path,
+            result=json.dumps(result, ensure_ascii=False, default=str),
+            error=None, friendly_error=None, failed_at=None, retry_count=0, review=review,
+        )
+
+    def put_failure(self, identity, path, error, friendly_error, retry_count, failed_at):
+        return self._upsert(identity, path, error=error, friendly_error=friendly_error,
+                            retry_count=retry_count, failed_at=failed_at)
+
+    def put_retry(self, identity, path, retry_count):
+        return self._upsert(identity, path, retry_count=retry_count)
+
+    def get_review(self, identity):
+        with self._lock:
+            try:
+                row = self._connect().execute(
+                    "SELECT review FROM images WHERE image_key = ?", (store_key(identity),)
+                ).fetchone()
+            except Exception:
+                row = None
+        return row['review'] if row is not None and row['review'] in REVIEW_STATES else 'new'
+
+    def set_review(self, identity, path, review):
+        """Advance the review status; it never moves backwards (showing a saved image again keeps it saved)."""
+        if REVIEW_STATES.index(review) <= REVIEW_STATES.index(self.get_review(identity)):
+            return False
+        return self._upsert(identity, path, review=review)
+
+    def set_reviews(self, entries, review):
+        """set_review() for many [(identity, path)] entries with one commit; returns how many advanced."""
+        rank = REVIEW_STATES.index(review)
+        advanced = 0
+        with self._lock:
+            try:
+                db = self._connect()
+                for identity, path in entries:
+                    row = db.execute(
+                        "SELECT review FROM images WHERE image_key = ?", (store_key(identity),)
+                    ).fetchone()
+                    current = row['review'] if row is not None and row['review'] in REVIEW_STATES else 'new'
+                    if rank > REVIEW_STATES.index(current):
+                        self._write_row(db, identity, path, review=review)
+                        advanced += 1
+                if advanced:
+                    db.commit()
+                    self.writes += 1
+            except Exception:
+                return 0
+        return advanced
+
+    def save_position(self, folder, name, index):
+        with self._lock:
+            try:
+                db = self._connect()
+                db.execute(
+                    "INSERT INTO folders (folder, current_name, current_index, updated) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(folder) DO UPDATE SET current_name = excluded.current_name, "
+                    "current_index = excluded.current_index, updated = excluded.updated",
+                    (_folder_key(folder), name, index, _now()),
+                )
+                db.commit()
+                self.writes += 1
+            except Exception:
+                pass
+
+    def get_position(self, folder):
+        """(file name, index) of the image last shown in a folder, or (None, None)."""
+        with self._lock:
+            try:
+                row = self._connect().execute(
+                    "SELECT current_name, current_index FROM folders WHERE folder = ?", (_folder_key(folder),)
+                ).fetchone()
+            except Exception:
+                row = None
+        return (row['current_name'], row['current_index']) if row is not None else (None, None)
+
+    def summary(self, folder=None):
+        """Counts per review status plus images with a result or a failure (optionally for one folder)."""
+        where, params = ("WHERE folder = ?", (_folder_key(folder),)) if folder else ("", ())
+        counts = dict.fromkeys(REVIEW_STATES, 0)
+        counts.update({'images': 0, 'results': 0, 'failed': 0})
+        with self._lock:
+            try:
+                db = self._connect()
+                for row in db.execute(f"SELECT review, COUNT(*) AS n FROM images {where} GROUP BY review", params):
+                    counts[row['review']] = row['n']
+                    counts['images'] += row['n']
+                row = db.execute(
+                    f"SELECT SUM(result IS NOT NULL) AS results, "
+                    f"SUM(result IS NULL AND error IS NOT NULL) AS failed FROM images {where}",
+                    params,
+                ).fetchone()
+                counts['results'] = row['results'] or 0
+                counts['failed'] = row['failed'] or 0
+            except Exception:
+                pass
+        return counts
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_result_store():
+    """Return the shared store, or None when disabled via ANALYZER_STORE=0."""
+    global _STORE
+    if not STORE_ENABLED:
+        return None
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = ResultStore()
+        return _STORE
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gespeicherte Analyseergebnisse anzeigen')
+    parser.add_argument('folder', nargs='?', help='Nur diesen Bilderordner zählen')
+    args = parser.parse_args(argv)
+
+    store = ResultStore()
+    counts = store.summary(args.folder)
+    print(f"Ergebnisspeicher: {store.path}")
+    print(
+        f"  {counts['images']} Bilder, {counts['results']} analysiert, {counts['failed']} fehlgeschlagen – "
+        f"{counts['shown']} angezeigt, {counts['saved']} gespeichert, {counts['renamed']} umbenannt"
+    )
+    if args.folder:
+        name, index = store.get_position(args.folder)
+        if name:
+            print(f"  Zuletzt angezeigt: {name} (Bild {index + 1})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
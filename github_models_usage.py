@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""Token and request accounting per day, model and token, plus a quota forecast.
+
+Every chat completion that reaches the service is counted in
+~/.kamerafallen-tools/usage.json (override with ANALYZER_USAGE_PATH): requests,
+answered images, 429 rejections, prompt/completion tokens from the response
+``usage`` and request latency. Counters are kept per day, per model and per
+token fingerprint, so they survive restarts and the forecast knows how much of
+today's quota earlier sessions already spent.
+
+forecast() estimates how many images can still be analyzed today: for each
+model the remaining daily requests (configured limit minus today's usage,
+or the limiter's header-corrected budget if lower) are divided by the share
+of images that model sees (the strong model only sees escalations in the
+cascade) and multiplied by the images per request (batching). With
+ANALYZER_TPD set, the daily token budget and the average tokens per image
+are taken into account as well.
+
+``python github_models_usage.py`` prints the report for the last days.
+"""
+from datetime import date, timedelta
+from pathlib import Path
+import argparse
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+USAGE_PATH = Path(
+    os.environ.get("ANALYZER_USAGE_PATH")
+    or (Path.home() / ".kamerafallen-tools" / "usage.json")
+)
+# Daily token budget across all models (0 = not limited by tokens)
+DAILY_TOKEN_BUDGET = _env_float("ANALYZER_TPD", 0.0)
+KEEP_DAYS = 90
+# Seconds between two rewrites of the usage file; counts in between stay in memory until flush()
+SAVE_INTERVAL = _env_float("ANALYZER_USAGE_SAVE_INTERVAL", 5.0)
+COUNTERS = ('requests', 'ok', 'rejected', 'errors', 'images', 'prompt_tokens', 'cached_tokens', 'completion_tokens',
+            'latency_ms')
+
+
+class UsageLedger:
+    """Thread-safe {day: {model: {token: counters}}} store backed by a JSON file.
+
+    record() rewrites the file at most every SAVE_INTERVAL seconds; flush()
+    writes pending counts (get_ledger() registers it for interpreter exit).
+    """
+
+    def __init__(self, path=USAGE_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._days = None
+        self._dirty = False
+        self._saved_at = None
+
+    def _load(self):
+        if self._days is None:
+            try:
+                self._days = json.loads(self.path.read_text(encoding="utf-8"))
+            except Exception:
+                self._days = {}
+
+    def _save(self):
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        cutoff = (date.today() - timedelta(days=KEEP_DAYS)).isoformat()
+        for day in [day for day in self._days if day < cutoff]:
+            del self._days[day]
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self._days, indent=1, sort_keys=True), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except Exception:
+            pass  # Accounting must never break an analysis
+
+    def record(self, model, token, status, usage=None, latency_ms=None, images=1, day=None):
+        """Count one request; status is the HTTP status (None for network errors)."""
+        day = (day or date.today()).isoformat()
+        usage = usage or {}
+        with self._lock:
+            self._load()
+            counters = self._days.setdefault(day, {}).setdefault(model or '?', {}).setdefault(token or '?', {})
+            for key in COUNTERS:
+                counters.setdefault(key, 0)
+            counters['requests'] += 1
+            if status == 200:
+                counters['ok'] += 1
+                counters['images'] += images
+            elif status == 429:
+                counters['rejected'] += 1
+            else:
+                counters['errors'] += 1
+            counters['prompt_tokens'] += int(usage.get('prompt_tokens') or 0)
+            counters['cached_tokens'] += cached_tokens(usage)
+            counters['completion_tokens'] += int(usage.get('completion_tokens') or 0)
+            counters['latency_ms'] += float(latency_ms or 0)
+            self._dirty = True
+            if self._saved_at is None or time.monotonic() - self._saved_at >= SAVE_INTERVAL:
+                self._save()
+
+    def flush(self):
+        """Write counts that record() has kept in memory so far."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def day(self, day=None):
+        """Copy of {model: {token: counters}} for a day (default today)."""
+        day = (day or date.today()).isoformat()
+        with self._lock:
+            self._load()
+            return json.loads(json.dumps(self._days.get(day, {})))
+
+    def days(self):
+        with self._lock:
+            self._load()
+            return sorted(self._days)
+
+
+def cached_tokens(usage):
+    """Prompt tokens served from the provider's prompt cache (0 if not reported)."""
+    return int(((usage or {}).get('prompt_tokens_details') or {}).get('cached_tokens') or 0)
+
+
+def _sum(counter_dicts):
+    total = dict.fromkeys(COUNTERS, 0)
+    for counters in counter_dicts:
+        for key in COUNTERS:
+            total[key] += counters.get(key, 0)
+    return total
+
+
+def totals_by(day_data, key='model'):
+    """Collapse a day's {model: {token: counters}} to {model: counters} or {token: counters}."""
+    grouped = {}
+    for model, tokens in day_data.items():
+        for token, counters in tokens.items():
+            grouped.setdefault(model if key == 'model' else token, []).append(counters)
+    return {name: _sum(parts) for name, parts in grouped.items()}
+
+
+_LEDGER = None
+_LEDGER_LOCK = threading.Lock()
+
+
+def get_ledger():
+    global _LEDGER
+    with _LEDGER_LOCK:
+        if _LEDGER is None:
+            _LEDGER = UsageLedger()
+            atexit.register(_LEDGER.flush)
+        return _LEDGER
+
+
+def record_exchange(entry):
+    """Count one journal entry (see github_models_api._journal_exchange); never raises."""
+    try:
+        get_ledger().record(
+            entry.get('model'),
+            entry.get('token'),
+            entry.get('status'),
+            usage=entry.get('usage'),
+            latency_ms=(entry.get('latency_ms') or {}).get('request'),
+            images=len(entry.get('image_hashes') or ()) or 1,
+        )
+    except Exception:
+        pass
+
+
+def forecast(ledger=None):
+    """Estimate how many more images today's quota allows.
+
+    Returns a dict with images_remaining (None if unknown), the limiting
+    model and per-model details (remaining requests, share of images,
+    images per request, images feasible).
+    """
+    import github_models_api as gm_api
+
+    ledger = ledger or get_ledger()
+    today = ledger.day()
+    by_model = totals_by(today, 'model')
+    pool = gm_api.get_token_pool()
+    fingerprints = [state['token'] for state in pool.get_state()] if len(pool) > 1 else []
+    limiter_states = gm_api.get_rate_limit_state()['models']
+
+    if gm_api.get_model_policy() == 'strong':
+        models = [gm_api.ENDPOINTS_AND_MODELS[0][1]]
+    else:
+        models = [gm_api.CHEAP_MODEL, gm_api.STRONG_MODEL]
+    images_today = max([by_model.get(model, {}).get('images', 0) for model in models] or [0])
+
+    details = {}
+    for position, model in enumerate(models):
+        counters = by_model.get(model, dict.fromkeys(COUNTERS, 0))
+        per_token = today.get(model, {})
+        remaining = 0.0
+        for fingerprint in fingerprints or [None]:
+            name = f"{model} [{fingerprint}]" if fingerprint else model
+            used = sum(
+                token_counters['requests'] for token, token_counters in per_token.items()
+                if fingerprint is None or token == fingerprint
+            )
+            state = limiter_states.get(name)
+            day_limit = state['day_limit'] if state else gm_api.model_request_limits(model)[1]
+            budget = max(0.0, day_limit - used)
+            if state is not None:
+                budget = min(budget, state['day_remaining'])
+            remaining += budget
+        if images_today:
+            share = counters['images'] / images_today
+        else:
+            share = 1.0 if position == 0 else 0.0
+        images_per_request = counters['images'] / counters['ok'] if counters['ok'] else 1.0
+        feasible = remaining * images_per_request / share if share > 0 else None
+        details[model] = {
+            'requests_today': counters['requests'],
+            'requests_remaining': int(remaining),
+            'share': share,
+            'images_per_request': images_per_request,
+            'images_feasible': int(feasible) if feasible is not None else None,
+        }
+
+    totals = _sum(by_model.values())
+    tokens_today = totals['prompt_tokens'] + totals['completion_tokens']
+    avg_tokens_per_image = tokens_today / images_today if images_today else None
+    token_feasible = None
+    if DAILY_TOKEN_BUDGET and avg_tokens_per_image:
+        token_feasible = int(max(0.0, DAILY_TOKEN_BUDGET - tokens_today) / avg_tokens_per_image)
+
+    candidates = [(info['images_feasible'], model) for model, info in details.items()
+                  if info['images_feasible'] is not None]
+    if token_feasible is not None:
+        candidates.append((token_feasible, 'tokens'))
+    images_remaining, limited_by = min(candidates) if candidates else (None, None)
+    return {
+        'images_today': images_today,
+        'requests_today': totals['requests'],
+        'tokens_today': tokens_today,
+        'avg_tokens_per_image': avg_tokens_per_image,
+        'avg_latency_ms': totals['latency_ms'] / totals['requests'] if totals['requests'] else None,
+        'images_remaining': images_remaining,
+        'limited_by': limited_by,
+        'models': details,
+    }
+
+
+def format_status(result=None):
+    """One status line for the analyzer, e.g. 'Heute: 40 Bilder, 61k Tokens - noch ca. 120 Bilder möglich'."""
+    result = result or forecast()
+    text = f"Heute: {result['images_today']} Bilder, {result['tokens_today'] / 1000:.0f}k Tokens"
+    if result['images_remaining'] is not None:
+        text += f" – noch ca. {result['images_remaining']} Bilder möglich (Limit: {result['limited_by']})"
+    return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Token-/Anfrageverbrauch und Tagesprognose')
+    parser.add_argument('--days', type=int, default=7, help='Anzahl der angezeigten Tage')
+    parser.add_argument('--by', choices=('model', 'token'), default='model', help='Gruppierung')
+    args = parser.parse_args(argv)
+
+    ledger = get_ledger()
+    print(f"Verbrauch: {ledger.path}")
+    for day in ledger.days()[-args.days:]:
+        print(f"\n{day}")
+        for name, counters in sorted(totals_by(ledger.day(date.fromisoformat(day)), args.by).items()):
+            avg_latency = counters['latency_ms'] / counters['requests'] if counters['requests'] else 0
+            print(
+                f"  {name:<24} {counters['requests']:>5} Anfragen ({counters['ok']} ok, "
+                f"{counters['rejected']} 429, {counters['errors']} Fehler), {counters['images']:>5} Bilder, "
+                f"{counters['prompt_tokens'] + counters['completion_tokens']:>8} Tokens "
+                f"({counters['cached_tokens']} aus Cache), Ø {avg_latency:.0f} ms"
+            )
+
+    result = forecast(ledger)
+    print("\nPrognose für heute:")
+    for model, info in result['models'].items():
+        feasible = info['images_feasible'] if info['images_feasible'] is not None else '-'
+        print(
+            f"  {model:<24} {info['requests_remaining']:>5} Anfragen übrig, Anteil {info['share']:.0%}, "
+            f"{info['images_per_request']:.1f} Bilder/Anfrage -> {feasible} Bilder"
+        )
+    if result['avg_tokens_per_image']:
+        print(f"  Ø {result['avg_tokens_per_image']:.0f} Tokens pro Bild")
+    print(f"  {format_status(result)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
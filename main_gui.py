@@ -10,6 +10,7 @@ Two main buttons:
 This file is purposely self-contained so it can be used as the single entrypoint for packaging.
 """
 
+import multiprocessing
 import os
 import re
 import tempfile
@@ -687,4 +688,5 @@ def main():
 
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # Analyzer preparation workers re-launch the frozen executable
     main()
@@ -0,0 +1,19 @@
+"""Shared setup for the unit tests: no network, no user files.
+
+The github_models_* modules read their settings from the environment at
+import time, so HOME and the ANALYZER_* switches are set before the first
+import. Run with ``python -m pytest tests``.
+"""
+import os
+import sys
+import tempfile
+
+_HOME = tempfile.mkdtemp(prefix="kamerafallen-tests-")
+os.environ["HOME"] = _HOME
+os.environ["USERPROFILE"] = _HOME
+os.environ.setdefault("GITHUB_MODELS_TOKEN", "test-token")
+for _name in ("ANALYZER_CACHE", "ANALYZER_JOURNAL", "ANALYZER_OCR", "ANALYZER_STORE"):
+    os.environ[_name] = "0"
+os.environ["ANALYZER_USAGE_PATH"] = os.path.join(_HOME, "usage.json")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,48 @@
+import github_models_api as gm_api
+
+
+BATCH_ANSWER = """BILD 1:
+Tiere: 2 Gämse
+Standort: FP1
+Uhrzeit: 06:12:00
+Datum: 03.05.2024
+
+**BILD 2**
+Tiere: Bartgeier
+Standort: FP9
+Uhrzeit: 7:00
+Datum: 4.5.24
+
+BILD 3: (kein Ergebnis)
+"""
+
+
+def test_blocks_are_split_by_image_number():
+    results = gm_api.parse_batch_response(BATCH_ANSWER, 3)
+    assert results[0] == ('2 Gämse', 'FP1', '06:12:00', '03.05.2024')
+
+
+def test_block_with_unknown_location_or_without_animals_is_none():
+    results = gm_api.parse_batch_response(BATCH_ANSWER, 3)
+    assert results[1] is None  # FP9 is not a station
+    assert results[2] is None  # no "Tiere" line
+
+
+def test_animals_only_accepts_any_location():
+    results = gm_api.parse_batch_response(BATCH_ANSWER, 3, animals_only=True)
+    assert results[1] == ('Bartgeier', 'FP9', '07:00:00', '04.05.2024')
+
+
+def test_missing_and_extra_blocks():
+    answer = "BILD 2: Tiere: 1 Fuchs\nStandort: Nische\nUhrzeit: 22:01:00\nDatum: 01.01.2025\n\nBILD 7:\nTiere: 1 Dachs"
+    results = gm_api.parse_batch_response(answer, 2)
+    assert results[0] is None
+    assert results[1] == ('1 Fuchs', 'Nische', '22:01:00', '01.01.2025')
+
+
+def test_first_block_per_number_wins():
+    answer = (
+        "BILD 1:\nTiere: 1 Fuchs\nStandort: FP2\nUhrzeit: 10:00:00\nDatum: 01.01.2025\n"
+        "BILD 1:\nTiere: 1 Dachs\nStandort: FP3\nUhrzeit: 11:00:00\nDatum: 02.01.2025\n"
+    )
+    assert gm_api.parse_batch_response(answer, 1) == [('1 Fuchs', 'FP2', '10:00:00', '01.01.2025')]
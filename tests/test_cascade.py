@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+import github_models_api as gm_api
+
+
+SPECIES = ['Bartgeier', 'Fuchs', 'Gämse', 'Rabenvogel']
+
+
+@pytest.fixture(autouse=True)
+def clean_policies(monkeypatch):
+    monkeypatch.setattr(gm_api, '_STATION_POLICIES', {})
+    monkeypatch.setattr(gm_api, '_CASCADE_STATS', {'cheap_accepted': 0, 'escalated': 0, 'strong_direct': 0,
+                                                   'reasons': {}})
+
+
+@pytest.mark.parametrize('result, reasons', [
+    (('2 Gämse', 'FP1', '06:12:00', '03.05.2024'), []),
+    (('1 Gams, 1 Fuchs', 'Nische', '23:59:59', '29.02.2024'), []),
+    (('Keine Tiere', 'FP2', '12:00:00', '01.01.2025'), []),
+    (('1 Einhorn', 'FP1', '06:12:00', '03.05.2024'), ['unknown_species']),
+    (('1 Fuchs', 'FP7', '06:12:00', '03.05.2024'), ['invalid_location']),
+    (('1 Fuchs', 'FP1', '06:12:00', '3.05.2024'), ['invalid_date']),
+    (('1 Fuchs', 'FP1', '06:12:00', '30.02.2024'), ['invalid_date']),
+    (('1 Fuchs', 'FP1', '6:12', '03.05.2024'), ['invalid_time']),
+    (('1 Fuchs', 'FP1', '24:00:00', '03.05.2024'), ['invalid_time']),
+])
+def test_validate_result(result, reasons):
+    assert gm_api.validate_result(result, SPECIES) == reasons
+
+
+ANALYZER_SPECIES = ['Bartgeier', 'Steinadler', 'Kolkrabe', 'Alpendohle', 'Fuchs', 'Gams', 'Steinbock',
+                    'Murmeltier', 'Marder', 'Reh', 'Hirsch', 'Rabenkrähe', 'Mensch']
+
+
+@pytest.mark.parametrize('animals', [
+    '3 Gämsen', '2 Füchse', '2 Steinböcke', '2 Rehe', '2 Rabenvögel', '1 Rabenvogel', '4 Alpendohlen',
+    'Bartgeier (Luisa), 2 Kolkraben', '1 Hirsch, 3 Menschen',
+])
+def test_species_known_accepts_plurals(animals):
+    assert gm_api._species_known(animals, ANALYZER_SPECIES)
+
+
+@pytest.mark.parametrize('animals', ['1 Alpensalamander', '1 Steinhuhn', '2 Hirse', '1 Fuchs, 1 Gamsbock', '1 Rabe'])
+def test_species_known_rejects_other_words_with_the_same_start(animals):
+    assert not gm_api._species_known(animals, ANALYZER_SPECIES)
+
+
+def test_cheap_answer_accepted_and_counted():
+    details = {}
+    assert gm_api.judge_cheap_answer(('1 Fuchs', 'FP1', '06:12:00', '03.05.2024'), SPECIES, details) == []
+    assert details['escalation_reasons'] == []
+    assert gm_api.get_cascade_stats()['cheap_accepted'] == 1
+
+
+def test_bartgeier_and_placeholder_escalate():
+    details = {}
+    reasons = gm_api.judge_cheap_answer(('Bartgeier (Luisa)', 'FP1', '06:12:00', '03.05.2024'), SPECIES, details)
+    assert reasons == details['escalation_reasons'] == ['bartgeier_id']
+    assert gm_api.judge_cheap_answer(gm_api.PLACEHOLDER_RESULT, SPECIES, {}) == ['placeholder']
+    stats = gm_api.get_cascade_stats()
+    assert stats['escalated'] == 2
+    assert stats['reasons'] == {'bartgeier_id': 1, 'placeholder': 1}
+
+
+def test_station_policy_overrides_validation():
+    gm_api.set_station_policy('Nische', 'strong')
+    gm_api.set_station_policy('FP2', 'cheap')
+    assert gm_api.judge_cheap_answer(('1 Fuchs', 'Nische', '06:12:00', '03.05.2024'), SPECIES, {}) == ['station_policy']
+    assert gm_api.judge_cheap_answer(('Bartgeier', 'FP2', '06:12:00', '03.05.2024'), SPECIES, {}) == []
+    with pytest.raises(ValueError):
+        gm_api.set_station_policy('FP1', 'fastest')
+
+
+def test_strong_policy_skips_the_cascade():
+    gm_api.set_station_policy(None, 'strong')
+    cascade, models = gm_api.cascade_models()
+    assert not cascade
+    assert models == list(gm_api.ENDPOINTS_AND_MODELS)
+    gm_api.set_station_policy(None, 'cascade')
+    cascade, models = gm_api.cascade_models()
+    assert cascade
+    assert [model for _, model in models] == [gm_api.CHEAP_MODEL, gm_api.STRONG_MODEL]
+
+
+def test_cheap_failure_reason():
+    assert gm_api.cheap_failure_reason(gm_api.RateLimitError("x", 5, 'minute')) == 'rate_limit'
+    assert gm_api.cheap_failure_reason(ValueError("x")) == 'error'
+
+
+def test_hedged_strong_answer_counts_as_escalation(monkeypatch):
+    import github_models_async as gm_async
+
+    monkeypatch.setattr(gm_api, 'MODEL_STRATEGY', 'cascade')
+    monkeypatch.setattr(gm_api, 'hedge_budget_available', lambda model_name: True)
+    monkeypatch.setattr(gm_api, '_CIRCUIT_BREAKERS', {})
+    client = gm_async.AsyncModelsClient('x', SPECIES)
+    client._client = object()  # Any client: the calls below never reach it
+
+    async def load_image(image_path):
+        return b'jpeg', 'hash', None
+
+    async def read_footer(*args):
+        pass
+
+    async def try_api_call(image_data, api_base, model_name, details, on_fields, prepared):
+        if model_name == gm_api.CHEAP_MODEL:
+            await asyncio.sleep(10)
+        return ('1 Fuchs', 'FP1', '06:12:00', '03.05.2024')
+
+    monkeypatch.setattr(client, '_load_image', load_image)
+    monkeypatch.setattr(client, '_read_footer', read_footer)
+    monkeypatch.setattr(client, '_try_api_call', try_api_call)
+    details = {}
+    result = asyncio.run(client.analyze_hedged('bild.jpg', details, hedge_after=0.01))
+    assert result[0] == '1 Fuchs'
+    assert details['hedge_winner'] == gm_api.STRONG_MODEL
+    assert details['escalation_reasons'] == ['hedge']
+    stats = gm_api.get_cascade_stats()
+    assert (stats['cheap_accepted'], stats['escalated']) == (0, 1)
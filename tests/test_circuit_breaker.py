@@ -0,0 +1,93 @@
+import github_models_api as gm_api
+
+
+def make_breaker(threshold=3, cooldown=60):
+    return gm_api.CircuitBreaker('http://mock', 'gpt-4o', failure_threshold=threshold, cooldown=cooldown)
+
+
+def elapse(breaker, seconds):
+    """Pretend the circuit opened ``seconds`` earlier."""
+    breaker.opened_at -= seconds
+
+
+def test_opens_after_consecutive_failures():
+    breaker = make_breaker()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == 'closed' and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    assert 59 < breaker.retry_in() <= 60
+
+
+def test_success_resets_the_failure_count():
+    breaker = make_breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+
+
+def test_single_probe_after_cooldown_closes_on_success():
+    breaker = make_breaker(threshold=1)
+    breaker.record_failure()
+    elapse(breaker, 59)
+    assert not breaker.allow()
+    elapse(breaker, 1)
+    assert breaker.allow()
+    assert breaker.state == 'half_open'
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_with_doubled_cooldown():
+    breaker = make_breaker(threshold=1, cooldown=60)
+    breaker.record_failure()
+    elapse(breaker, 60)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert 119 < breaker.retry_in() <= 120
+    assert breaker.times_opened == 2
+
+
+def test_cooldown_is_capped():
+    breaker = make_breaker(threshold=1, cooldown=gm_api.BREAKER_MAX_COOLDOWN)
+    breaker.record_failure()
+    elapse(breaker, gm_api.BREAKER_MAX_COOLDOWN)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.cooldown == gm_api.BREAKER_MAX_COOLDOWN
+
+
+def test_released_probe_may_be_retried():
+    breaker = make_breaker(threshold=1)
+    breaker.record_failure()
+    elapse(breaker, 60)
+    assert breaker.allow()
+    breaker.release_probe()  # e.g. the probe was rate limited
+    assert breaker.state == 'half_open'
+    assert breaker.allow()
+
+
+def test_circuit_open_is_an_escalation_reason():
+    assert gm_api.cheap_failure_reason(gm_api.CircuitOpenError("offen", 30)) == 'circuit_open'
+
+
+def test_rejected_batches_do_not_open_the_circuit(monkeypatch):
+    monkeypatch.setattr(gm_api, '_CIRCUIT_BREAKERS', {})
+
+    def rejected():
+        raise gm_api.BatchRejectedError("400 Request body too large")
+
+    for _ in range(gm_api.BREAKER_FAILURE_THRESHOLD + 1):
+        try:
+            gm_api._call_with_breaker('http://mock', 'gpt-4o-mini', rejected)
+        except gm_api.BatchRejectedError:
+            pass
+    breaker = gm_api.get_circuit_breaker('http://mock', 'gpt-4o-mini')
+    assert (breaker.state, breaker.consecutive_failures) == ('closed', 0)
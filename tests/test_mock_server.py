@@ -0,0 +1,80 @@
+"""HTTP round trips against github_models_mock_server, started in-process on a free port."""
+import argparse
+import io
+import json
+import threading
+import urllib.request
+
+import pytest
+
+import github_models_api as gm_api
+import github_models_mock_server as mock_server
+
+
+SPECIES = ['Bartgeier', 'Fuchs', 'Gämse', 'Rabenvogel']
+
+
+@pytest.fixture
+def start_mock(monkeypatch):
+    monkeypatch.setattr(gm_api, '_RATE_LIMITERS', {})
+    monkeypatch.setattr(gm_api, '_TOKEN_POOL', None)
+    servers = []
+
+    def start(**overrides):
+        options = dict(host='127.0.0.1', port=0, latency='fixed:0', rpm=0, rpd=0, max_concurrent=0,
+                       timeout_rate=0.0, hang_seconds=0.0, error_rate=0.0, seed=1, verbose=False)
+        options.update(overrides)
+        server = mock_server.serve(argparse.Namespace(**options))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def image(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    path = tmp_path / "bild.jpg"
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), (90, 120, 60)).save(buffer, 'JPEG')
+    path.write_bytes(buffer.getvalue())
+    return str(path)
+
+
+def stats(api_base):
+    with urllib.request.urlopen(f"{api_base}/stats") as response:
+        return json.loads(response.read())
+
+
+def test_answer_round_trip(start_mock, image):
+    api_base = start_mock()
+    answer = gm_api._try_api_call(image, 'tok', api_base, 'gpt-4o', SPECIES, details={})
+    animals, location, time_str, date_str = answer
+    assert animals
+    assert location in gm_api.VALID_LOCATIONS
+    assert gm_api.validate_result(('1 Fuchs', location, time_str, date_str), SPECIES) == []
+    # The same upload always gets the same answer
+    assert gm_api._try_api_call(image, 'tok', api_base, 'gpt-4o', SPECIES, details={}) == answer
+    assert stats(api_base)['ok'] == 2
+
+
+def test_minute_limit_rejection_blocks_the_limiter(start_mock, image):
+    api_base = start_mock(rpm=1)
+    gm_api._try_api_call(image, 'tok', api_base, 'gpt-4o', SPECIES, details={})
+    gm_api.get_rate_limiter('gpt-4o').rpm_tokens = 1  # let the client believe it still has budget
+    with pytest.raises(gm_api.RateLimitError) as excinfo:
+        gm_api._try_api_call(image, 'tok', api_base, 'gpt-4o', SPECIES, details={})
+    assert excinfo.value.limit_type == 'minute'
+    assert stats(api_base)['rejected_minute'] == 1
+    assert gm_api.get_rate_limiter('gpt-4o').try_acquire()[2] == 'minute'
+
+
+def test_server_errors_surface_as_exceptions(start_mock, image):
+    api_base = start_mock(error_rate=1.0)
+    with pytest.raises(Exception):
+        gm_api._try_api_call(image, 'tok', api_base, 'gpt-4o', SPECIES, details={})
+    assert stats(api_base)['errors'] == 1
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+import github_models_api as gm_api
+
+
+def test_limiter_spends_minute_budget_then_reports_wait():
+    limiter = gm_api.RateLimiter("test", requests_per_minute=2, requests_per_day=100)
+    assert limiter.try_acquire()[0]
+    assert limiter.try_acquire()[0]
+    ok, wait, limit_type = limiter.try_acquire()
+    assert not ok
+    assert limit_type == 'minute'
+    assert 0 < wait <= 30
+
+
+def test_limiter_day_budget_wins_over_minute_budget():
+    limiter = gm_api.RateLimiter("test", requests_per_minute=10, requests_per_day=1)
+    assert limiter.try_acquire()[0]
+    ok, _, limit_type = limiter.try_acquire()
+    assert not ok
+    assert limit_type == 'day'
+
+
+def test_acquire_raises_instead_of_waiting_past_max_wait():
+    limiter = gm_api.RateLimiter("test", requests_per_minute=1, requests_per_day=100)
+    limiter.acquire()
+    with pytest.raises(gm_api.RateLimitError) as excinfo:
+        limiter.acquire(max_wait=1)
+    assert excinfo.value.limit_type == 'minute'
+    assert excinfo.value.wait_seconds >= 1
+
+
+def test_headers_correct_the_budgets():
+    limiter = gm_api.RateLimiter("test", requests_per_minute=10, requests_per_day=50)
+    limiter.update_from_response({
+        'x-ratelimit-limit-requests': '150',
+        'x-ratelimit-remaining-requests': '3',
+        'x-ratelimit-renewalperiod-requests': '86400',
+    })
+    state = limiter.get_state()
+    assert state['day_limit'] == 150
+    assert state['day_remaining'] == 3
+
+
+def test_exhausted_header_blocks_until_reset():
+    limiter = gm_api.RateLimiter("test", requests_per_minute=10, requests_per_day=50)
+    limiter.update_from_response({
+        'x-ratelimit-limit-requests': '10',
+        'x-ratelimit-remaining-requests': '0',
+        'x-ratelimit-renewalperiod-requests': '60',
+        'x-ratelimit-reset-requests': '30s',
+    })
+    ok, wait, limit_type = limiter.try_acquire()
+    assert not ok
+    assert limit_type == 'minute'
+    assert 25 < wait <= 30
+
+
+def test_block_after_rejection():
+    limiter = gm_api.RateLimiter("test", requests_per_minute=10, requests_per_day=50)
+    limiter.block(120, 'minute')
+    ok, wait, limit_type = limiter.try_acquire()
+    assert not ok
+    assert limit_type == 'minute'
+    assert wait > 100
+    assert limiter.get_state()['rejections'] == 1
+
+
+@pytest.mark.parametrize('value, seconds', [
+    ('12', 12.0), ('1.5', 1.5), ('6m0s', 360.0), ('250ms', 0.25), ('1h', 3600.0), ('', None), ('soon', None),
+])
+def test_parse_duration(value, seconds):
+    assert gm_api._parse_duration(value) == seconds
+
+
+def test_concurrency_gate_gives_up_after_max_wait():
+    gate = gm_api.ConcurrencyGate(max_concurrent=1)
+    gate.enter()
+    with pytest.raises(gm_api.RateLimitError) as excinfo:
+        gate.enter(max_wait=0.05)
+    assert excinfo.value.limit_type == 'concurrent'
+    gate.leave()
+    assert gate.try_enter()
+
+
+def test_raising_the_gate_limit_wakes_waiting_threads():
+    import threading
+
+    gate = gm_api.ConcurrencyGate(max_concurrent=1)
+    gate.enter()
+    entered = threading.Event()
+    waiter = threading.Thread(target=lambda: (gate.enter(max_wait=5), entered.set()))
+    waiter.start()
+    assert not entered.wait(0.05)
+    gate.set_max_concurrent(2)
+    assert entered.wait(1)
+    waiter.join()
+    assert gate.in_flight == 2
+
+
+def test_async_gate_gives_up_after_max_wait():
+    gm_async = pytest.importorskip("github_models_async")
+    gate = gm_api.ConcurrencyGate(max_concurrent=1)
+    gate.enter()
+    with pytest.raises(gm_api.RateLimitError):
+        asyncio.run(gm_async._enter_gate(gate, max_wait=0.05, poll_interval=0.01))
+
+
+def test_starting_budgets_are_per_model(monkeypatch):
+    monkeypatch.setattr(gm_api, '_RATE_LIMITERS', {})
+    monkeypatch.setenv('ANALYZER_MODEL_LIMITS', 'gpt-4o=12/60,kaputt=x')
+    monkeypatch.setattr(gm_api, 'MODEL_REQUEST_LIMITS', gm_api._load_model_request_limits())
+    cheap, strong, other = (gm_api.get_rate_limiter(name) for name in ('gpt-4o-mini', 'gpt-4o', 'phi-4'))
+    assert (cheap.rpm_capacity, cheap.rpd_limit) == (15, 150)
+    assert (strong.rpm_capacity, strong.rpd_limit) == (12, 60)
+    assert (other.rpm_capacity, other.rpd_limit) == (gm_api.DEFAULT_REQUESTS_PER_MINUTE, gm_api.DEFAULT_REQUESTS_PER_DAY)
@@ -0,0 +1,117 @@
+import os
+import shutil
+
+import pytest
+
+import github_models_store as gm_store
+
+
+RESULT = {'animals': '1 Fuchs', 'location': 'FP1', 'time': '01:02:03', 'date': '01.02.2025'}
+
+
+def identity(path):
+    """Same shape as gm_io.file_identity() without importing the Excel helpers."""
+    stat = os.stat(path)
+    return stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+@pytest.fixture
+def store(tmp_path):
+    return gm_store.ResultStore(tmp_path / "store.sqlite3")
+
+
+@pytest.fixture
+def image(tmp_path):
+    folder = tmp_path / "ordner"
+    folder.mkdir()
+    path = folder / "IMG_0001.JPG"
+    path.write_bytes(b"jpeg")
+    return str(path)
+
+
+def test_review_state_only_moves_forward(store, image):
+    key = identity(image)
+    assert store.get_review(key) == 'new'
+    assert store.set_review(key, image, 'saved')
+    assert not store.set_review(key, image, 'shown')
+    assert store.get_review(key) == 'saved'
+    assert store.set_review(key, image, 'renamed')
+    assert store.get_review(key) == 'renamed'
+
+
+def test_result_does_not_reset_the_review(store, image):
+    key = identity(image)
+    store.set_review(key, image, 'saved')
+    store.put_result(key, image, RESULT)
+    state = store.lookup([(key, image)])[key]
+    assert state['review'] == 'saved'
+    assert state['result'] == RESULT
+
+
+def test_result_clears_an_earlier_failure(store, image):
+    key = identity(image)
+    store.put_failure(key, image, 'timeout', 'Zeitüberschreitung', 2, 123.0)
+    assert store.summary()['failed'] == 1
+    store.put_result(key, image, RESULT)
+    state = store.lookup([(key, image)])[key]
+    assert (state['error'], state['retry_count'], state['review']) == (None, 0, 'analyzed')
+    assert store.summary()['failed'] == 0
+
+
+def test_copied_folder_gets_its_own_row(store, image, tmp_path):
+    key = identity(image)
+    store.put_result(key, image, RESULT)
+    store.set_review(key, image, 'renamed')
+    copy = tmp_path / "kopie"
+    shutil.copytree(os.path.dirname(image), copy)
+    copied = str(copy / os.path.basename(image))
+    copied_key = identity(copied)
+    assert copied_key != key
+
+    state = store.lookup([(copied_key, copied)])[copied_key]
+    assert (state['result'], state['review']) == (RESULT, 'analyzed')
+    assert store.get_review(key) == 'renamed'
+    assert store.summary(os.path.dirname(image))['images'] == 1
+    assert store.summary(str(copy))['images'] == 1
+
+
+def test_moved_file_keeps_its_row(store, image, tmp_path):
+    key = identity(image)
+    store.put_result(key, image, RESULT)
+    store.set_review(key, image, 'saved')
+    target = tmp_path / "verschoben"
+    target.mkdir()
+    moved = str(target / os.path.basename(image))
+    shutil.copy2(image, moved)
+    os.remove(image)
+    moved_key = identity(moved)
+
+    assert store.lookup([(moved_key, moved)])[moved_key]['review'] == 'saved'
+    assert store.summary(os.path.dirname(image))['images'] == 0
+    assert store.summary(str(target))['images'] == 1
+
+
+def test_position_per_folder(store, tmp_path):
+    assert store.get_position(tmp_path) == (None, None)
+    store.save_position(tmp_path, "IMG_0007.JPG", 6)
+    store.save_position(tmp_path, "IMG_0008.JPG", 7)
+    assert store.get_position(tmp_path) == ("IMG_0008.JPG", 7)
+
+
+def test_unchecked_cheap_answer_is_not_stored_as_finished(store, image):
+    key = identity(image)
+    assert not store.put_result(key, image, dict(RESULT, escalation_failed='429 Too Many Requests'))
+    store.set_review(key, image, 'shown')
+    state = store.lookup([(key, image)])[key]
+    assert (state['result'], state['error'], state['review']) == (None, None, 'shown')
+
+
+def test_reviews_are_written_in_one_commit(store, image, tmp_path):
+    other = tmp_path / "ordner" / "IMG_0002.JPG"
+    other.write_bytes(b"jpeg2")
+    entries = [(identity(image), image), (identity(str(other)), str(other))]
+    store.set_review(entries[0][0], image, 'saved')
+    writes = store.writes
+    assert store.set_reviews(entries, 'shown') == 1
+    assert store.writes == writes + 1
+    assert [store.get_review(key) for key, _ in entries] == ['saved', 'shown']
@@ -0,0 +1,173 @@
+import io
+import json
+
+import pytest
+import requests
+
+import github_models_api as gm_api
+
+
+SPECIES = ['Bartgeier', 'Fuchs', 'Gämse']
+
+
+@pytest.fixture(autouse=True)
+def options_on(monkeypatch):
+    monkeypatch.setattr(gm_api, 'STREAMING', True)
+    monkeypatch.setattr(gm_api, 'STRUCTURED_OUTPUT', True)
+    monkeypatch.setattr(gm_api, '_STREAMING_UNSUPPORTED', set())
+    monkeypatch.setattr(gm_api, '_STRUCTURED_UNSUPPORTED', set())
+
+
+def feed_all(parser, pieces):
+    for piece in pieces:
+        parser.feed(piece)
+
+
+def test_text_fields_are_reported_once_their_line_ends():
+    delivered = []
+    parser = gm_api.StreamingFieldParser(delivered.append)
+    feed_all(parser, ["Tiere: 2 G", "ämse\n", "Standort: FP"])
+    assert delivered == []  # the animals may continue on the next line
+    feed_all(parser, ["1\nUhrzeit: 06:1", "2:00\n", "Datum: 03.05.2024"])
+    assert delivered == [{'animals': '2 Gämse', 'location': 'FP1'}, {'time': '06:12:00'}]
+    parser.feed("\n")
+    assert delivered[-1] == {'date': '03.05.2024'}
+
+
+def test_each_field_is_delivered_only_once():
+    delivered = []
+    parser = gm_api.StreamingFieldParser(delivered.append)
+    feed_all(parser, ["Standort: FP2\n", "Uhrzeit: 10:00:00\n", "Datum: 01.01.2025\n"])
+    assert [list(fields) for fields in delivered] == [['location'], ['time'], ['date']]
+
+
+def test_json_fields_are_reported_once_their_value_is_closed():
+    delivered = []
+    parser = gm_api.StreamingFieldParser(delivered.append, structured=True)
+    parser.feed('{"animals": [{"species": "Fuchs", "count": 1}')
+    assert delivered == []
+    feed_all(parser, ['], "location": "FP', '2", "time": "10:00:00"'])
+    assert delivered == [{'animals': '1 Fuchs'}, {'location': 'FP2', 'time': '10:00:00'}]
+
+
+def test_callback_errors_do_not_break_the_stream():
+    def broken(fields):
+        raise RuntimeError("GUI gone")
+
+    parser = gm_api.StreamingFieldParser(broken)
+    parser.feed("Standort: FP1\n")
+    assert parser.delivered == {'location'}
+
+
+def test_chat_stream_assembles_events():
+    delivered = []
+    stream = gm_api.ChatStream(delivered.append)
+    for piece in ["Standort: FP3\n", "Uhrzeit: 12:00:00\n"]:
+        chunk = {'model': 'gpt-4o', 'choices': [{'delta': {'content': piece}, 'finish_reason': None}]}
+        stream.feed_line(f"data: {json.dumps(chunk)}".encode('utf-8'))
+    stream.feed_line('data: {"choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": 5}}')
+    stream.feed_line(": keep-alive")
+    stream.feed_line("data: [DONE]")
+    result = stream.result()
+    assert result['choices'][0]['message']['content'] == "Standort: FP3\nUhrzeit: 12:00:00\n"
+    assert result['usage'] == {'prompt_tokens': 10, 'completion_tokens': 5}
+    assert result['model'] == 'gpt-4o'
+    assert delivered == [{'location': 'FP3'}, {'time': '12:00:00'}]
+
+
+def test_stream_error_event_raises():
+    stream = gm_api.ChatStream()
+    with pytest.raises(RuntimeError):
+        stream.feed_line('data: {"error": {"message": "upstream failure"}}')
+
+
+def test_failed_stream_is_journaled_and_closed(monkeypatch):
+    class StreamResponse:
+        status_code = 200
+        headers = {}
+        closed = False
+
+        def raise_for_status(self):
+            pass
+
+        def iter_lines(self):
+            yield 'data: {"choices": [{"delta": {"content": "Standort: FP1\\n"}}]}'
+            yield 'data: {"error": {"message": "upstream failure"}}'
+
+        def close(self):
+            self.closed = True
+
+    response = StreamResponse()
+    journaled = []
+    monkeypatch.setattr(gm_api, 'get_http_client', lambda: type('Client', (), {
+        'post': lambda self, *args, **kwargs: response})())
+    monkeypatch.setattr(gm_api, '_journal_exchange', lambda *args, **kwargs: journaled.append(kwargs))
+    with pytest.raises(RuntimeError):
+        gm_api._send_chat('http://mock', 'gpt-4o', {}, {}, gm_api.get_rate_limiter('gpt-4o'),
+                          on_fields=lambda fields: None)
+    assert response.closed
+    assert [(entry['content'], 'upstream failure' in entry['error']) for entry in journaled] == [
+        ("Standort: FP1\n", True)
+    ]
+
+
+def test_failed_async_stream_is_journaled(monkeypatch):
+    httpx = pytest.importorskip("httpx")
+    import asyncio
+    import github_models_async as gm_async
+
+    body = ('data: {"choices": [{"delta": {"content": "Standort: FP1\\n"}}]}\n\n'
+            'data: {"error": {"message": "upstream failure"}}\n\n')
+    journaled = []
+    monkeypatch.setattr(gm_api, '_journal_exchange', lambda *args, **kwargs: journaled.append((args, kwargs)))
+    exchange = {'latency_ms': {}}
+
+    async def run():
+        async with gm_async.AsyncModelsClient('x', SPECIES) as client:
+            await client._client.aclose()
+            client._client = httpx.AsyncClient(transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, text=body)))
+            await client._send_chat('http://mock', 'gpt-4o', {}, {'json': {}}, gm_api.get_rate_limiter('gpt-4o'),
+                                    exchange, gm_api.ChatStream())
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
+    assert [(args[4], kwargs['content'], 'upstream failure' in kwargs['error']) for args, kwargs in journaled] == [
+        (200, "Standort: FP1\n", True)
+    ]
+    assert 'stream' in exchange['latency_ms']
+
+
+@pytest.mark.parametrize('body, option', [
+    ('{"error": {"message": "stream_options is not supported"}}', 'stream'),
+    ('{"error": {"message": "Streaming (stream=true) not supported for this model"}}', 'stream'),
+    ('{"error": {"message": "upstream request failed"}}', None),
+    ('{"error": {"message": "response_format is not supported"}}', 'response_format'),
+])
+def test_rejected_option_for_streamed_requests(body, option):
+    assert gm_api.rejected_option(400, body, structured=True, stream=True) == option
+
+
+def test_stream_400_disables_only_streaming_and_retries_once(monkeypatch, tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    Image.new('RGB', (32, 32)).save(buffer, 'JPEG')
+    image_path = tmp_path / "bild.jpg"
+    image_path.write_bytes(buffer.getvalue())
+    bodies = ['stream is not supported', 'response_format is not supported']
+    sent = []
+
+    def post_chat(api_base, model_name, headers, payload, on_fields=None, **kwargs):
+        sent.append(on_fields is not None)
+        response = requests.Response()
+        response.status_code = 400
+        response._content = bodies.pop(0).encode('utf-8')
+        raise requests.HTTPError("400 Client Error", response=response)
+
+    monkeypatch.setattr(gm_api, '_post_chat', post_chat)
+    with pytest.raises(requests.HTTPError):
+        gm_api._try_api_call(str(image_path), 'x', 'http://mock', 'gpt-4o', SPECIES, details={},
+                             on_fields=lambda fields: None)
+    assert sent == [True, False]
+    assert not gm_api.streaming_enabled('gpt-4o')
+    assert gm_api.structured_output_enabled('gpt-4o')
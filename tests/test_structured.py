@@ -0,0 +1,148 @@
+import io
+import json
+
+import pytest
+import requests
+
+import github_models_api as gm_api
+
+
+SPECIES = ['Bartgeier', 'Fuchs', 'Gämse', 'Rabenvogel']
+TEXT_ANSWER = {'choices': [{'message': {
+    'content': 'BILD 1:\nTiere: 1 Fuchs\nStandort: FP1\nUhrzeit: 01:02:03\nDatum: 01.02.2025\n\n'
+               'BILD 2:\nTiere: 2 Gämse\nStandort: FP2\nUhrzeit: 04:05:06\nDatum: 01.02.2025'
+}}]}
+
+
+@pytest.fixture(autouse=True)
+def structured_on(monkeypatch):
+    monkeypatch.setattr(gm_api, 'STRUCTURED_OUTPUT', True)
+    monkeypatch.setattr(gm_api, '_STRUCTURED_UNSUPPORTED', set())
+
+
+def http_error(status, body):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body.encode('utf-8')
+    return requests.HTTPError(f"{status} Client Error", response=response)
+
+
+def jpeg_bytes():
+    Image = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    Image.new('RGB', (32, 32)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def test_structured_answer_uses_the_text_prompt_wording():
+    answer = json.dumps({
+        'animals': [{'species': 'Bartgeier', 'count': 1, 'individual': 'Luisa'},
+                    {'species': 'Kolkrabe', 'count': 2, 'individual': ''}],
+        'location': 'fp1', 'time': '6:05', 'date': '3.5.2024',
+    })
+    assert gm_api.parse_structured_response(answer) == (
+        'Bartgeier (Luisa), 2 Rabenvögel', 'FP1', '06:05:00', '03.05.2024'
+    )
+    assert gm_api.parse_structured_response(json.dumps({'animals': [], 'location': 'FP2'}))[0] == 'Keine erkannt'
+
+
+@pytest.mark.parametrize('answer', ['TIERE: 1 Fuchs', '{"location": "FP1"}', '{"animals": [{"count": 2}]}'])
+def test_malformed_structured_answer_raises(answer):
+    with pytest.raises(ValueError):
+        gm_api.parse_structured_response(answer)
+
+
+def test_structured_batch_answer():
+    answer = json.dumps({'images': [
+        {'image': 2, 'animals': [{'species': 'Fuchs', 'count': 1}], 'location': 'FP2',
+         'time': '10:00:00', 'date': '01.01.2024'},
+        {'image': 1, 'animals': 'kaputt'},
+        {'image': 7, 'animals': []},
+    ]})
+    assert gm_api.parse_batch_response(answer, 2, structured=True) == [
+        None, ('1 Fuchs', 'FP2', '10:00:00', '01.01.2024')
+    ]
+
+
+@pytest.mark.parametrize('status, body, option', [
+    (400, '{"error": {"message": "Invalid parameter: response_format json_schema is not supported"}}',
+     'response_format'),
+    (400, '{"error": {"code": "content_filter", "message": "The response was filtered"}}', None),
+    (400, '{"error": {"message": "Request too large: max 20 images"}}', None),
+    (500, '{"error": {"message": "response_format"}}', None),
+])
+def test_rejected_option(status, body, option):
+    assert gm_api.rejected_option(status, body, structured=True) == option
+
+
+def test_unrelated_400_keeps_structured_output(monkeypatch, tmp_path):
+    image_path = tmp_path / "bild.jpg"
+    image_path.write_bytes(jpeg_bytes())
+
+    def post_chat(*args, **kwargs):
+        raise http_error(400, '{"error": {"code": "content_filter"}}')
+
+    monkeypatch.setattr(gm_api, '_post_chat', post_chat)
+    with pytest.raises(requests.HTTPError):
+        gm_api._try_api_call(str(image_path), 'x', 'http://mock', 'gpt-4o', SPECIES, details={})
+    assert gm_api.structured_output_enabled('gpt-4o')
+
+
+def test_response_format_400_switches_to_the_text_prompt(monkeypatch, tmp_path):
+    image_path = tmp_path / "bild.jpg"
+    image_path.write_bytes(jpeg_bytes())
+    sent = []
+
+    def post_chat(api_base, model_name, headers, payload, **kwargs):
+        sent.append('response_format' in payload)
+        if payload.get('response_format'):
+            raise http_error(400, 'response_format is not supported by this model')
+        answer = 'TIERE: 1 Fuchs\nSTANDORT: FP1\nUHRZEIT: 01:02:03\nDATUM: 01.02.2025'
+        body = {'choices': [{'message': {'content': answer}}]}
+        return body, json.dumps(body)
+
+    monkeypatch.setattr(gm_api, '_post_chat', post_chat)
+    result = gm_api._try_api_call(str(image_path), 'x', 'http://mock', 'gpt-4o', SPECIES, details={})
+    assert result[:2] == ('1 Fuchs', 'FP1')
+    assert sent == [True, False]
+    assert not gm_api.structured_output_enabled('gpt-4o')
+
+
+def test_rejected_batch_is_a_batch_failure(monkeypatch):
+    def post_chat(*args, **kwargs):
+        raise http_error(400, '{"error": {"message": "Request body too large"}}')
+
+    monkeypatch.setattr(gm_api, '_post_chat', post_chat)
+    images = [jpeg_bytes(), jpeg_bytes()]
+    with pytest.raises(gm_api.BatchRejectedError):
+        gm_api._try_batch_api_call(images, 'x', 'http://mock', 'gpt-4o', SPECIES, [{}, {}])
+    assert gm_api.structured_output_enabled('gpt-4o')
+
+
+def test_batch_retries_without_response_format(monkeypatch):
+    sent = []
+
+    def post_chat(api_base, model_name, headers, payload, **kwargs):
+        sent.append('response_format' in payload)
+        if payload.get('response_format'):
+            raise http_error(400, 'json_schema response_format unsupported')
+        return TEXT_ANSWER, json.dumps(TEXT_ANSWER)
+
+    monkeypatch.setattr(gm_api, '_post_chat', post_chat)
+    images = [jpeg_bytes(), jpeg_bytes()]
+    results = gm_api._try_batch_api_call(images, 'x', 'http://mock', 'gpt-4o', SPECIES, [{}, {}])
+    assert [result[:2] for result in results] == [('1 Fuchs', 'FP1'), ('2 Gämse', 'FP2')]
+    assert sent == [True, False]
+
+
+def test_reparse_uses_the_parser_the_answer_was_recorded_for():
+    import github_models_journal as gm_journal
+
+    structured = json.dumps({'animals': [{'species': 'Fuchs', 'count': 1}], 'location': 'FP1',
+                             'time': '01:02:03', 'date': '01.02.2025'})
+    entries = [
+        {'status': 200, 'structured': True, 'content': structured},
+        {'status': 200, 'structured': True, 'content': 'Tiere: 1 Fuchs'},
+        {'status': 200, 'content': 'Tiere: 1 Fuchs\nStandort: FP1\nUhrzeit: 01:02:03\nDatum: 01.02.2025'},
+    ]
+    assert gm_journal.reparse(entries) == (2, 0, 1)
@@ -0,0 +1,84 @@
+import asyncio
+import io
+
+import pytest
+
+import github_models_api as gm_api
+
+
+@pytest.fixture
+def pool(monkeypatch, request):
+    """A fresh two-token pool installed as the shared one (tokens are unique per test)."""
+    monkeypatch.setattr(gm_api.CONCURRENCY_GATE, 'max_concurrent', gm_api.CONCURRENCY_GATE.max_concurrent)
+    tokens = [f"{request.node.name}-a", f"{request.node.name}-b"]
+    pool = gm_api.TokenPool(tokens)
+    monkeypatch.setattr(gm_api, '_TOKEN_POOL', pool)
+    return pool
+
+
+def test_round_robin_over_tokens(pool):
+    picked = [pool.try_acquire('gpt-4o')[0] for _ in range(3)]
+    assert picked == [pool.tokens[0], pool.tokens[1], pool.tokens[0]]
+
+
+def test_tokens_are_deduplicated(pool):
+    pool.add(pool.tokens[0])
+    pool.add('  ')
+    assert len(pool) == 2
+
+
+def test_token_out_of_daily_quota_is_parked_and_skipped(pool):
+    gm_api.get_rate_limiter('gpt-4o', pool.tokens[0]).block(6 * 3600, 'day')
+    picked = [pool.try_acquire('gpt-4o')[0] for _ in range(2)]
+    assert picked == [pool.tokens[1], pool.tokens[1]]
+    state = {entry['token']: entry for entry in pool.get_state()}
+    assert state[gm_api.token_fingerprint(pool.tokens[0])]['parked_models'] == ['gpt-4o']
+    assert state[gm_api.token_fingerprint(pool.tokens[1])]['requests_today'] == 2
+    # The other model still has its own budget on the parked token
+    assert pool.try_acquire('gpt-4o-mini')[0] is not None
+
+
+def test_pool_reports_shortest_wait_when_all_tokens_are_limited(pool):
+    gm_api.get_rate_limiter('gpt-4o', pool.tokens[0]).block(300, 'minute')
+    gm_api.get_rate_limiter('gpt-4o', pool.tokens[1]).block(60, 'minute')
+    token, limiter, wait, limit_type = pool.try_acquire('gpt-4o')
+    assert token is None and limiter is None
+    assert limit_type == 'minute'
+    assert 50 < wait <= 60
+    with pytest.raises(gm_api.RateLimitError):
+        pool.acquire('gpt-4o', max_wait=1)
+
+
+def test_every_token_adds_concurrency(pool):
+    assert gm_api.CONCURRENCY_GATE.max_concurrent == gm_api.DEFAULT_MAX_CONCURRENT * 2
+
+
+def test_async_client_retries_a_429_on_the_next_token(pool, tmp_path):
+    httpx = pytest.importorskip("httpx")
+    Image = pytest.importorskip("PIL.Image")
+    import github_models_async as gm_async
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (32, 32)).save(buffer, 'JPEG')
+    answer = {'choices': [{'message': {
+        'content': 'TIERE: 1 Fuchs\nSTANDORT: FP1\nUHRZEIT: 01:02:03\nDATUM: 01.02.2025'
+    }}]}
+    seen = []
+
+    def handler(request):
+        token = request.headers['Authorization'][len('Bearer '):]
+        seen.append(token)
+        if token == pool.tokens[0]:
+            return httpx.Response(429, headers={'retry-after': '30'}, text='rate limited')
+        return httpx.Response(200, json=answer)
+
+    async def run():
+        async with gm_async.AsyncModelsClient(pool.tokens[0], ['Fuchs']) as client:
+            await client._client.aclose()
+            client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            return [await client._try_api_call(buffer.getvalue(), 'http://mock', 'gpt-4o', {}) for _ in range(2)]
+
+    results = asyncio.run(run())
+    assert [result[1] for result in results] == ['FP1', 'FP1']
+    # The rejected token is blocked afterwards, so the second image goes straight to the other one
+    assert seen == [pool.tokens[0], pool.tokens[1], pool.tokens[1]]
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+import github_models_api as gm_api
+import github_models_usage as gm_usage
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return gm_usage.UsageLedger(tmp_path / "usage.json")
+
+
+@pytest.fixture(autouse=True)
+def quiet_api(monkeypatch):
+    """Cascade policy, 50 requests per day, one token and no limiter history."""
+    monkeypatch.setattr(gm_api, '_RATE_LIMITERS', {})
+    monkeypatch.setattr(gm_api, '_TOKEN_POOL', gm_api.TokenPool(['usage-test-token']))
+    monkeypatch.setattr(gm_api, '_STATION_POLICIES', {})
+    monkeypatch.setattr(gm_api, 'MODEL_STRATEGY', 'cascade')
+    monkeypatch.setattr(gm_api, 'DEFAULT_REQUESTS_PER_DAY', 50)
+    monkeypatch.setattr(gm_api, 'MODEL_REQUEST_LIMITS', {})
+    monkeypatch.setattr(gm_usage, 'DAILY_TOKEN_BUDGET', 0)
+
+
+def record(ledger, model, count, images=1, tokens=(0, 0), status=200):
+    for _ in range(count):
+        ledger.record(model, 'tok', status, usage={'prompt_tokens': tokens[0], 'completion_tokens': tokens[1]},
+                      latency_ms=100, images=images)
+
+
+def test_forecast_without_usage_assumes_the_cheap_model_sees_every_image(ledger):
+    result = gm_usage.forecast(ledger)
+    assert result['images_today'] == 0
+    assert result['images_remaining'] == 50
+    assert result['limited_by'] == gm_api.CHEAP_MODEL
+    assert result['models'][gm_api.STRONG_MODEL]['images_feasible'] is None
+
+
+def test_forecast_uses_share_and_batch_size(ledger):
+    record(ledger, gm_api.CHEAP_MODEL, 10, images=2)  # 20 images in batches of two
+    record(ledger, gm_api.STRONG_MODEL, 5)  # a quarter of them escalated
+    result = gm_usage.forecast(ledger)
+    cheap = result['models'][gm_api.CHEAP_MODEL]
+    strong = result['models'][gm_api.STRONG_MODEL]
+    assert result['images_today'] == 20
+    assert (cheap['requests_remaining'], cheap['images_per_request'], cheap['images_feasible']) == (40, 2.0, 80)
+    assert (strong['requests_remaining'], strong['share'], strong['images_feasible']) == (45, 0.25, 180)
+    assert (result['images_remaining'], result['limited_by']) == (80, gm_api.CHEAP_MODEL)
+
+
+def test_forecast_uses_each_models_daily_budget(ledger, monkeypatch):
+    monkeypatch.setattr(gm_api, 'MODEL_REQUEST_LIMITS', {gm_api.CHEAP_MODEL: (15, 150), gm_api.STRONG_MODEL: (10, 50)})
+    record(ledger, gm_api.CHEAP_MODEL, 20)
+    record(ledger, gm_api.STRONG_MODEL, 5)
+    result = gm_usage.forecast(ledger)
+    assert result['models'][gm_api.CHEAP_MODEL]['requests_remaining'] == 130
+    assert (result['images_remaining'], result['limited_by']) == (130, gm_api.CHEAP_MODEL)
+
+
+def test_forecast_respects_the_header_corrected_budget(ledger):
+    record(ledger, gm_api.CHEAP_MODEL, 10)
+    limiter = gm_api.get_rate_limiter(gm_api.CHEAP_MODEL)
+    limiter.rpd_remaining = 5
+    assert gm_usage.forecast(ledger)['models'][gm_api.CHEAP_MODEL]['images_feasible'] == 5
+
+
+def test_forecast_token_budget(ledger, monkeypatch):
+    monkeypatch.setattr(gm_usage, 'DAILY_TOKEN_BUDGET', 10000)
+    record(ledger, gm_api.CHEAP_MODEL, 10, tokens=(800, 200))
+    result = gm_usage.forecast(ledger)
+    assert result['avg_tokens_per_image'] == 1000
+    assert (result['images_remaining'], result['limited_by']) == (0, 'tokens')
+
+
+def test_rejections_and_errors_are_counted_but_not_as_images(ledger):
+    record(ledger, gm_api.CHEAP_MODEL, 2)
+    record(ledger, gm_api.CHEAP_MODEL, 1, status=429)
+    record(ledger, gm_api.CHEAP_MODEL, 1, status=None)
+    counters = gm_usage.totals_by(ledger.day())[gm_api.CHEAP_MODEL]
+    assert (counters['requests'], counters['ok'], counters['rejected'], counters['errors'], counters['images']) == (
+        4, 2, 1, 1, 2
+    )
+
+
+def test_ledger_batches_writes_until_flush(ledger, monkeypatch):
+    monkeypatch.setattr(gm_usage, 'SAVE_INTERVAL', 3600)
+    record(ledger, gm_api.CHEAP_MODEL, 3)
+
+    def saved_requests():
+        days = json.loads(ledger.path.read_text(encoding="utf-8"))
+        return sum(counters['requests'] for day in days.values() for tokens in day.values()
+                   for counters in tokens.values())
+
+    assert saved_requests() == 1  # only the first record() wrote the file
+    ledger.flush()
+    assert saved_requests() == 3
+    assert gm_usage.UsageLedger(ledger.path).day() == ledger.day()
+
+
+def test_format_status():
+    text = gm_usage.format_status({'images_today': 40, 'tokens_today': 61000, 'images_remaining': 120,
+                                   'limited_by': 'gpt-4o-mini'})
+    assert text == "Heute: 40 Bilder, 61k Tokens – noch ca. 120 Bilder möglich (Limit: gpt-4o-mini)"